@@ -0,0 +1,97 @@
+import numpy as np
+import hashlib
+import os
+import tempfile
+
+
+# On-disk cache of parsed networks.
+# Each entry is an .npz file named after the source path, its mtime and its size,
+# so editing or replacing a file invalidates the entry. Entries are evicted least
+# recently used first once the cache grows beyond maxBytes.
+class NetworkCache:
+
+    DEFAULT_DIRECTORY = os.environ.get('NYANPY_CACHE_DIR',\
+            os.path.join(os.path.expanduser('~'), '.cache', 'NyanPy', 'networks'))
+    DEFAULT_MAX_BYTES = 1 << 30
+
+    def __init__(self, directory:str = None, maxBytes:int = DEFAULT_MAX_BYTES):
+        self.__directory = directory or self.DEFAULT_DIRECTORY
+        self.__maxBytes = maxBytes
+
+    def directory(self) -> str:
+        return self.__directory
+
+    def maxBytes(self) -> int:
+        return self.__maxBytes
+
+    def setMaxBytes(self, maxBytes:int):
+        self.__maxBytes = maxBytes
+        self.evict()
+
+    def entryPath(self, path:str) -> str:
+        st = os.stat(path)
+        key = '{}|{}|{}'.format(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        return os.path.join(self.__directory, hashlib.sha1(key.encode()).hexdigest() + '.npz')
+
+    def load(self, path:str) -> dict:
+        try:
+            entry = self.entryPath(path)
+            with np.load(entry) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+            os.utime(entry) # Mark as recently used
+        except Exception:
+            return None
+        return arrays
+
+    def save(self, path:str, arrays:dict):
+        try:
+            entry = self.entryPath(path)
+            os.makedirs(self.__directory, exist_ok=True)
+
+            # Write to a temporary file first so that concurrent readers never see a partial entry
+            fd, temp = tempfile.mkstemp(suffix='.tmp', dir=self.__directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(temp, entry)
+            except Exception:
+                os.remove(temp)
+                raise
+        except Exception:
+            return
+
+        self.evict()
+
+    def entries(self) -> list:
+        entries = []
+        try:
+            with os.scandir(self.__directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.npz'):
+                        st = entry.stat()
+                        entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def totalBytes(self) -> int:
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.__maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,103 @@
+import numpy as np
+
+import NyanRFModule as nyanRF
+
+
+# Network read from a Touchstone file with its metadata.
+# Parameters are kept as stored (TYPE parameters), but always in Ohm/Siemens:
+# the normalization of Touchstone 1.x Z, Y, H and G data is undone on reading.
+class Network:
+
+    def __init__(self, frequency:np.ndarray, data:np.ndarray, TYPE:str = 'S', reference = 50.,\
+            noise:dict = None, options:dict = None):
+        self.__frequency = frequency
+        self.__data = data
+        self.__TYPE = TYPE
+        self.__reference = nyanRF._zrefvector(reference, np.size(data, -1), float)
+        self.__noise = noise
+        self.__options = dict(options or {})
+
+    def frequency(self) -> np.ndarray:
+        return self.__frequency
+
+    def data(self) -> np.ndarray:
+        return self.__data
+
+    def parameterType(self) -> str:
+        return self.__TYPE
+
+    def portCount(self) -> int:
+        return np.size(self.__data, -1)
+
+    def referenceImpedance(self) -> np.ndarray:
+        # Per-port reference impedance (N,)
+        return self.__reference
+
+    def commonReference(self):
+        # Reference impedance as a scalar if all ports share it, otherwise the per-port vector
+        reference = self.__reference
+        return float(reference[0]) if np.all(reference == reference[0]) else reference
+
+    def noise(self) -> dict:
+        # 'FREQUENCY', 'NFMIN' (dB), 'GAMMA_OPT' (complex) and 'RN' (Ohm), or None
+        return self.__noise
+
+    def noiseAt(self, frequency:np.ndarray) -> dict:
+        # Noise parameters interpolated onto frequency (linear), NaN outside the noise band
+        if self.__noise is None:
+            return None
+
+        x = self.__noise['FREQUENCY']
+        noise = {'FREQUENCY': frequency}
+        for name in ['NFMIN', 'RN']:
+            noise[name] = np.interp(frequency, x, self.__noise[name], left=np.nan, right=np.nan)
+        gamma = self.__noise['GAMMA_OPT']
+        noise['GAMMA_OPT'] = np.interp(frequency, x, gamma.real, left=np.nan, right=np.nan)\
+                + 1j * np.interp(frequency, x, gamma.imag, left=np.nan, right=np.nan)
+        return noise
+
+    def options(self) -> dict:
+        # 'FREQ_UNITS', 'FORMAT', 'VERSION' and 'MATRIX_FORMAT' of the file
+        return self.__options
+
+    def version(self) -> str:
+        return self.__options.get('VERSION', '1.0')
+
+    def sparameters(self) -> np.ndarray:
+        # S parameters referred to the port reference impedances
+        return nyanRF.xtos(self.__data, self.__TYPE, self.commonReference())
+
+
+"""Reads a Touchstone 1.x or 2.0 file with its metadata
+Besides the 1.x option line, the 2.0 keywords [Number of Ports],
+[Two-Port Data Order], [Number of Frequencies], [Reference],
+[Matrix Format] (Full, Upper or Lower) and the [Noise Data] block are
+read. Triangular storage is expanded with the triu/tril index maps.
+2-port noise parameters of 1.x files follow the network data.
+Args:
+    path     (str) : SnP or .ts file path (.gz compressed files too)
+    useCache (bool): look up and store the result in the network cache (off by default)
+    dtype    (type): storage type of the parameters, complex (default) or np.complex64
+Returns:
+    (Network): network with its parameters, reference impedances and noise parameters
+"""
+def readnetwork(path:str, useCache:bool = False, dtype = complex) -> Network:
+    parsed = nyanRF._readtouchstone(path, useCache, dtype)
+    reference = parsed['REFERENCE']
+    normalized = parsed['VERSION'].startswith('1')
+
+    # 1.x files normalize Z, Y, H, G and Rn to the option line R
+    data = parsed['data']
+    if normalized:
+        data = nyanRF._denormalize(data, parsed['TYPE'], parsed['Z0'])
+
+    noise = None
+    rows = parsed['noise']
+    if len(rows):
+        noise = {'FREQUENCY': rows[:, 0] * nyanRF.FREQ_UNIT_SCALES[parsed['FREQ_UNITS']],\
+                'NFMIN': rows[:, 1],\
+                'GAMMA_OPT': rows[:, 2] * np.exp(1j * rows[:, 3] * np.pi / 180.),\
+                'RN': rows[:, 4] * (parsed['Z0'] if normalized else 1.)}
+
+    options = {name: parsed[name] for name in ['FREQ_UNITS', 'FORMAT', 'VERSION', 'MATRIX_FORMAT']}
+    return Network(parsed['frequency'], data, parsed['TYPE'], reference, noise, options)
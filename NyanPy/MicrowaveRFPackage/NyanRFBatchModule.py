@@ -0,0 +1,336 @@
+import numpy as np
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import NyanRFModule as nyanRF
+from NetworkModule import readnetwork
+
+
+# Output parameter types: S --> TYPE
+CONVERSIONS = {
+        'S': lambda s, Z0: s,
+        'Z': lambda s, Z0: nyanRF.stoz(s, Z0),
+        'Y': lambda s, Z0: nyanRF.ztoy(nyanRF.stoz(s, Z0)),
+        'H': lambda s, Z0: nyanRF.ztoh(nyanRF.stoz(s, Z0)),
+        'ABCD': lambda s, Z0: nyanRF.ztoa(nyanRF.stoz(s, Z0)),
+        'T': lambda s, Z0: nyanRF.stot(s) }
+
+# Touchstone 1.x stores Z, Y and H normalized to the reference impedance
+NORMALIZATIONS = {
+        'S': lambda x, Z0: x,
+        'Z': lambda x, Z0: x / Z0,
+        'Y': lambda x, Z0: x * Z0,
+        'H': lambda x, Z0: nyanRF._denormalize(x, 'H', 1. / Z0) } # 2N-port blocks [[/Z0, 1], [1, *Z0]]
+
+# 2-port metrics of the (input, output) port pair, evaluated on the S parameters
+METRICS = {
+        'K': lambda s, frequency, ports, aperture: nyanRF.stabilityfactor(s, ports),
+        'DELTA': lambda s, frequency, ports, aperture: np.abs(nyanRF.stabilitydelta(s, ports)),
+        'MU': lambda s, frequency, ports, aperture: nyanRF.mufactor(s, ports),
+        'MU_PRIME': lambda s, frequency, ports, aperture: nyanRF.muprimefactor(s, ports),
+        'MAG': lambda s, frequency, ports, aperture: 10. * np.log10(nyanRF.maxgain(s, ports)),
+        'U': lambda s, frequency, ports, aperture: nyanRF.unilateralfom(s, ports),
+        'GD': lambda s, frequency, ports, aperture: nyanRF.groupdelay(s[:, ports[1], ports[0]], frequency, aperture) }
+
+METRIC_UNITS = {'MAG': 'dB', 'GD': 's'}
+
+FREQUENCY_PATTERN = re.compile(r'^([-+0-9.eE]+)\s*(HZ|KHZ|MHZ|GHZ|K|M|G)?$')
+
+
+# '2.4GHz', '100M', '1e9' --> frequency in Hz
+def _parsefrequency(text:str) -> float:
+    matched = FREQUENCY_PATTERN.match(text.strip().upper())
+    if not matched:
+        raise argparse.ArgumentTypeError('invalid frequency: ' + text)
+
+    unit = matched.group(2) or 'HZ'
+    unit = unit if unit.endswith('HZ') else unit + 'HZ'
+    return float(matched.group(1)) * nyanRF.FREQ_UNIT_SCALES[unit]
+
+
+# '1,3' --> zero-based (input, output) port pair
+def _parseports(text:str) -> tuple:
+    try:
+        ports = tuple(int(word) - 1 for word in text.split(','))
+    except ValueError:
+        ports = ()
+    if len(ports) != 2 or min(ports) < 0 or ports[0] == ports[1]:
+        raise argparse.ArgumentTypeError('invalid port pair: ' + text)
+    return ports
+
+
+# '50', '25+5j' or '50,50,75,75' --> reference impedance, scalar or per port
+def _parseimpedances(text:str):
+    try:
+        values = [complex(word.strip().lower().replace('i', 'j')) for word in text.split(',')]
+    except ValueError:
+        values = []
+    if not values or any(value.real <= 0 for value in values):
+        raise argparse.ArgumentTypeError('invalid reference impedance: ' + text)
+
+    values = [value.real if value.imag == 0 else value for value in values]
+    return values[0] if len(values) == 1 else np.array(values)
+
+
+"""Expands file paths and glob patterns
+Args:
+    patterns (list): file paths or glob patterns (** is recursive)
+Returns:
+    (list): sorted, unique file paths
+"""
+def expandpaths(patterns:list) -> list:
+    paths = []
+    for pattern in patterns:
+        matched = glob.glob(pattern, recursive=True)
+        paths += matched if matched else ([pattern] if os.path.isfile(pattern) else [])
+    return sorted(set(os.path.normpath(path) for path in paths))
+
+
+"""Runs a per-file function over many files
+Files are processed in worker processes unless there is only one job.
+Results are handled in the order of paths. Failed files are reported on
+stderr, followed by the number of failures.
+Args:
+    func    (callable): module-level function func(path, options) returning a
+                        tuple whose last element is an error message or None
+    paths   (list)    : file paths
+    options (dict)    : options passed to every call (picklable)
+    jobs    (int)     : number of worker processes
+    handle  (callable): called with the result tuple of every successful file
+Returns:
+    (int): number of failed files
+"""
+def runfiles(func, paths:list, options:dict, jobs:int, handle) -> int:
+    # Small batches are not worth the process start-up
+    jobs = max(1, min(jobs or 1, len(paths)))
+    if jobs == 1:
+        results = map(func, paths, [options] * len(paths))
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(jobs)
+        results = executor.map(func, paths, [options] * len(paths),\
+                chunksize=max(1, len(paths) // (8 * jobs)))
+
+    errors = 0
+    try:
+        for result in results:
+            if result[-1]:
+                errors += 1
+                print(result[0] + ': ' + result[-1], file=sys.stderr)
+                continue
+            handle(result)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if errors:
+        print('{} of {} files failed'.format(errors, len(paths)), file=sys.stderr)
+    return errors
+
+
+# Input path --> output path
+def _outputpath(path:str, n:int, options:dict) -> str:
+    name = os.path.basename(nyanRF._uncompressedpath(path))
+    name = os.path.splitext(name)[0] + options['suffix']
+    ext = {'snp': '.s{}p'.format(n), 'csv': '.csv', 'npz': '.npz'}[options['output']]
+    ext += '.gz' if options['gzip'] and options['output'] != 'npz' else ''
+    directory = options['directory'] or os.path.dirname(path)
+    return os.path.join(directory, name + ext)
+
+
+# Writes a converted network as CSV, one row per frequency point
+def _writecsv(x, frequency, path:str, FREQ_UNITS:str, TYPE:str, FORMAT:str):
+    n = np.size(x, 1)
+    rows, cols = np.nonzero(np.ones((n, n)))
+    PREFIX = {'MA':('mag', 'ang'), 'DB':('db', 'ang'), 'RI':('re', 'im')}[FORMAT]
+    header = ['FREQ(' + FREQ_UNITS + ')']
+    for i, j in zip(rows, cols):
+        header += [PREFIX[0] + TYPE + '{}{}'.format(i + 1, j + 1), PREFIX[1] + TYPE + '{}{}'.format(i + 1, j + 1)]
+
+    a, b = nyanRF._deconst(x[:, rows, cols], FORMAT)
+    data = np.zeros((len(frequency), 2 * len(rows) + 1))
+    data[:, 0] = frequency / nyanRF.FREQ_UNIT_SCALES[FREQ_UNITS]
+    data[:, 1::2] = a
+    data[:, 2::2] = b
+    np.savetxt(path, data, fmt='%.9e', delimiter=',', header=','.join(header), comments='')
+
+
+# Metric vectors --> summary rows (one per requested frequency, or min/max over the band)
+def _summarize(path:str, s, frequency, options:dict) -> list:
+    values = {name: METRICS[name](s, frequency, options['ports'], options['aperture']) for name in options['metrics']}
+    if options['at']:
+        rows = []
+        for f in options['at']:
+            inside = frequency[0] <= f <= frequency[-1]
+            rows.append([path, '{:.9e}'.format(f)] + ['{:.6e}'.format(np.interp(f, frequency, values[name])\
+                    if inside else np.nan) for name in options['metrics']])
+        return rows
+    return [[path, statistic] + ['{:.6e}'.format(function(values[name])) for name in options['metrics']]\
+            for statistic, function in [('min', np.nanmin), ('max', np.nanmax)]]
+
+
+# Fixture (s, frequency, reference) --> (s, frequency) referred to the reference of the DUT
+def _fixture(fixture:tuple, numPorts:int, zref) -> tuple:
+    if fixture is None:
+        return None
+
+    s, frequency, reference = fixture
+    if np.size(s, 1) != numPorts:
+        raise RuntimeError('Fixture has {} ports, the network {}'.format(np.size(s, 1), numPorts))
+    if not np.array_equal(reference, zref):
+        s = nyanRF.renormalize(s, reference, zref)
+    return (s, frequency)
+
+
+"""Processes one SnP file (runs in a worker process)
+Args:
+    path    (str) : SnP file path
+    options (dict): conversion and metric options, see main()
+Returns:
+    (tuple): (path, output path or None, summary rows, error message or None)
+"""
+def processfile(path:str, options:dict) -> tuple:
+    try:
+        # Y, Z, H and G files are converted to S first
+        network = readnetwork(path, useCache=options['cache'])
+        s, frequency = network.sparameters(), network.frequency()
+        fileOptions = network.options()
+        Z0 = network.commonReference()
+
+        if options['left'] is not None or options['right'] is not None:
+            left, right = [_fixture(options[key], np.size(s, 1), Z0) for key in ['left', 'right']]
+            s, frequency = nyanRF.deembed((s, frequency), left, right)
+        if options['renormalize'] is not None:
+            if np.size(options['renormalize']) not in [1, np.size(s, 1)]:
+                raise RuntimeError('{} reference impedances given for {} ports'.format(\
+                        np.size(options['renormalize']), np.size(s, 1)))
+            s = nyanRF.renormalize(s, Z0, options['renormalize'])
+            Z0 = options['renormalize']
+
+        output = None
+        if options['output']:
+            TYPE = options['to']
+            FORMAT = options['format'] or fileOptions['FORMAT']
+            FREQ_UNITS = options['unit'] or fileOptions['FREQ_UNITS']
+            x = CONVERSIONS[TYPE](s, Z0)
+
+            output = _outputpath(path, np.size(s, 1), options)
+            if os.path.abspath(output) == os.path.abspath(path):
+                raise RuntimeError('Output would overwrite the input file')
+
+            if options['output'] == 'snp':
+                if not np.isscalar(Z0):
+                    raise RuntimeError('Per-port reference impedances cannot be written as SnP, use --renormalize')
+                nyanRF.writesnp(NORMALIZATIONS[TYPE](x, Z0), frequency, output, FREQ_UNITS, TYPE, FORMAT, Z0)
+            elif options['output'] == 'csv':
+                _writecsv(x, frequency, output, FREQ_UNITS, TYPE, FORMAT)
+            else:
+                np.savez(output, data=x, frequency=frequency, TYPE=TYPE, Z0=Z0)
+
+        rows = _summarize(path, s, frequency, options) if options['metrics'] else []
+        return (path, output, rows, None)
+    except Exception as e:
+        return (path, None, [], str(e))
+
+
+def _argumentparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m NyanPy.MicrowaveRFPackage',\
+            description='Batch conversion and metrics of Touchstone (SnP) files.')
+    parser.add_argument('patterns', nargs='+', help='SnP/Touchstone 2.0 files or glob patterns (** is recursive)')
+
+    group = parser.add_argument_group('conversion')
+    group.add_argument('-o', '--output', choices=['snp', 'csv', 'npz'],\
+            help='write converted networks in this format')
+    group.add_argument('-d', '--directory', help='output directory, defaults to the input directory')
+    group.add_argument('--to', choices=list(CONVERSIONS), default='S', type=str.upper,\
+            help='output parameter type (default: S)')
+    group.add_argument('--format', choices=['RI', 'MA', 'DB'], type=str.upper,\
+            help='output data format, defaults to the input format')
+    group.add_argument('--unit', choices=list(nyanRF.FREQ_UNIT_SCALES), type=str.upper,\
+            help='output frequency unit, defaults to the input unit')
+    group.add_argument('--renormalize', type=_parseimpedances, metavar='Z',\
+            help='new reference impedance, complex and per port allowed, e.g. 25, 50-10j or 50,50,25,25'\
+            ' (default: Z0 of each file)')
+    group.add_argument('--suffix', default='', help='appended to the output file names')
+    group.add_argument('--gzip', action='store_true', help='gzip the SnP/CSV output')
+
+    group = parser.add_argument_group('de-embedding')
+    group.add_argument('--left', help='fixture SnP file to remove from the left (input) ports')
+    group.add_argument('--right', help='fixture SnP file to remove from the right (output) ports,'\
+            ' its left ports facing the DUT')
+
+    group = parser.add_argument_group('metrics (2-port or port pair)')
+    group.add_argument('-m', '--metrics', type=lambda text: [name.strip().upper() for name in text.split(',')],\
+            default=[], help='comma separated list of ' + ', '.join(METRICS))
+    group.add_argument('--at', nargs='+', type=_parsefrequency, default=[],\
+            help='frequencies to evaluate the metrics at, e.g. 2.4GHz 5.8G (default: min/max over the band)')
+    group.add_argument('--ports', type=_parseports, default=(0, 1),\
+            help='input and output port of multi-port networks, e.g. 1,3 (default: 1,2)')
+    group.add_argument('--aperture', type=int, default=1, help='group delay aperture in points')
+    group.add_argument('-s', '--summary', help='summary CSV path, defaults to stdout')
+
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',\
+            help='do not use the network cache for reading')
+    return parser
+
+
+def main(argv:list = None) -> int:
+    parser = _argumentparser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.metrics if name not in METRICS]
+    if unknown:
+        parser.error('unknown metrics: ' + ', '.join(unknown))
+
+    if not args.output and not args.metrics:
+        parser.error('nothing to do, give --output and/or --metrics')
+
+    if args.output == 'snp' and args.to not in NORMALIZATIONS:
+        parser.error(args.to + ' parameters cannot be written as SnP, use csv or npz')
+
+    if args.output == 'snp' and args.renormalize is not None and not isinstance(args.renormalize, float):
+        parser.error('SnP files have one real reference impedance, use csv or npz')
+
+    paths = expandpaths(args.patterns)
+    if not paths:
+        parser.error('no files matched')
+
+    if args.directory:
+        os.makedirs(args.directory, exist_ok=True)
+
+    options = {key: getattr(args, key) for key in\
+            ['output', 'directory', 'to', 'format', 'unit', 'renormalize', 'suffix', 'gzip', 'metrics', 'at', 'ports',\
+            'aperture', 'cache']}
+
+    # Fixtures are read once, converted to S like the networks, and shipped to the workers with the options
+    for key in ['left', 'right']:
+        options[key] = None
+        if getattr(args, key):
+            try:
+                fixture = readnetwork(getattr(args, key), useCache=args.cache)
+                options[key] = (fixture.sparameters(), fixture.frequency(), fixture.commonReference())
+            except Exception as e:
+                parser.error('cannot read fixture ' + getattr(args, key) + ': ' + str(e))
+
+    if options['left'] is not None and options['right'] is not None\
+            and np.size(options['left'][0], 1) != np.size(options['right'][0], 1):
+        parser.error('left and right fixtures have different port counts')
+
+    summary = open(args.summary, 'w', newline='') if args.summary else sys.stdout
+    writer = csv.writer(summary, lineterminator='\n')
+    if args.metrics:
+        header = ['file', 'frequency' if args.at else 'statistic']
+        header += [name + ('(' + METRIC_UNITS[name] + ')' if name in METRIC_UNITS else '') for name in args.metrics]
+        writer.writerow(header)
+
+    try:
+        errors = runfiles(processfile, paths, options, args.jobs, lambda result: writer.writerows(result[2]))
+    finally:
+        if summary is not sys.stdout:
+            summary.close()
+    return 1 if errors else 0
@@ -0,0 +1,908 @@
+import numpy as np
+import os
+import tempfile
+import time
+
+import NyanRFModule as nyanRF
+import NyanRFDiagnosticsModule as diagnostics
+from NetworkCacheModule import NetworkCache
+from NetworkModule import readnetwork
+
+
+#--------------------------------------------------------------------------------------------------
+# Reference implementations (per-element Python loops)
+#--------------------------------------------------------------------------------------------------
+
+# Loads SnP file token by token (reference loader)
+def loadsnp_loop(path:str) -> tuple:
+    base, ext = os.path.splitext(path)
+    n = int(ext[2:-1])
+    data = []
+    with open(path, 'r') as f:
+        lines = f.readlines()
+
+    for line in lines:
+        line = line[:line.find('!')].strip().upper()
+        if not line:
+            continue
+        if line[0] == '#': # Option line
+            words = line.split()
+            FREQ_UNITS = words[1]
+            FORMAT = words[3]
+        else:
+            data += [float(s) for s in line.split()]
+
+    columnCount = 2 * n**2 + 1
+    rowCount = int(len(data) / columnCount)
+    data = np.array(data).reshape((rowCount, columnCount))
+    frequency = data[:, 0]
+    frequency *= nyanRF.FREQ_UNIT_SCALES[FREQ_UNITS]
+    reconst = lambda a, b, FORMAT: a * np.exp(1j * b * np.pi / 180.) if FORMAT == 'MA'\
+            else 10**(a / 20.) * np.exp(1j * b * np.pi / 180.) if FORMAT == 'DB'\
+            else a + 1j * b
+    s = np.zeros((len(frequency), n, n), dtype=complex)
+    indices = [(0, 0), (1, 0), (0, 1), (1, 1)] if n == 2\
+            else [(i, j) for i in range(n) for j in range(n)]
+
+    # Whole columns, so that MA/DB go through the same (SIMD) exp as the vectorized parser
+    for m, (i, j) in enumerate(indices):
+        a = data[:, 1 + 2 * m]
+        b = data[:, 2 + 2 * m]
+        s[:, i, j] = reconst(a, b, FORMAT)
+
+    return (s, frequency)
+
+
+# S parameter --> T parameter
+def stot_loop(s):
+    if s.ndim == 3:
+        t = s.copy()
+        for i in range(np.size(s, 0)):
+            t[i] = stot_loop(s[i])
+        return t
+
+    elif s.ndim == 2:
+        if np.size(s, 0) != np.size(s, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(s, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        t = s.copy()
+        dets = np.linalg.det(s)
+        t[0, 0] =    -dets / s[1, 0]
+        t[0, 1] =  s[0, 0] / s[1, 0]
+        t[1, 0] = -s[1, 1] / s[1, 0]
+        t[1, 1] =       1. / s[1, 0]
+        return t
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# T parameter --> S parameter
+def ttos_loop(t):
+    if t.ndim == 3:
+        s = t.copy()
+        for i in range(np.size(t, 0)):
+            s[i] = ttos_loop(t[i])
+        return s
+
+    elif t.ndim == 2:
+        if np.size(t, 0) != np.size(t, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(t, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        s = t.copy()
+        dett = np.linalg.det(t)
+        s[0, 0] =  t[0, 1] / t[1, 1]
+        s[0, 1] =     dett / t[1, 1]
+        s[1, 0] =       1. / t[1, 1]
+        s[1, 1] = -t[1, 0] / t[1, 1]
+        return s
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# S parameter --> Z parameter
+def stoz_loop(s, zref = 50.):
+    if s.ndim == 3:
+        z = s.copy()
+        for i in range(np.size(s, 0)):
+            z[i] = stoz_loop(s[i], zref)
+        return z
+
+    elif s.ndim == 2:
+        if np.size(s, 0) != np.size(s, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        # Port number
+        n = np.size(s, 0)
+
+        if type(zref) in [list, np.ndarray]:
+            if len(zref) != n:
+                raise RuntimeError('Zref vector length must be equal to the number of ports')
+            else:
+                zref = np.array(zref)
+        else:
+            zref_ = np.zeros(n, dtype=complex)
+            zref_.fill(complex(zref))
+            zref = zref_
+
+        f = np.diag(0.5 / np.sqrt(np.abs(np.real(zref))))
+        g = np.diag(zref)
+        z = np.linalg.inv(f) @ np.linalg.inv(np.eye(n) - s) @ (s @ g + g.conj().T) @ f
+        return z
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Z parameter --> S parameter
+def ztos_loop(z, zref = 50.):
+    if z.ndim == 3:
+        s = z.copy()
+        for i in range(np.size(z, 0)):
+            s[i] = ztos_loop(z[i], zref)
+        return s
+
+    elif z.ndim == 2:
+        if np.size(z, 0) != np.size(z, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        # Port number
+        n = np.size(z, 0)
+
+        if type(zref) in [list, np.ndarray]:
+            if len(zref) != n:
+                raise RuntimeError('Zref vector length must be equal to the number of ports')
+            else:
+                zref = np.array(zref)
+        else:
+            zref_ = np.zeros(n, dtype=complex)
+            zref_.fill(complex(zref))
+            zref = zref_
+
+        f = np.diag(0.5 / np.sqrt(np.abs(np.real(zref))))
+        g = np.diag(zref)
+        s = f @ (z - g.conj().T) @ np.linalg.inv(z + g) @ np.linalg.inv(f)
+        return s
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Z parameter --> Y parameter
+def ztoy_loop(z):
+    if z.ndim == 3:
+        y = z.copy()
+        for i in range(np.size(z, 0)):
+            y[i] = ztoy_loop(z[i])
+        return y
+
+    elif z.ndim == 2:
+        if np.size(z, 0) != np.size(z, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        y = np.linalg.inv(z)
+        return y
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Z parameter --> H parameter
+def ztoh_loop(z):
+    if z.ndim == 3:
+        h = z.copy()
+        for i in range(np.size(z, 0)):
+            h[i] = ztoh_loop(z[i])
+        return h
+
+    elif z.ndim == 2:
+        if np.size(z, 0) != np.size(z, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(z, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        h = z.copy()
+        detz = np.linalg.det(z)
+        h[0, 0] =     detz / z[1, 1]
+        h[0, 1] =  z[0, 1] / z[1, 1]
+        h[1, 0] = -z[1, 0] / z[1, 1]
+        h[1, 1] =       1. / z[1, 1]
+        return h
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Z parameter --> ABCD parameter
+def ztoa_loop(z):
+    if z.ndim == 3:
+        a = z.copy()
+        for i in range(np.size(z, 0)):
+            a[i] = ztoa_loop(z[i])
+        return a
+
+    elif z.ndim == 2:
+        if np.size(z, 0) != np.size(z, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(z, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        a = z.copy()
+        detz = np.linalg.det(z)
+        a[0, 0] = z[0, 0] / z[1, 0]
+        a[0, 1] =    detz / z[1, 0]
+        a[1, 0] =      1. / z[1, 0]
+        a[1, 1] = z[1, 1] / z[1, 0]
+        return a
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Y parameter --> Z parameter
+def ytoz_loop(y):
+    if y.ndim == 3:
+        z = y.copy()
+        for i in range(np.size(y, 0)):
+            z[i] = ytoz_loop(y[i])
+        return z
+
+    elif y.ndim == 2:
+        if np.size(y, 0) != np.size(y, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(y, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        z = y.copy()
+        dety = np.linalg.det(y)
+        z[0, 0] =  y[1, 1] / dety
+        z[0, 1] = -y[0, 1] / dety
+        z[1, 0] = -y[1, 0] / dety
+        z[1, 1] =  y[0, 0] / dety
+        return z
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# H parameter --> Z parameter
+def htoz_loop(h):
+    if h.ndim == 3:
+        z = h.copy()
+        for i in range(np.size(h, 0)):
+            z[i] = htoz_loop(h[i])
+        return z
+
+    elif h.ndim == 2:
+        if np.size(h, 0) != np.size(h, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(h, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        z = h.copy()
+        deth = np.linalg.det(h)
+        z[0, 0] =     deth / h[1, 1]
+        z[0, 1] =  h[0, 1] / h[1, 1]
+        z[1, 0] = -h[1, 0] / h[1, 1]
+        z[1, 1] =       1. / h[1, 1]
+        return z
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# ABCD parameter --> Z parameter
+def atoz_loop(a):
+    if a.ndim == 3:
+        z = a.copy()
+        for i in range(np.size(a, 0)):
+            z[i] = atoz_loop(a[i])
+        return z
+
+    elif a.ndim == 2:
+        if np.size(a, 0) != np.size(a, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(a, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        z = a.copy()
+        deta = np.linalg.det(a)
+        z[0, 0] = a[0, 0] / a[1, 0]
+        z[0, 1] =    deta / a[1, 0]
+        z[1, 0] =      1. / a[1, 0]
+        z[1, 1] = a[1, 1] / a[1, 0]
+        return z
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Maximum available gain (MAG, GMAX)
+def maxgain_loop(s):
+    if s.ndim == 3:
+        maxgain_vector = np.zeros(np.size(s, 0))
+        for i in range(np.size(s, 0)):
+            maxgain_vector[i] = maxgain_loop(s[i])
+        return maxgain_vector
+
+    elif s.ndim == 2:
+        if np.size(s, 0) != np.size(s, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(s, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        k = stabilityfactor_loop(s)
+        s12 = np.abs(s[0, 1])
+        s21 = np.abs(s[1, 0])
+        if k > 1.:
+            # Maximum available gain
+            return (k - np.sqrt(k**2 - 1)) * (s21 / s12)
+        else:
+            # Maximum stable gain
+            return (s21 / s12)
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Stability factor (K factor)
+def stabilityfactor_loop(s):
+    if s.ndim == 3:
+        k = np.zeros(np.size(s, 0))
+        for i in range(np.size(s, 0)):
+            k[i] = stabilityfactor_loop(s[i])
+        return k
+
+    elif s.ndim == 2:
+        if np.size(s, 0) != np.size(s, 1):
+            raise RuntimeError('Not a square matrix!!!')
+
+        if np.size(s, 0) != 2:
+            raise RuntimeError('Must be a 2x2 matrix!!!')
+
+        det = np.abs(np.linalg.det(s))
+        s11 = np.abs(s[0, 0])
+        s12 = np.abs(s[0, 1])
+        s21 = np.abs(s[1, 0])
+        s22 = np.abs(s[1, 1])
+        k = (1. - s11**2 - s22**2 + det**2) / (2. * s21 * s12)
+        return k
+
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Group delay
+def groupdelay_loop(s, frequency):
+    if np.size(s, 0) != len(frequency):
+        raise RuntimeError('S and frequency must be the same vector length')
+
+    if s.ndim == 3:
+        if np.size(s, 0) == 1:
+            raise RuntimeError('Group delay calculation requires two or more data points')
+        else:
+            tg = s.copy()
+            dphi = np.mod(np.angle(s[1]) - np.angle(s[0]), 2 * np.pi)
+            domega = 2 * np.pi * (frequency[1] - frequency[0])
+            tg[0] = dphi / domega
+
+            for i in range(1, np.size(s, 0)):
+                dphi = np.mod(np.angle(s[i]) - np.angle(s[i - 1]), 2 * np.pi)
+                domega = 2 * np.pi * (frequency[i] - frequency[i - 1])
+                tg[i] = dphi / domega
+            return tg
+    else:
+        raise RuntimeError('Unexpected dimension')
+
+
+# Writes SnP file by string concatenation (reference writer)
+def writesnp_loop(s, frequency, path, FREQ_UNITS = 'HZ', TYPE = 'S', FORMAT = 'RI', Z0 = 50.):
+    FREQ_UNITS = FREQ_UNITS.upper()
+    TYPE = TYPE.upper()
+    FORMAT = FORMAT.upper()
+    n = np.size(s, 1)
+    indices = [(0, 0), (1, 0), (0, 1), (1, 1)] if n == 2\
+            else [(i, j) for i in range(n) for j in range(n)]
+
+    # Option line
+    text = '# '+FREQ_UNITS+' '+TYPE+' '+FORMAT+' R {:f}\n'.format(Z0)
+
+    # Header line (comment)
+    text += '{:<12}'.format('! FREQ('+FREQ_UNITS+')')
+    for m, (i, j) in enumerate(indices):
+        PREFIX = {'MA':('mag', 'ang'), 'DB':('db', 'ang'), 'RI':('re', 'im')}
+        SUFFIX = ('{}{}' if n < 9 else '[{},{}]').format(i + 1, j + 1)
+        text += '  {:<12}'.format(PREFIX[FORMAT][0]+TYPE+SUFFIX)
+        text += '  {:<12}'.format(PREFIX[FORMAT][1]+TYPE+SUFFIX)
+        if m == len(indices) - 1:
+            text += '\n'
+        elif (m + 1) % 4 == 0:
+            text += '\n{:<12}'.format('!')
+
+    # Data lines
+    for k, freq_ in enumerate(frequency):
+        UNIT = {'HZ':1e0, 'KHZ':1e3, 'MHZ':1e6, 'GHZ':1e9}
+        text += '{:.6e}'.format(freq_ / UNIT[FREQ_UNITS])
+        for m, (i, j) in enumerate(indices):
+            x = s[k][i, j]
+            a = np.abs(x) if FORMAT == 'MA'\
+                    else 20 * np.log10(np.abs(x)) if FORMAT == 'DB'\
+                    else np.real(x)
+            b = np.angle(x) / np.pi * 180. if FORMAT in ['MA', 'DB']\
+                    else np.imag(x)
+            text += ' {:13.6e}'.format(a)
+            text += ' {:13.6e}'.format(b)
+            if m == len(indices) - 1:
+                text += '\n'
+            elif (m + 1) % 4 == 0:
+                text += '\n{:<12}'.format('')
+
+    # Write file
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+# Cascades 2-port networks point by point (reference cascade, same frequency grid)
+def cascade_loop(*networks) -> tuple:
+    frequency = networks[0][1]
+    s = networks[0][0].copy()
+    for k in range(len(frequency)):
+        t = stot_loop(networks[0][0][k])
+        for network in networks[1:]:
+            t = t @ stot_loop(network[0][k])
+        s[k] = ttos_loop(t)
+    return (s, frequency)
+
+
+# Resamples element by element with np.interp (reference linear resampler)
+def resample_loop(x, frequency, newFrequency):
+    y = np.zeros((len(newFrequency),) + x.shape[1:], dtype=x.dtype)
+    for index in np.ndindex(x.shape[1:]):
+        element = x[(slice(None),) + index]
+        y[(slice(None),) + index] = np.interp(newFrequency, frequency, np.real(element))\
+                + 1j * np.interp(newFrequency, frequency, np.imag(element))
+    return y
+
+
+#--------------------------------------------------------------------------------------------------
+# Helpers
+#--------------------------------------------------------------------------------------------------
+
+# Random passive-looking network (F, N, N)
+def randomnetwork(numPoints:int, numPorts:int, seed:int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    shape = (numPoints, numPorts, numPorts)
+    s = 0.5 * (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)) / numPorts
+    frequency = np.linspace(1e6, 20e9, numPoints)
+    return (s, frequency)
+
+
+# Writes a SnP file with four value pairs per line
+def dumpsnp(s, frequency, path:str, FORMAT:str = 'RI'):
+    numPoints, n = np.size(s, 0), np.size(s, 1)
+    rows, cols = nyanRF._dataindices(n)
+    x = s[:, rows, cols]
+    a = np.abs(x) if FORMAT == 'MA'\
+            else 20 * np.log10(np.abs(x)) if FORMAT == 'DB'\
+            else np.real(x)
+    b = np.angle(x) / np.pi * 180. if FORMAT in ['MA', 'DB']\
+            else np.imag(x)
+    data = np.zeros((numPoints, 2 * n**2 + 1))
+    data[:, 0] = frequency / 1e9
+    data[:, 1::2] = a
+    data[:, 2::2] = b
+    with open(path, 'w') as f:
+        f.write('# GHZ S '+FORMAT+' R 50\n')
+        np.savetxt(f, data, fmt='%.9e')
+
+
+# Writes a Touchstone 2.0 file (RI) with the given [Matrix Format], one frequency point per line
+def dumpts(s, frequency, path:str, matrixFormat:str = 'Full'):
+    numPoints, n = np.size(s, 0), np.size(s, 1)
+    rows, cols = nyanRF._storageindices(n, matrixFormat.upper(), '12_21')
+    data = np.zeros((numPoints, 2 * len(rows) + 1))
+    data[:, 0] = frequency / 1e9
+    data[:, 1::2] = np.real(s[:, rows, cols])
+    data[:, 2::2] = np.imag(s[:, rows, cols])
+    with open(path, 'w') as f:
+        f.write('[Version] 2.0\n# GHz S RI R 50\n[Number of Ports] {}\n'.format(n))
+        f.write('[Two-Port Data Order] 12_21\n' if n == 2 else '')
+        f.write('[Number of Frequencies] {}\n[Matrix Format] {}\n[Network Data]\n'.format(numPoints, matrixFormat))
+        np.savetxt(f, data, fmt='%.9e')
+        f.write('[End]\n')
+
+
+# Best wall-clock time of func(*args) in seconds
+def timeit(func, *args, repeat:int = 3) -> float:
+    best = np.inf
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title:str, reference:float, vectorized:float):
+    print('{:<40} loop {:9.4f} s   vectorized {:9.4f} s   x{:.1f}'.format(\
+            title, reference, vectorized, reference / vectorized))
+
+
+#--------------------------------------------------------------------------------------------------
+# Benchmarks
+#--------------------------------------------------------------------------------------------------
+
+def benchmark_loadsnp(numPoints:int = 16001, ports:tuple = (4, 8, 12)):
+    with tempfile.TemporaryDirectory() as directory:
+        for n in ports:
+            for FORMAT in ['RI', 'MA', 'DB']:
+                s, frequency = randomnetwork(numPoints, n)
+                path = os.path.join(directory, 'bench.s{}p'.format(n))
+                dumpsnp(s, frequency, path, FORMAT)
+                report('loadsnp {}-port {} ({} pts)'.format(n, FORMAT, numPoints),\
+                        timeit(loadsnp_loop, path, repeat=1), timeit(nyanRF.loadsnp, path, False))
+
+
+def benchmark_streamsnp(numPoints:int = 50001, ports:tuple = (16,), chunkBytes:int = 1 << 22):
+    with tempfile.TemporaryDirectory() as directory:
+        for n in ports:
+            s, frequency = randomnetwork(numPoints, n)
+            path = os.path.join(directory, 'bench.s{}p'.format(n))
+            dumpsnp(s, frequency, path)
+            del s, frequency
+
+            (s1, f1), peak1 = nyanRF.peakmemory(nyanRF.loadsnp, path, False)
+            (s2, f2), peak2 = nyanRF.peakmemory(nyanRF.streamsnp, path, chunkBytes)
+            print('{:<40} result {:7.1f} MB   loadsnp peak {:7.1f} MB   streamsnp peak {:7.1f} MB'\
+                    .format('streamsnp {}-port ({} pts)'.format(n, numPoints),\
+                    s1.nbytes / 1e6, peak1 / 1e6, peak2 / 1e6))
+
+
+def benchmark_networkcache(numFiles:int = 200, numPoints:int = 2001, numPorts:int = 4):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(numFiles):
+            s, frequency = randomnetwork(numPoints, numPorts, seed=i)
+            paths.append(os.path.join(directory, 'bench{}.s{}p'.format(i, numPorts)))
+            dumpsnp(s, frequency, paths[-1])
+
+        cache = nyanRF.networkcache()
+        nyanRF.setnetworkcache(NetworkCache(os.path.join(directory, 'cache')))
+        try:
+            parse = lambda: [nyanRF.loadsnp(path, False) for path in paths]
+            cold = lambda: [nyanRF.loadsnp(path, True) for path in paths]
+            warm = lambda: [nyanRF.loadsnp(path, True) for path in paths]
+            print('{:<40} parse {:9.4f} s   cold cache {:9.4f} s   warm cache {:9.4f} s'.format(\
+                    'networkcache {} files'.format(numFiles),\
+                    timeit(parse, repeat=1), timeit(cold, repeat=1), timeit(warm)))
+        finally:
+            nyanRF.setnetworkcache(cache)
+
+
+def benchmark_conversions(numPoints:int = 10001, ports:tuple = (2, 4, 8, 16)):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        zref = 50. + 5. * np.arange(n) - 2j * np.arange(n)
+        z = nyanRF.stoz(s, zref)
+        cases = [('stoz', stoz_loop, nyanRF.stoz, (s, zref)),\
+                ('ztos', ztos_loop, nyanRF.ztos, (z, zref)),\
+                ('ztoy', ztoy_loop, nyanRF.ztoy, (z,))]
+        if n == 2:
+            cases += [('stot', stot_loop, nyanRF.stot, (s,)),\
+                    ('ttos', ttos_loop, nyanRF.ttos, (nyanRF.stot(s),)),\
+                    ('ztoh', ztoh_loop, nyanRF.ztoh, (z,)),\
+                    ('htoz', htoz_loop, nyanRF.htoz, (nyanRF.ztoh(z),)),\
+                    ('ztoa', ztoa_loop, nyanRF.ztoa, (z,)),\
+                    ('atoz', atoz_loop, nyanRF.atoz, (nyanRF.ztoa(z),)),\
+                    ('ytoz', ytoz_loop, nyanRF.ytoz, (nyanRF.ztoy(z),))]
+
+        for name, reference, vectorized, args in cases:
+            report('{} {}-port ({} pts)'.format(name, n, numPoints),\
+                    timeit(reference, *args, repeat=1), timeit(vectorized, *args))
+
+
+def benchmark_stability(numPoints:int = 10001, numBias:int = 100):
+    s, frequency = randomnetwork(numPoints, 2)
+    s[:, 1, 0] *= 10. # Active device
+    for name, reference, vectorized in [('stabilityfactor', stabilityfactor_loop, nyanRF.stabilityfactor),\
+            ('maxgain', maxgain_loop, nyanRF.maxgain)]:
+        report('{} ({} pts)'.format(name, numPoints), timeit(reference, s, repeat=1), timeit(vectorized, s))
+
+    # All metrics over a bias sweep (B, F, 2, 2)
+    bias = np.broadcast_to(s[:numPoints // 10], (numBias, numPoints // 10, 2, 2))
+    print('{:<40} {:9.4f} s'.format('stabilitymetrics ({} x {} pts)'.format(numBias, numPoints // 10),\
+            timeit(nyanRF.stabilitymetrics, bias)))
+
+
+def benchmark_groupdelay(numPoints:int = 50001, ports:tuple = (2, 8)):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        report('groupdelay {}-port ({} pts)'.format(n, numPoints),\
+                timeit(groupdelay_loop, s, frequency, repeat=1), timeit(nyanRF.groupdelay, s, frequency))
+
+
+def benchmark_writesnp(numPoints:int = 50001, ports:tuple = (2, 4, 12)):
+    with tempfile.TemporaryDirectory() as directory:
+        for n in ports:
+            s, frequency = randomnetwork(numPoints, n)
+            path1 = os.path.join(directory, 'loop.s{}p'.format(n))
+            path2 = os.path.join(directory, 'bench.s{}p'.format(n))
+            for FORMAT in ['RI', 'MA', 'DB']:
+                # The reference writer is quadratic, so it only runs on a slice
+                count = min(numPoints, 2001)
+                reference = timeit(writesnp_loop, s[:count], frequency[:count], path1, 'GHZ', 'S', FORMAT,\
+                        repeat=1) * numPoints / count
+                vectorized = timeit(nyanRF.writesnp, s, frequency, path2, 'GHZ', 'S', FORMAT)
+                report('writesnp {}-port {} ({} pts, loop est.)'.format(n, FORMAT, numPoints),\
+                        reference, vectorized)
+
+            print('{:<40} {:9.4f} s'.format('writesnp {}-port .gz'.format(n),\
+                    timeit(nyanRF.writesnp, s, frequency, path2 + '.gz', repeat=1)))
+
+
+def benchmark_cascade(numPoints:int = 20001, numNetworks:int = 4, numDuts:int = 100):
+    networks = [randomnetwork(numPoints, 2, seed=i) for i in range(numNetworks)]
+    report('cascade {} x 2-port ({} pts)'.format(numNetworks, numPoints),\
+            timeit(cascade_loop, *networks, repeat=1), timeit(nyanRF.cascade, *networks))
+
+    # Daily job: one fixture pair, many DUT files
+    left, right = networks[:2]
+    grid = randomnetwork(numPoints // 10, 2)[1]
+    onGrid = lambda network: (nyanRF.resample(network[0], network[1], grid), grid)
+    duts = [nyanRF.cascade(onGrid(left), randomnetwork(numPoints // 10, 2, seed=i), onGrid(right))\
+            for i in range(numDuts)]
+    print('{:<40} {:9.4f} s'.format('deembed {} DUTs ({} pts)'.format(numDuts, numPoints // 10),\
+            timeit(lambda: [nyanRF.deembed(network, left, right) for network in duts])))
+
+
+def benchmark_resample(numPoints:int = 10001, ports:tuple = (4, 16), numFiles:int = 50):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        newFrequency = np.linspace(frequency[0], frequency[-1], numPoints // 2 + 7)
+        report('resample linear {}-port ({} pts)'.format(n, numPoints),\
+                timeit(resample_loop, s, frequency, newFrequency, repeat=1),\
+                timeit(nyanRF.resample, s, frequency, newFrequency))
+
+    # A delay line: cubic and polar interpolation follow the rotation much closer than linear
+    frequency = np.linspace(1e9, 2e9, 101)
+    newFrequency = np.linspace(1e9, 2e9, 1001)
+    line = lambda f: np.exp(-2j * np.pi * f * 3e-9)
+    for method, polar in [('linear', False), ('cubic', False), ('linear', True)]:
+        error = np.max(np.abs(nyanRF.resample(line(frequency), frequency, newFrequency, method, polar)\
+                - line(newFrequency)))
+        print('{:<40} max error {:.2e}'.format('resample {}{} delay line'.format(method, ' polar' * polar), error))
+
+    # Many files measured on the same grid reuse the cached weights
+    files = [randomnetwork(numPoints // 10, 4, seed=i)[0] for i in range(numFiles)]
+    frequency = randomnetwork(numPoints // 10, 4)[1]
+    newFrequency = np.sort(np.random.default_rng(0).uniform(frequency[0], frequency[-1], numPoints // 10))
+    uncached = lambda: [nyanRF._applyweights(x, *nyanRF._interpolationweights(frequency, newFrequency, 'cubic'))\
+            for x in files]
+    cached = lambda: [nyanRF.resample(x, frequency, newFrequency, 'cubic') for x in files]
+    print('{:<40} weights per file {:9.4f} s   cached weights {:9.4f} s'.format(\
+            'resample cubic {} files'.format(numFiles), timeit(uncached), timeit(cached)))
+
+
+# Largest display differences (dB, degrees) between two parameter vectors
+def displayerror(x1, x2) -> tuple:
+    dB = np.max(np.abs(20. * np.log10(np.abs(x1)) - 20. * np.log10(np.abs(x2))))
+    deg = np.max(np.abs(np.angle(x1 / x2, deg=True)))
+    return (dB, deg)
+
+
+def benchmark_precision(numPoints:int = 20001, numPorts:int = 8):
+    # The error bounds are asserted in tests/test_precision.py
+    derive = {'S': lambda s: s, 'Z': lambda s: nyanRF.stoz(s), 'Y': lambda s: nyanRF.ztoy(nyanRF.stoz(s))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        s, frequency = randomnetwork(numPoints, numPorts)
+        path = os.path.join(directory, 'bench.s{}p'.format(numPorts))
+        dumpsnp(s, frequency, path)
+        s1, f1 = nyanRF.loadsnp(path, False)
+        s2, f2 = nyanRF.loadsnp(path, False, np.complex64)
+
+    for name in ['S', 'Z', 'Y']:
+        x1, x2 = derive[name](s1), derive[name](s2)
+        dB, deg = displayerror(x1, x2)
+        print('{:<40} {:7.1f} MB -> {:7.1f} MB   max error {:.1e} dB {:.1e} deg'.format(\
+                '{} complex64 {}-port ({} pts)'.format(name, numPorts, numPoints),\
+                x1.nbytes / 1e6, x2.nbytes / 1e6, dB, deg))
+
+        if name == 'S':
+            continue
+        print('{:<40} complex128 {:9.4f} s   complex64 {:9.4f} s'.format(\
+                '{} {}-port ({} pts)'.format(name, numPorts, numPoints),\
+                timeit(derive[name], s1), timeit(derive[name], s2)))
+
+
+def benchmark_multiport(numPoints:int = 10001, ports:tuple = (4, 8, 16)):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        z = nyanRF.stoz(s)
+        for name, forward, inverse, x in [('stot/ttos', nyanRF.stot, nyanRF.ttos, s),\
+                ('ztoh/htoz', nyanRF.ztoh, nyanRF.htoz, z), ('ztoa/atoz', nyanRF.ztoa, nyanRF.atoz, z)]:
+            print('{:<40} {:9.4f} s'.format('{} {}-port ({} pts)'.format(name, n, numPoints),\
+                    timeit(lambda: inverse(forward(x)))))
+
+        # Every port pair at once
+        pairs = nyanRF.portpairs(n)
+        print('{:<40} {:9.4f} s'.format('maxgain {} port pairs ({} pts)'.format(n * n, numPoints),\
+                timeit(nyanRF.maxgain, s, pairs)))
+
+
+# Reference: textbook mixed-mode terms, one element at a time
+def mixedmode_loop(s, pairs:list):
+    numPoints, p = len(s), len(pairs)
+    smm = np.zeros((numPoints, 2 * p, 2 * p), dtype=complex)
+    for i in range(numPoints):
+        for k, (a, b) in enumerate(pairs):
+            for l, (c, d) in enumerate(pairs):
+                smm[i, k, l] = 0.5 * (s[i, a, c] - s[i, a, d] - s[i, b, c] + s[i, b, d])
+                smm[i, k, p + l] = 0.5 * (s[i, a, c] + s[i, a, d] - s[i, b, c] - s[i, b, d])
+                smm[i, p + k, l] = 0.5 * (s[i, a, c] - s[i, a, d] + s[i, b, c] - s[i, b, d])
+                smm[i, p + k, p + l] = 0.5 * (s[i, a, c] + s[i, a, d] + s[i, b, c] + s[i, b, d])
+    return smm
+
+
+def benchmark_mixedmode(numPoints:int = 10001, ports:tuple = (4, 8, 16)):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        pairs = nyanRF.differentialpairs(n)
+
+        # The reference loop is timed on a slice, it is far too slow for the whole sweep
+        numLoop = min(numPoints, 1001)
+        print('{:<40} {:9.4f} s   stomm {:9.4f} s'.format(\
+                'mixed-mode loop {}-port ({} pts)'.format(n, numLoop),\
+                timeit(mixedmode_loop, s[:numLoop], pairs), timeit(nyanRF.stomm, s[:numLoop], pairs)))
+        print('{:<40} {:9.4f} s'.format('stomm {}-port ({} pts)'.format(n, numPoints),\
+                timeit(nyanRF.stomm, s, pairs)))
+
+
+# Reference: SVD and transpose one frequency point at a time
+def diagnostics_loop(s):
+    numPoints = len(s)
+    sigma = np.zeros(numPoints)
+    error = np.zeros(numPoints)
+    for i in range(numPoints):
+        sigma[i] = np.linalg.svd(s[i], compute_uv=False)[0]
+        error[i] = np.sqrt(np.sum(np.abs(s[i] - s[i].T)**2))
+    return (sigma, error)
+
+
+def benchmark_diagnostics(numPoints:int = 10001, ports:tuple = (2, 4, 16)):
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+        print('{:<40} {:9.4f} s   vectorized {:9.4f} s'.format(\
+                'passivity/reciprocity {}-port ({} pts)'.format(n, numPoints), timeit(diagnostics_loop, s),\
+                timeit(lambda s: (diagnostics.passivity(s), diagnostics.reciprocity(s)), s)))
+        print('{:<40} {:9.4f} s'.format('causality {}-port ({} pts)'.format(n, numPoints),\
+                timeit(diagnostics.causality, s, frequency)))
+
+
+# Reference: per-point round trip through Z for every candidate reference
+def renormalize_loop(s, zref, candidates):
+    return np.array([ztos_loop(stoz_loop(s, zref), znew) for znew in candidates])
+
+
+def benchmark_renormalize(numPoints:int = 1001, ports:tuple = (2, 4), numCandidates:int = 256):
+    candidates = np.linspace(10., 100., numCandidates) + 1j * np.linspace(-20., 20., numCandidates)
+    for n in ports:
+        s, frequency = randomnetwork(numPoints, n)
+
+
+        # The reference loop is timed on a few candidates and scaled
+        print('{:<40} {:9.4f} s   renormalize {:9.4f} s'.format(\
+                '{} candidates {}-port ({} pts)'.format(numCandidates, n, numPoints),\
+                timeit(renormalize_loop, s, 50., candidates[:8], repeat=1) * numCandidates / 8,\
+                timeit(nyanRF.renormalize, s, 50., candidates[:, None, None])))
+
+
+def benchmark_touchstone2(numPoints:int = 10001, ports:tuple = (4, 16)):
+    with tempfile.TemporaryDirectory() as directory:
+        for n in ports:
+            # Reciprocal network, so that the triangular formats hold all of it
+            s, frequency = randomnetwork(numPoints, n)
+            s = s + np.swapaxes(s, 1, 2)
+            sizes, times = {}, {}
+            for matrixFormat in ['Full', 'Upper', 'Lower']:
+                path = os.path.join(directory, 'bench_{}.ts'.format(matrixFormat))
+                dumpts(s, frequency, path, matrixFormat)
+                sizes[matrixFormat] = os.path.getsize(path)
+                times[matrixFormat] = timeit(readnetwork, path, False)
+
+            print('{:<40} full {:7.1f} MB {:7.4f} s   upper {:7.1f} MB {:7.4f} s   lower {:7.4f} s'.format(\
+                    'readnetwork {}-port ({} pts)'.format(n, numPoints), sizes['Full'] / 1e6, times['Full'],\
+                    sizes['Upper'] / 1e6, times['Upper'], times['Lower']))
+
+
+# Reference: noise figure and available gain per frequency and source reflection
+def noise_loop(s, gammaS, nfmin, gammaOpt, rn, z0 = 50.):
+    nf = np.empty(np.shape(gammaS))
+    ga = np.empty(np.shape(gammaS))
+    for f in range(np.size(gammaS, 0)):
+        s11, s12, s21, s22 = s[f, 0, 0], s[f, 0, 1], s[f, 1, 0], s[f, 1, 1]
+        delta = s11 * s22 - s12 * s21
+        fmin = 10.**(nfmin[f] / 10.)
+        for k in range(np.size(gammaS, 1)):
+            g = gammaS[f, k]
+            nf[f, k] = 10. * np.log10(fmin + 4. * rn[f] / z0 * abs(g - gammaOpt[f])**2\
+                    / ((1. - abs(g)**2) * abs(1. + gammaOpt[f])**2))
+            ga[f, k] = abs(s21)**2 * (1. - abs(g)**2) / (abs(1. - s11 * g)**2 - abs(s22 - delta * g)**2)
+    return (nf, ga)
+
+
+def benchmark_noise(numPoints:int = 1001, numSources:int = 441):
+    s, frequency = randomnetwork(numPoints, 2)
+    nfmin = np.linspace(0.5, 2., numPoints)
+    gammaOpt = 0.4 * np.exp(1j * np.linspace(0., np.pi, numPoints))
+    rn = np.linspace(5., 20., numPoints)
+
+    # Source grid inside the unit circle, the same at every frequency
+    x = np.linspace(-0.9, 0.9, int(np.sqrt(numSources)))
+    grid = (x[:, None] + 1j * x[None, :]).ravel()
+    grid = grid[np.abs(grid) < 0.95]
+    gammaS = np.broadcast_to(grid, (numPoints, len(grid)))
+
+    def vectorized():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (nyanRF.noisefigure(grid[None, :], nfmin, gammaOpt, rn),\
+                    nyanRF.availablegain(s, grid[None, :]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        report('noise/gain {} sources ({} pts)'.format(len(grid), numPoints),\
+                timeit(noise_loop, s, gammaS, nfmin, gammaOpt, rn, repeat=1), timeit(vectorized))
+
+
+
+# Reference: one transform per matrix element
+def timeresponse_loop(s, frequency, mode:str = 'LOWPASS'):
+    n = np.size(s, 1)
+    responses = [[nyanRF.timeresponse(s[:, i, j], frequency, mode) for j in range(n)] for i in range(n)]
+    response = {'TIME': responses[0][0]['TIME']}
+    for name in responses[0][0]:
+        if name != 'TIME':
+            response[name] = np.stack([np.stack([r[name] for r in row], axis=-1) for row in responses], axis=-2)
+    return response
+
+
+def benchmark_timeresponse(numPoints:int = 10001, ports:tuple = (2, 16)):
+    # Ideal lines: delay tau_ij = (i + j + 1) * 0.1 ns, short circuits on the diagonal
+    frequency = np.linspace(10e6, 20e9, numPoints)
+    for n in ports:
+        tau = (np.arange(n)[:, None] + np.arange(n)[None, :] + 1) * 0.1e-9
+        s = np.exp(-2j * np.pi * frequency[:, None, None] * tau)
+        s[:, np.arange(n), np.arange(n)] = -1.
+        report('timeresponse {}-port ({} pts)'.format(n, numPoints),\
+                timeit(timeresponse_loop, s, frequency, repeat=1), timeit(nyanRF.timeresponse, s, frequency))
+
+
+if __name__ == '__main__':
+    benchmark_loadsnp()
+    benchmark_streamsnp()
+    benchmark_networkcache()
+    benchmark_conversions()
+    benchmark_stability()
+    benchmark_groupdelay()
+    benchmark_writesnp()
+    benchmark_cascade()
+    benchmark_resample()
+    benchmark_precision()
+    benchmark_multiport()
+    benchmark_mixedmode()
+    benchmark_diagnostics()
+    benchmark_renormalize()
+    benchmark_touchstone2()
+    benchmark_noise()
+    benchmark_timeresponse()
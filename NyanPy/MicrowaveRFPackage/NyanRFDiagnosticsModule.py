@@ -0,0 +1,185 @@
+import numpy as np
+import argparse
+import csv
+import os
+import sys
+
+import NyanRFModule as nyanRF
+from NetworkModule import readnetwork
+from NyanRFBatchModule import expandpaths, runfiles
+
+
+# Default screening limits
+PASSIVITY_TOLERANCE = 1e-6   # largest singular value allowed above 1
+RECIPROCITY_TOLERANCE = 1e-3 # ||S - S^T|| (Frobenius)
+CAUSALITY_TOLERANCE = 1e-2   # impulse response energy fraction before t = 0
+
+SUMMARY_HEADER = ['file', 'ports', 'points', 'max_sigma', 'f_max_sigma(Hz)', 'nonpassive_points',\
+        'max_reciprocity', 'f_max_reciprocity(Hz)', 'max_causality', 'worst_causality', 'passive', 'reciprocal',\
+        'causal']
+
+
+"""Passivity of a network
+A network is passive at a frequency if the largest singular value of S
+does not exceed 1. It is taken from the eigenvalues of S^H S, all
+frequency points at once.
+Args:
+    s (ndarray): S parameter vector (F, N, N)
+Returns:
+    (ndarray): largest singular value of S at each frequency (F,)
+"""
+def passivity(s):
+    nyanRF._checkmatrix(s)
+    gram = np.conj(np.swapaxes(s, -1, -2)) @ s
+    return np.sqrt(np.maximum(np.linalg.eigvalsh(gram)[..., -1], 0.))
+
+
+"""Reciprocity error of a network
+Args:
+    s (ndarray): S parameter vector (F, N, N)
+Returns:
+    (ndarray): Frobenius norm of S - S^T at each frequency (F,)
+"""
+def reciprocity(s):
+    nyanRF._checkmatrix(s)
+    return np.linalg.norm(s - np.swapaxes(s, -1, -2), axis=(-2, -1))
+
+
+"""Causality indicator of a network
+Each parameter is windowed (Hann) over the band and transformed to the time
+domain. The indicator is the fraction of the impulse response energy found
+at negative time, outside of a guard interval around t = 0 that holds the
+main lobe of the window. The band does not need to start at DC: the offset
+only modulates the impulse response, its envelope is the same. Responses
+delayed beyond half the period 1/df alias to negative time and are reported
+as well, the grid being too coarse for them.
+Args:
+    s         (ndarray): S parameter vector (F, N, N)
+    frequency (ndarray): ascending frequency vector (F,), resampled onto a
+                         uniform grid if needed
+    guard     (float)  : guard interval in 1 / bandwidth, defaults to 2
+                         (main lobe half-width of the Hann window)
+Returns:
+    (ndarray): non-causal energy fraction of each parameter (N, N)
+"""
+def causality(s, frequency, guard:float = 2.):
+    nyanRF._checkmatrix(s)
+    frequency = np.asarray(frequency, dtype=float)
+    if np.size(s, 0) != len(frequency):
+        raise RuntimeError('S and frequency must be the same vector length')
+
+    numPoints = len(frequency)
+    if numPoints < 4:
+        return np.full(np.shape(s)[1:], np.nan)
+
+    uniform = np.linspace(frequency[0], frequency[-1], numPoints)
+    if not np.allclose(frequency, uniform, rtol=0., atol=1e-6 * (uniform[1] - uniform[0])):
+        s = nyanRF.resample(s, frequency, uniform, polar=True)
+
+    # Zero padding only interpolates the response in time; a power of two keeps the FFT fast
+    df = uniform[1] - uniform[0]
+    nfft = 1 << int(np.ceil(np.log2(2 * numPoints)))
+    window = np.hanning(numPoints + 2)[1:-1].astype(nyanRF._realtype(s))
+    h = np.fft.ifft(s * window.reshape((-1,) + (1,) * (np.ndim(s) - 1)), n=nfft, axis=0)
+    energy = np.abs(h)**2
+
+    t = np.fft.fftfreq(nfft, df)
+    noncausal = t < -guard / (numPoints * df)
+    total = np.sum(energy, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0., np.sum(energy[noncausal], axis=0) / total, 0.)
+
+
+"""Screens a network
+Args:
+    s         (ndarray): S parameter vector (F, N, N)
+    frequency (ndarray): frequency vector (F,)
+Returns:
+    (dict): 'SIGMA' and 'RECIPROCITY' (F,) per frequency, 'CAUSALITY' (N, N) per parameter
+"""
+def diagnose(s, frequency) -> dict:
+    return {'SIGMA': passivity(s), 'RECIPROCITY': reciprocity(s), 'CAUSALITY': causality(s, frequency)}
+
+
+# Diagnostics --> one summary row
+def _summarize(path:str, s, frequency, values:dict, options:dict) -> list:
+    sigma, error, ratio = values['SIGMA'], values['RECIPROCITY'], values['CAUSALITY']
+    nonpassive = sigma > 1. + options['passivity']
+    i, j = np.unravel_index(np.nanargmax(ratio), np.shape(ratio)) if not np.all(np.isnan(ratio)) else (0, 0)
+    return [path, np.size(s, 1), len(frequency),\
+            '{:.9f}'.format(np.max(sigma)), '{:.9e}'.format(frequency[np.argmax(sigma)]), np.count_nonzero(nonpassive),\
+            '{:.6e}'.format(np.max(error)), '{:.9e}'.format(frequency[np.argmax(error)]),\
+            '{:.6e}'.format(ratio[i, j]), 'S{}{}'.format(i + 1, j + 1),\
+            'no' if np.any(nonpassive) else 'yes',\
+            'no' if np.max(error) > options['reciprocity'] else 'yes',\
+            'n/a' if np.isnan(ratio[i, j]) else 'no' if ratio[i, j] > options['causality'] else 'yes']
+
+
+"""Screens one SnP file (runs in a worker process)
+Args:
+    path    (str) : SnP file path
+    options (dict): tolerances and reading options, see main()
+Returns:
+    (tuple): (path, summary row or None, error message or None)
+"""
+def diagnosefile(path:str, options:dict) -> tuple:
+    try:
+        network = readnetwork(path, useCache=options['cache'])
+        s, frequency = network.sparameters(), network.frequency()
+        values = diagnose(s, frequency)
+        return (path, _summarize(path, s, frequency, values, options), None)
+    except Exception as e:
+        return (path, None, str(e))
+
+
+def _argumentparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m NyanPy.MicrowaveRFPackage.NyanRFDiagnosticsModule',\
+            description='Passivity, reciprocity and causality screening of Touchstone (SnP) files.')
+    parser.add_argument('patterns', nargs='+', help='SnP/Touchstone 2.0 files or glob patterns (** is recursive)')
+    parser.add_argument('-s', '--summary', help='summary CSV path, defaults to stdout')
+    parser.add_argument('--passivity', type=float, default=PASSIVITY_TOLERANCE,\
+            help='largest singular value allowed above 1 (default: {:g})'.format(PASSIVITY_TOLERANCE))
+    parser.add_argument('--reciprocity', type=float, default=RECIPROCITY_TOLERANCE,\
+            help='largest ||S - S^T|| allowed (default: {:g})'.format(RECIPROCITY_TOLERANCE))
+    parser.add_argument('--causality', type=float, default=CAUSALITY_TOLERANCE,\
+            help='largest non-causal energy fraction allowed (default: {:g})'.format(CAUSALITY_TOLERANCE))
+    parser.add_argument('--strict', action='store_true', help='exit with status 2 if any file fails a check')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',\
+            help='do not use the network cache for reading')
+    return parser
+
+
+def main(argv:list = None) -> int:
+    parser = _argumentparser()
+    args = parser.parse_args(argv)
+    paths = expandpaths(args.patterns)
+    if not paths:
+        parser.error('no files matched')
+
+    options = {key: getattr(args, key) for key in ['passivity', 'reciprocity', 'causality', 'cache']}
+
+    summary = open(args.summary, 'w', newline='') if args.summary else sys.stdout
+    writer = csv.writer(summary, lineterminator='\n')
+    writer.writerow(SUMMARY_HEADER)
+
+    violations = 0
+    def write(result:tuple):
+        nonlocal violations
+        row = result[1]
+        writer.writerow(row)
+        violations += 'no' in row[-3:]
+
+    try:
+        errors = runfiles(diagnosefile, paths, options, args.jobs, write)
+    finally:
+        if summary is not sys.stdout:
+            summary.close()
+
+    if violations:
+        print('{} of {} files failed a check'.format(violations, len(paths)), file=sys.stderr)
+    return 1 if errors else 2 if args.strict and violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,483 +1,1483 @@
 import numpy as np
 import os
 import re
+import gzip
+import mmap
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+from NetworkCacheModule import NetworkCache
+
+# Frequency unit multipliers
+FREQ_UNIT_SCALES = {'HZ':1e0, 'KHZ':1e3, 'MHZ':1e6, 'GHZ':1e9}
+
+# Option line (# <frequency unit> <parameter> <format> R <n>), any order, defaults:
+OPTION_DEFAULTS = {'FREQ_UNITS': 'GHZ', 'TYPE': 'S', 'FORMAT': 'MA', 'Z0': 50.}
+PARAMETER_TYPES = ['S', 'Y', 'Z', 'G', 'H']
+DATA_FORMATS = ['MA', 'DB', 'RI']
+
+# Touchstone 2.0 keyword and its argument (up to the next keyword)
+KEYWORD_PATTERN = re.compile(r'\[([^\]]+)\]([^\[]*)')
+INFORMATION_PATTERN = re.compile(r'\[\s*begin\s+information\s*\].*?\[\s*end\s+information\s*\]',\
+        re.IGNORECASE | re.DOTALL)
+
+
+# Row/column indices of the matrix elements in a data row.
+# 2-port files are stored in the column-major order (11, 21, 12, 22).
+def _dataindices(n:int) -> tuple:
+    if n == 2:
+        return (np.array([0, 1, 0, 1]), np.array([0, 0, 1, 1]))
+    rows, cols = np.divmod(np.arange(n * n), n)
+    return (rows, cols)
+
+
+# Pairs of data columns (a, b) --> complex values
+def _reconst(a, b, FORMAT:str):
+    if FORMAT == 'MA':
+        return a * np.exp(1j * b * np.pi / 180.)
+    elif FORMAT == 'DB':
+        return 10**(a / 20.) * np.exp(1j * b * np.pi / 180.)
+    else:
+        return a + 1j * b
+
+
+# Bytes per block when counting or converting tokens
+TOKEN_BLOCK_BYTES = 1 << 22
+
+
+# Number of whitespace separated tokens, counted block by block without splitting the text
+def _tokencount(text:str) -> int:
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    count = 0
+    previous = True # Whitespace before the text
+    for start in range(0, len(data), TOKEN_BLOCK_BYTES):
+        space = data[start:start + TOKEN_BLOCK_BYTES] <= 32
+        count += np.count_nonzero(space[:-1] & ~space[1:]) + int(previous and not space[0])
+        previous = bool(space[-1])
+    return count
+
+
+# Whitespace separated numbers --> float vector.
+# Converted line-aligned block by block, so the token list stays small next to the result.
+def _tokenize(text:str) -> np.ndarray:
+    blocks = []
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start + TOKEN_BLOCK_BYTES)
+        end = len(text) if end < 0 else end + 1
+        try:
+            blocks.append(np.array(text[start:end].split(), dtype=float))
+        except ValueError:
+            raise RuntimeError('loadsnp: invalid number in data lines')
+        start = end
+    return np.concatenate(blocks) if blocks else np.zeros(0)
+
+
+# Cache of parsed networks shared by the loaders
+_networkCache = NetworkCache()
+
+
+"""Returns the cache used by readsnp and loadsnp
+Returns:
+    (NetworkCache): cache, or None if caching is disabled
+"""
+def networkcache():
+    return _networkCache
+
+
+"""Replaces the cache used by readsnp and loadsnp
+Args:
+    cache (NetworkCache): new cache, or None to disable caching
+Returns:
+    None
+"""
+def setnetworkcache(cache):
+    global _networkCache
+    _networkCache = cache
+
+
+# SnP file path without the .gz suffix of compressed files
+def _uncompressedpath(path:str) -> str:
+    return path[:-3] if path.lower().endswith('.gz') else path
+
+
+# SnP file path --> port number
+def _portcount(path:str) -> int:
+    base, ext = os.path.splitext(_uncompressedpath(path))
+    matched = re.match(r'^.s[1-9][0-9]*p$', ext.lower())
+    if not matched:
+        raise RuntimeError('loadsnp: invalid file extension')
+    return int(ext[2:-1])
+
+
+# Strips comments and option lines from data text.
+# Once comments are gone, '#' only starts option lines.
+def _striptext(text:str) -> tuple:
+    text = re.sub(r'!.*', '', text)
+    options = []
+    start = text.find('#')
+    while start >= 0:
+        end = text.find('\n', start)
+        end = len(text) if end < 0 else end
+        options.append(text[start:end])
+        text = text[:start] + text[end:]
+        start = text.find('#', start)
+    return (text, options)
+
+
+# Option line --> dict of the fields it gives, or None if it is not a valid option line
+def _parseoptionline(line:str) -> dict:
+    words = line.strip().upper()[1:].split()
+    fields = {}
+    while words:
+        word = words.pop(0)
+        if word in FREQ_UNIT_SCALES:
+            fields['FREQ_UNITS'] = word
+        elif word in PARAMETER_TYPES:
+            fields['TYPE'] = word
+        elif word in DATA_FORMATS:
+            fields['FORMAT'] = word
+        elif word == 'R' and words:
+            try:
+                fields['Z0'] = float(words.pop(0))
+            except ValueError:
+                return None
+        else:
+            return None
+    return fields
+
+
+# Option lines --> (FREQ_UNITS, TYPE, FORMAT, Z0). The first valid line counts,
+# fields it leaves out take their default values.
+def _parseoptions(options:list) -> tuple:
+    for line in options:
+        fields = _parseoptionline(line)
+        if fields is not None:
+            fields = dict(OPTION_DEFAULTS, **fields)
+            return (fields['FREQ_UNITS'], fields['TYPE'], fields['FORMAT'], fields['Z0'])
+
+    raise RuntimeError('loadsnp: option line not found')
+
+
+# Row/column indices of the stored elements in a data row
+#   Full : all elements, row by row (2-ports in the order of [Two-Port Data Order])
+#   Upper: (1,1) (1,2) .. (1,N) (2,2) .. (N,N), Lower: (1,1) (2,1) (2,2) (3,1) ..
+def _storageindices(n:int, matrixFormat:str = 'FULL', twoPortOrder:str = '21_12') -> tuple:
+    if matrixFormat == 'UPPER':
+        return np.triu_indices(n)
+    elif matrixFormat == 'LOWER':
+        return np.tril_indices(n)
+    elif matrixFormat != 'FULL':
+        raise RuntimeError('loadsnp: invalid matrix format ' + matrixFormat)
+
+    if n == 2 and twoPortOrder == '12_21':
+        return (np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1]))
+    return _dataindices(n)
+
+
+# Touchstone 2.0 header --> {keyword (upper case): argument}
+def _parsekeywords(text:str) -> dict:
+    return {' '.join(keyword.upper().split()): argument.strip() for keyword, argument in KEYWORD_PATTERN.findall(text)}
+
+
+# Data text of a file without keywords --> (network data text, noise data text).
+# Touchstone 1.x 2-ports append noise parameters, whose first frequency is not
+# above the last network frequency, so the noise block starts at the first
+# frequency that does not increase.
+def _splitnoise(data:np.ndarray, columnCount:int) -> tuple:
+    frequency = data[:len(data) // columnCount * columnCount:columnCount]
+    stops = np.flatnonzero(np.diff(frequency) <= 0)
+    if len(stops) == 0:
+        return (data, np.zeros(0))
+    start = (stops[0] + 1) * columnCount
+    return (data[:start], data[start:])
+
+
+# Keywords of a Touchstone file --> (n, VERSION, MATRIX_FORMAT, rows, cols, columnCount, reference)
+def _touchstonelayout(keywords:dict, n:int, Z0:float) -> tuple:
+    VERSION = keywords.get('VERSION', '1.0')
+    if 'NUMBER OF PORTS' in keywords:
+        n = int(keywords['NUMBER OF PORTS'])
+    if not n:
+        raise RuntimeError('loadsnp: number of ports unknown')
+
+    MATRIX_FORMAT = keywords.get('MATRIX FORMAT', 'FULL').upper()
+    rows, cols = _storageindices(n, MATRIX_FORMAT, keywords.get('TWO-PORT DATA ORDER', '21_12'))
+    columnCount = 2 * len(rows) + 1
+
+    if 'REFERENCE' in keywords:
+        reference = _tokenize(keywords['REFERENCE'])
+        if len(reference) < n:
+            raise RuntimeError('loadsnp: [Reference] needs one impedance per port')
+        reference = reference[:n]
+    else:
+        reference = np.full(n, Z0)
+    return (n, VERSION, MATRIX_FORMAT, rows, cols, columnCount, reference)
+
+
+"""Parses the text of a Touchstone 1.x or 2.0 file
+Args:
+    text  (str) : file text
+    n     (int) : number of ports from the file extension, or None
+    dtype (type): storage type of the parameters
+Returns:
+    (dict): 'data' (F, N, N) as stored in the file (TYPE parameters, normalized
+            to R in 1.x files), 'frequency' (F,), 'noise' (F', 5) raw noise rows,
+            'FREQ_UNITS', 'TYPE', 'FORMAT', 'Z0' (option line R),
+            'REFERENCE' (N,) port reference impedances, 'VERSION' and 'MATRIX_FORMAT'
+"""
+def _parsetouchstone(text:str, n:int = None, dtype = complex) -> dict:
+    text, options = _striptext(text)
+    FREQ_UNITS, TYPE, FORMAT, Z0 = _parseoptions(options)
+
+    # Touchstone 2.0: keywords up to [Network Data], then the network and noise blocks.
+    # The information section is free text and skipped.
+    keywords = {}
+    noiseText = ''
+    if '[' in text:
+        text = INFORMATION_PATTERN.sub('', text)
+        parts = re.split(r'\[\s*network\s+data\s*\]', text, maxsplit=1, flags=re.IGNORECASE)
+        if len(parts) != 2:
+            raise RuntimeError('loadsnp: [Network Data] not found')
+        keywords = _parsekeywords(parts[0])
+        text = re.split(r'\[\s*end\s*\]', parts[1], maxsplit=1, flags=re.IGNORECASE)[0]
+        parts = re.split(r'\[\s*noise\s+data\s*\]', text, maxsplit=1, flags=re.IGNORECASE)
+        text, noiseText = parts if len(parts) == 2 else (parts[0], '')
+
+    n, VERSION, MATRIX_FORMAT, rows, cols, columnCount, reference = _touchstonelayout(keywords, n, Z0)
+
+    data = _tokenize(text)
+    noise = _tokenize(noiseText)
+    if 'NUMBER OF FREQUENCIES' in keywords:
+        rowCount = int(keywords['NUMBER OF FREQUENCIES'])
+        if len(data) < rowCount * columnCount:
+            raise RuntimeError('loadsnp: fewer data points than [Number of Frequencies]')
+    else:
+        if n == 2 and not keywords:
+            data, noise = _splitnoise(data, columnCount)
+        rowCount = int(len(data) / columnCount)
+    data = data[:rowCount * columnCount].reshape((rowCount, columnCount))
+    noise = noise[:len(noise) // 5 * 5].reshape((-1, 5))
+
+    # Triangular storage: the stored half is mirrored with the same index maps
+    x = np.zeros((rowCount, n, n), dtype=dtype)
+    x[:, rows, cols] = _reconst(data[:, 1::2], data[:, 2::2], FORMAT)
+    if MATRIX_FORMAT != 'FULL':
+        x[:, cols, rows] = x[:, rows, cols]
+
+    return {'data': x, 'frequency': data[:, 0] * FREQ_UNIT_SCALES[FREQ_UNITS], 'noise': noise,\
+            'FREQ_UNITS': FREQ_UNITS, 'TYPE': TYPE, 'FORMAT': FORMAT, 'Z0': Z0, 'REFERENCE': reference,\
+            'VERSION': VERSION, 'MATRIX_FORMAT': MATRIX_FORMAT}
+
+
+# Option names kept in the network cache entries besides the arrays
+TOUCHSTONE_OPTIONS = ['FREQ_UNITS', 'TYPE', 'FORMAT', 'Z0', 'VERSION', 'MATRIX_FORMAT']
+
+
+"""Reads and parses a Touchstone file, optionally through the network cache
+Args:
+    path     (str) : SnP (1.x) or Touchstone 2.0 file path
+    useCache (bool): look up and store the result in the network cache (off by default)
+    dtype    (type): storage type of the parameters
+Returns:
+    (dict): see _parsetouchstone()
+"""
+def _readtouchstone(path:str, useCache:bool = False, dtype = complex) -> dict:
+    try:
+        n = _portcount(path)
+    except RuntimeError:
+        n = None # Touchstone 2.0 files (.ts) give [Number of Ports]
+
+    cache = _networkCache if useCache else None
+    arrays = cache.load(path) if cache else None
+    if arrays and all(name in arrays for name in ['data', 'noise', 'REFERENCE'] + TOUCHSTONE_OPTIONS):
+        parsed = {name: arrays[name].item() for name in TOUCHSTONE_OPTIONS}
+        parsed.update({name: arrays[name] for name in ['frequency', 'noise', 'REFERENCE']})
+        parsed['data'] = arrays['data'].astype(dtype, copy=False)
+        return parsed
+
+    with (gzip.open(path, 'rt') if path != _uncompressedpath(path) else open(path, 'r')) as f:
+        text = f.read()
+
+    # Cache entries always keep full precision
+    parsed = _parsetouchstone(text, n, complex if cache else dtype)
+    if cache:
+        cache.save(path, parsed)
+    parsed['data'] = parsed['data'].astype(dtype, copy=False)
+    return parsed
+
+
+"""Reads SnP (touchstone) file with its option line
+With useCache, parsed networks are kept in the network cache, so reading
+an unchanged file again only loads the binary cache entry. The cache is
+skipped silently if its directory cannot be written. Touchstone 2.0 files are
+read as well; see readnetwork() for their metadata and noise parameters.
+Args:
+    path     (str) : SnP file path
+    useCache (bool): look up and store the result in the network cache (off by default)
+    dtype    (type): storage type of the parameters, complex (default) or np.complex64
+Returns:
+    s         (ndarray): parameter vector as stored in the file (TYPE parameters)
+    frequency (ndarray): frequency vector
+    options   (dict)   : option line ('FREQ_UNITS', 'TYPE', 'FORMAT' and 'Z0',
+                         a per-port vector if the [Reference] impedances differ)
+"""
+def readsnp(path:str, useCache:bool = False, dtype = complex) -> tuple:
+    parsed = _readtouchstone(path, useCache, dtype)
+
+    # Per-port references of 2.0 files are given as a vector
+    reference = parsed['REFERENCE']
+    Z0 = float(reference[0]) if np.all(reference == reference[0]) else reference
+    options = {'FREQ_UNITS': parsed['FREQ_UNITS'], 'TYPE': parsed['TYPE'], 'FORMAT': parsed['FORMAT'], 'Z0': Z0}
+    return (parsed['data'], parsed['frequency'], options)
+
 
 """Loads SnP (touchstone) file
 Args:
-    path (str): SnP file path
+    path     (str) : SnP file path
+    useCache (bool): look up and store the result in the network cache (off by default)
+    dtype    (type): storage type of the parameters, complex (default) or np.complex64
 Returns:
     s         (ndarray): S parameter vector
     frequency (ndarray): frequency vector
 """
-def loadsnp(path:str) -> tuple:
-    base, ext = os.path.splitext(path)
-    matched = re.match(r'^.s[1-9][0-9]*p$', ext)
-    if not matched:
-        raise RuntimeError('loadsnp: invalid file extension')
+def loadsnp(path:str, useCache:bool = False, dtype = complex) -> tuple:
+    s, frequency, options = readsnp(path, useCache, dtype)
+    return (s, frequency)
 
-    n = int(ext[2:-1])
-    data = []
-    with open(path, 'r') as f:
-        lines = f.readlines()
 
-    for line in lines:
-        line = line[:line.find('!')].strip().upper()
-        if not line:
-            continue
-        if line[0] == '#': # Option line
-            matched = re.match(r'#\s+(HZ|KHZ|MHZ|GHZ)\s+'\
-                    +r'(S|Y|Z|G|H)\s+(MA|DB|RI)\s+R\s+[+-]?([0-9]*[.])?[0-9]+', line)
-            if not matched:
+# SnP file --> bytes chunks of about chunkBytes split at line boundaries.
+# Plain files are memory-mapped, compressed files are decompressed block by block.
+def _textchunks(path:str, chunkBytes:int):
+    if path != _uncompressedpath(path):
+        with gzip.open(path, 'rb') as f:
+            carry = b''
+            while True:
+                block = f.read(chunkBytes)
+                if not block:
+                    break
+                block = carry + block
+                end = block.rfind(b'\n') + 1
+                carry = block[end:]
+                if end:
+                    yield block[:end]
+            if carry:
+                yield carry
+        return
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        start = 0
+        while start < len(mm):
+            end = mm.find(b'\n', min(start + chunkBytes, len(mm)) - 1)
+            end = len(mm) if end < 0 else end + 1
+            yield mm[start:end]
+            start = end
+    finally:
+        mm.close()
+
+
+# Section keywords of Touchstone 2.0 data --> section of the text that follows
+SECTION_PATTERN = re.compile(r'\[\s*(network\s+data|noise\s+data|end)\s*\]', re.IGNORECASE)
+SECTIONS = {'NETWORK DATA': 'NETWORK', 'NOISE DATA': 'NOISE', 'END': 'END'}
+
+
+# Stripped text chunks --> (section, text) pieces in file order. Touchstone 2.0 files
+# start with [Version], everything up to [Network Data] is 'HEADER'; 1.x files are
+# 'NETWORK' data throughout (a 2-port noise block is split off by the caller).
+def _touchstonesections(texts):
+    section = None
+    for text in texts:
+        if section is None:
+            if text.isspace() or not text:
                 continue
-            words = line.split()
-            FREQ_UNITS = words[1]
-            TYPE = words[2]
-            FORMAT = words[3]
-            Z0 = float(words[5])
-        else:
-            data += [float(s) for s in line.split()]
-
-    if 'FREQ_UNITS' not in locals():
-        raise RuntimeError('loadsnp: option line not found')
-
-    columnCount = 2 * n**2 + 1
-    rowCount = int(len(data) / columnCount)
-    data = np.array(data).reshape((rowCount, columnCount))
-    frequency = data[:, 0]
-    frequency *= 1e3 if FREQ_UNITS == 'KHZ'\
-            else 1e6 if FREQ_UNITS == 'MHZ'\
-            else 1e9 if FREQ_UNITS == 'GHZ'\
-            else 1
-    reconst = lambda a, b, FORMAT: a * np.exp(1j * b * np.pi / 180.) if FORMAT == 'MA'\
-            else 10**(a / 20.) * np.exp(1j * b * np.pi / 180.) if FORMAT == 'DB'\
-            else a + 1j * b
-    s = np.zeros((len(frequency), n, n), dtype=complex)
-    indices = [(0, 0), (1, 0), (0, 1), (1, 1)] if n == 2\
-            else [(i, j) for i in range(n) for j in range(n)]
-
-    for k in range(len(frequency)):
-        for m, (i, j) in enumerate(indices):
-            a = data[k, 1 + 2 * m]
-            b = data[k, 2 + 2 * m]
-            s[k][i, j] = reconst(a, b, FORMAT)
+            section = 'HEADER' if text.lstrip().startswith('[') else 'NETWORK'
+
+        pieces = SECTION_PATTERN.split(text)
+        yield (section, pieces[0])
+        for name, piece in zip(pieces[1::2], pieces[2::2]):
+            section = SECTIONS[' '.join(name.upper().split())]
+            yield (section, piece)
+
 
+"""Loads SnP (touchstone) file with bounded peak memory
+The file is memory-mapped (or decompressed block by block if it is a .gz
+file) and parsed chunk by chunk straight into a
+preallocated complex (F, N, N) array. Peak memory is the size of the
+result plus a few times chunkBytes. Touchstone 2.0 keywords and the noise
+block of 1.x 2-ports are handled like loadsnp does.
+Args:
+    path       (str) : SnP or .ts file path
+    chunkBytes (int) : size of the text chunks, defaults to 4 MiB
+    dtype      (type): storage type of the parameters, complex (default) or np.complex64
+Returns:
+    s         (ndarray): S parameter vector
+    frequency (ndarray): frequency vector
+"""
+def streamsnp(path:str, chunkBytes:int = 1 << 22, dtype = complex) -> tuple:
+    try:
+        n = _portcount(path)
+    except RuntimeError:
+        n = None # Touchstone 2.0 files (.ts) give [Number of Ports]
+
+    # Text chunks split at line boundaries, option lines are collected on the 1st pass
+    options = []
+    def texts(collect:bool = False):
+        for chunk in _textchunks(path, chunkBytes):
+            text, options_ = _striptext(chunk.decode())
+            if collect:
+                options.extend(options_)
+            yield text
+
+    # 1st pass: options, keywords and number of network values
+    header = ''
+    valueCount = 0
+    for section, text in _touchstonesections(texts(True)):
+        if section == 'HEADER':
+            header += text
+        elif section == 'NETWORK':
+            valueCount += _tokencount(text)
+
+    FREQ_UNITS, TYPE, FORMAT, Z0 = _parseoptions(options)
+    keywords = _parsekeywords(INFORMATION_PATTERN.sub('', header))
+    n, VERSION, MATRIX_FORMAT, rows, cols, columnCount, reference = _touchstonelayout(keywords, n, Z0)
+    rowCount = valueCount // columnCount
+    if 'NUMBER OF FREQUENCIES' in keywords:
+        if rowCount < int(keywords['NUMBER OF FREQUENCIES']):
+            raise RuntimeError('loadsnp: fewer data points than [Number of Frequencies]')
+        rowCount = int(keywords['NUMBER OF FREQUENCIES'])
+    splitNoise = n == 2 and not keywords
+    s = np.zeros((rowCount, n, n), dtype=dtype)
+    frequency = np.zeros(rowCount)
+
+    # 2nd pass: parse into the preallocated arrays
+    row = 0
+    carry = np.zeros(0)
+    previous = np.zeros(0) # Last row, for the noise block split at chunk boundaries
+    for section, text in _touchstonesections(texts()):
+        if section != 'NETWORK' or row == rowCount:
+            continue
+
+        data = np.concatenate((carry, _tokenize(text)))
+        if splitNoise:
+            data, noise = _splitnoise(np.concatenate((previous, data)), columnCount)
+            data = data[len(previous):]
+            if len(noise):
+                rowCount = row + len(data) // columnCount # The rest is noise data
+
+        count = min(len(data) // columnCount, rowCount - row)
+        block = data[:count * columnCount].reshape((count, columnCount))
+        frequency[row:row + count] = block[:, 0] * FREQ_UNIT_SCALES[FREQ_UNITS]
+        s[row:row + count, rows, cols] = _reconst(block[:, 1::2], block[:, 2::2], FORMAT)
+        if MATRIX_FORMAT != 'FULL':
+            s[row:row + count, cols, rows] = s[row:row + count, rows, cols]
+        carry = data[count * columnCount:]
+        previous = block[-1] if count else previous
+        row += count
+
+    # Only 1.x 2-ports with a noise block end early; they are small
+    if row < len(frequency):
+        return (s[:row].copy(), frequency[:row].copy())
     return (s, frequency)
 
 
+"""Returns the peak resident set size of this process
+Returns:
+    (int): peak RSS in bytes, or 0 if the platform does not report it
+"""
+def peakrss() -> int:
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),\
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),\
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),\
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),\
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),\
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),\
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+
+    return 0
+
+
+"""Measures the peak memory allocated while calling func
+Python and NumPy allocations are both traced, so the result does not
+depend on what the process allocated before the call.
+Args:
+    func (callable): function to call
+    *args, **kwargs: arguments passed to func
+Returns:
+    result (object): return value of func
+    peak   (int)   : peak traced memory in bytes
+"""
+def peakmemory(func, *args, **kwargs) -> tuple:
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return (result, peak)
+
+
+# Complex values --> pairs of data columns (a, b)
+def _deconst(x, FORMAT:str) -> tuple:
+    if FORMAT == 'MA':
+        return (np.abs(x), np.angle(x) / np.pi * 180.)
+    elif FORMAT == 'DB':
+        return (20 * np.log10(np.abs(x)), np.angle(x) / np.pi * 180.)
+    else:
+        return (np.real(x), np.imag(x))
+
+
 """Writes SnP (touchstone) file
+Data rows are converted with array operations and formatted chunkRows rows
+at a time with a single format call, then streamed to the file.
 Args:
     s          (ndarray): S parameter vector
     frequency  (ndarray): frequency vector
-    path       (str)    : SnP file path
+    path       (str)    : SnP file path, written gzip-compressed if it ends with .gz
     FREQ_UNITS (str)    : 'HZ' (default), 'KHZ', 'MHZ' or 'GHZ'
     TYPE       (str)    : 'S'  (default), 'Y', 'Z', 'G' or 'H'
     FORMAT     (str)    : 'RI' (default), 'MA' or 'DB'
     Z0         (float)  : reference impedance, defaults to 50.0 (Ohm)
+    chunkRows  (int)    : number of frequency points formatted at once
 Returns:
     None
 """
-def writesnp(s, frequency, path, FREQ_UNITS = 'HZ', TYPE = 'S', FORMAT = 'RI', Z0 = 50.):
+def writesnp(s, frequency, path, FREQ_UNITS = 'HZ', TYPE = 'S', FORMAT = 'RI', Z0 = 50.,\
+        chunkRows = 4096):
     FREQ_UNITS = FREQ_UNITS.upper()
     TYPE = TYPE.upper()
     FORMAT = FORMAT.upper()
     n = np.size(s, 1)
-    indices = [(0, 0), (1, 0), (0, 1), (1, 1)] if n == 2\
-            else [(i, j) for i in range(n) for j in range(n)]
+    rows, cols = _dataindices(n)
 
     # Option line
     text = '# '+FREQ_UNITS+' '+TYPE+' '+FORMAT+' R {:f}\n'.format(Z0)
 
     # Header line (comment)
     text += '{:<12}'.format('! FREQ('+FREQ_UNITS+')')
-    for m, (i, j) in enumerate(indices):
+    for m, (i, j) in enumerate(zip(rows, cols)):
         PREFIX = {'MA':('mag', 'ang'), 'DB':('db', 'ang'), 'RI':('re', 'im')}
         SUFFIX = ('{}{}' if n < 9 else '[{},{}]').format(i + 1, j + 1)
         text += '  {:<12}'.format(PREFIX[FORMAT][0]+TYPE+SUFFIX)
         text += '  {:<12}'.format(PREFIX[FORMAT][1]+TYPE+SUFFIX)
-        if m == len(indices) - 1:
+        if m == len(rows) - 1:
             text += '\n'
         elif (m + 1) % 4 == 0:
             text += '\n{:<12}'.format('!')
 
-    # Data lines
-    for k, freq_ in enumerate(frequency):
-        UNIT = {'HZ':1e0, 'KHZ':1e3, 'MHZ':1e6, 'GHZ':1e9}
-        text += '{:.6e}'.format(freq_ / UNIT[FREQ_UNITS])
-        for m, (i, j) in enumerate(indices):
-            x = s[k][i, j]
-            a = np.abs(x) if FORMAT == 'MA'\
-                    else 20 * np.log10(np.abs(x)) if FORMAT == 'DB'\
-                    else np.real(x)
-            b = np.angle(x) / np.pi * 180. if FORMAT in ['MA', 'DB']\
-                    else np.imag(x)
-            text += ' {:13.6e}'.format(a)
-            text += ' {:13.6e}'.format(b)
-            if m == len(indices) - 1:
-                text += '\n'
-            elif (m + 1) % 4 == 0:
-                text += '\n{:<12}'.format('')
+    # Data row format (four pairs per line)
+    rowFormat = '%.6e'
+    for m in range(len(rows)):
+        rowFormat += ' %13.6e %13.6e'
+        if m == len(rows) - 1:
+            rowFormat += '\n'
+        elif (m + 1) % 4 == 0:
+            rowFormat += '\n{:<12}'.format('')
 
     # Write file
-    with open(path, 'w') as f:
+    with (gzip.open(path, 'wt', compresslevel=6) if path != _uncompressedpath(path) else open(path, 'w')) as f:
         f.write(text)
+        for start in range(0, len(frequency), chunkRows):
+            stop = min(start + chunkRows, len(frequency))
+            a, b = _deconst(s[start:stop, rows, cols], FORMAT)
+            data = np.zeros((stop - start, 2 * len(rows) + 1))
+            data[:, 0] = frequency[start:stop] / FREQ_UNIT_SCALES[FREQ_UNITS]
+            data[:, 1::2] = a
+            data[:, 2::2] = b
+            f.write((rowFormat * (stop - start)) % tuple(data.ravel().tolist()))
+
+
+# Checks x is a (N, N) matrix or a (..., N, N) stack of matrices
+def _checkmatrix(x, twoPort:bool = False, evenPort:bool = False):
+    if x.ndim < 2:
+        raise RuntimeError('Unexpected dimension')
+
+    if np.size(x, -1) != np.size(x, -2):
+        raise RuntimeError('Not a square matrix!!!')
+
+    if twoPort and np.size(x, -1) != 2:
+        raise RuntimeError('Must be a 2x2 matrix!!!')
+
+    if evenPort and np.size(x, -1) % 2 != 0:
+        raise RuntimeError('Must be a 2N x 2N matrix!!!')
+
+
+# Complex type the converters compute and return x in: complex64 for single
+# precision input (complex64/float32), complex128 otherwise
+def _complextype(x) -> np.dtype:
+    return np.result_type(x, np.complex64)
+
+
+# Real type matching the precision of x
+def _realtype(x) -> np.dtype:
+    return np.finfo(np.result_type(x, np.float32)).dtype
+
+
+# Reference impedance --> per-port vector (N,) or per-frequency, per-port array (F, N)
+def _zrefvector(zref, n:int, dtype = complex) -> np.ndarray:
+    zref = np.asarray(zref, dtype=dtype)
+    if zref.ndim == 0:
+        return np.full(n, zref)
+
+    # A last axis of length 1 applies to all ports (e.g. candidate references (K, 1, 1))
+    if np.size(zref, -1) not in [1, n]:
+        raise RuntimeError('Zref vector length must be equal to the number of ports')
+    return zref
+
+
+# Elements of stacked 2x2 matrices --> (..., 2, 2)
+def _matrix2x2(x00, x01, x10, x11) -> np.ndarray:
+    return np.stack((np.stack((x00, x01), -1), np.stack((x10, x11), -1)), -2)
+
+
+# Elements and determinant of stacked 2x2 matrices
+def _elements2x2(x) -> tuple:
+    x00, x01, x10, x11 = x[..., 0, 0], x[..., 0, 1], x[..., 1, 0], x[..., 1, 1]
+    return (x00, x01, x10, x11, x00 * x11 - x01 * x10)
+
+
+# Blocks of stacked 2N x 2N matrices --> (x00, x01, x10, x11), each (..., N, N)
+def _blocks(x) -> tuple:
+    n = np.size(x, -1) // 2
+    return (x[..., :n, :n], x[..., :n, n:], x[..., n:, :n], x[..., n:, n:])
+
+
+# Blocks (..., N, N) --> stacked 2N x 2N matrices
+def _fromblocks(x00, x01, x10, x11) -> np.ndarray:
+    return np.concatenate((np.concatenate((x00, x01), -1), np.concatenate((x10, x11), -1)), -2)
 
 
 # S parameter --> T parameter
+#   [b1; a1] = T [a2; b2], ports 1..N on the left and N+1..2N on the right
+#   T = [[S12 - S11 S21^-1 S22, S11 S21^-1], [-S21^-1 S22, S21^-1]]
 def stot(s):
-    if s.ndim == 3:
-        t = s.copy()
-        for i in range(np.size(s, 0)):
-            t[i] = stot(s[i])
-        return t
-
-    elif s.ndim == 2:
-        if np.size(s, 0) != np.size(s, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(s, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        t = s.copy()
-        dets = np.linalg.det(s)
-        t[0, 0] =    -dets / s[1, 0]
-        t[0, 1] =  s[0, 0] / s[1, 0]
-        t[1, 0] = -s[1, 1] / s[1, 0]
-        t[1, 1] =       1. / s[1, 0]
-        return t
+    _checkmatrix(s, evenPort=True)
+    if np.size(s, -1) == 2:
+        s00, s01, s10, s11, dets = _elements2x2(s)
+        return _matrix2x2(-dets / s10, s00 / s10, -s11 / s10, 1. / s10)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    s00, s01, s10, s11 = _blocks(s)
+    t11 = np.linalg.inv(s10)
+    t01 = s00 @ t11
+    return _fromblocks(s01 - t01 @ s11, t01, -t11 @ s11, t11)
 
 
 # T parameter --> S parameter
+#   S = [[T12 T22^-1, T11 - T12 T22^-1 T21], [T22^-1, -T22^-1 T21]]
 def ttos(t):
-    if t.ndim == 3:
-        s = t.copy()
-        for i in range(np.size(t, 0)):
-            s[i] = ttos(t[i])
-        return s
-
-    elif t.ndim == 2:
-        if np.size(t, 0) != np.size(t, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(t, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        s = t.copy()
-        dett = np.linalg.det(t)
-        s[0, 0] =  t[0, 1] / t[1, 1]
-        s[0, 1] =     dett / t[1, 1]
-        s[1, 0] =       1. / t[1, 1]
-        s[1, 1] = -t[1, 0] / t[1, 1]
-        return s
+    _checkmatrix(t, evenPort=True)
+    if np.size(t, -1) == 2:
+        t00, t01, t10, t11, dett = _elements2x2(t)
+        return _matrix2x2(t01 / t11, dett / t11, 1. / t11, -t10 / t11)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    t00, t01, t10, t11 = _blocks(t)
+    s10 = np.linalg.inv(t11)
+    s00 = t01 @ s10
+    return _fromblocks(s00, t00 - s00 @ t10, s10, -s10 @ t10)
 
 
 # S parameter --> Z parameter
+#   Z = F^-1 (I - S)^-1 (S G + G*) F,  F = diag(1 / (2 sqrt|Re zref|)), G = diag(zref)
+# zref is a scalar, a per-port vector (N,) or a per-frequency array (F, N)
 def stoz(s, zref = 50.):
-    if s.ndim == 3:
-        z = s.copy()
-        for i in range(np.size(s, 0)):
-            z[i] = stoz(s[i], zref)
-        return z
-
-    elif s.ndim == 2:
-        if np.size(s, 0) != np.size(s, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        # Port number
-        n = np.size(s, 0)
-
-        if type(zref) in [list, np.ndarray]:
-            if len(zref) != n:
-                raise RuntimeError('Zref vector length must be equal to the number of ports')
-            else:
-                zref = np.array(zref)
-        else:
-            zref_ = np.zeros(n, dtype=complex)
-            zref_.fill(complex(zref))
-            zref = zref_
-
-        f = np.diag(0.5 / np.sqrt(np.abs(np.real(zref))))
-        g = np.diag(zref)
-        z = np.linalg.inv(f) @ np.linalg.inv(np.eye(n) - s) @ (s @ g + g.conj().T) @ f
-        return z
+    _checkmatrix(s)
+    n = np.size(s, -1)
+    zref = _zrefvector(zref, n, _complextype(s))
+    f = 0.5 / np.sqrt(np.abs(np.real(zref)))
+    eye = np.eye(n, dtype=zref.dtype)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    # F^-1 X F scales the element (i, j) by f_j / f_i
+    x = np.linalg.solve(eye - s, s * zref[..., None, :] + eye * np.conj(zref)[..., None, :])
+    return x * (f[..., None, :] / f[..., :, None])
 
 
 # Z parameter --> S parameter
+#   S = F (Z - G*) (Z + G)^-1 F^-1
 def ztos(z, zref = 50.):
-    if z.ndim == 3:
-        s = z.copy()
-        for i in range(np.size(z, 0)):
-            s[i] = ztos(z[i], zref)
-        return s
-
-    elif z.ndim == 2:
-        if np.size(z, 0) != np.size(z, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        # Port number
-        n = np.size(s, 0)
-
-        if type(zref) in [list, np.ndarray]:
-            if len(zref) != n:
-                raise RuntimeError('Zref vector length must be equal to the number of ports')
-            else:
-                zref = np.array(zref)
-        else:
-            zref_ = np.zeros(n, dtype=complex)
-            zref_.fill(complex(zref))
-            zref = zref_
-
-        f = np.diag(0.5 / np.sqrt(np.abs(np.real(zref))))
-        g = np.diag(zref)
-        s = f @ (z - g.conj().T) @ np.linalg.inv(z + g) @ np.linalg.inv(f)
-        return s
-
+    _checkmatrix(z)
+    n = np.size(z, -1)
+    zref = _zrefvector(zref, n, _complextype(z))
+    f = 0.5 / np.sqrt(np.abs(np.real(zref)))
+    eye = np.eye(n, dtype=zref.dtype)
+
+    # X (Z + G)^-1 = ((Z + G)^T \ X^T)^T
+    a = np.swapaxes(z + eye * zref[..., None, :], -1, -2)
+    b = np.swapaxes(z - eye * np.conj(zref)[..., None, :], -1, -2)
+    x = np.swapaxes(np.linalg.solve(a, b), -1, -2)
+    return x * (f[..., :, None] / f[..., None, :])
+
+
+"""Renormalizes S parameters to new reference impedances
+Power waves of the new reference follow from those of the old one
+without going through Z, so the whole sweep is one batched solve:
+    S' = D (Q S + I - Q) (I + P - P S)^-1 D^-1
+    P = (Z' - Z) / 2 Re Z, Q = (Z'* + Z) / 2 Re Z, D = sqrt(|Re Z| / |Re Z'|)
+References are complex, given as a scalar, per port (N,) or per frequency
+and port (F, N). Leading axes of znew broadcast against S, e.g. K candidate
+references (K, 1, N) or (K, F, N) give (K, F, N, N) in one call.
+Args:
+    s    (ndarray): S parameters (N, N) or (F, N, N)
+    zref (complex): reference impedance of s (e.g. Z0 of the SnP file)
+    znew (complex): new reference impedance
+Returns:
+    (ndarray): S parameters referred to znew
+"""
+def renormalize(s, zref, znew):
+    _checkmatrix(s)
+    n = np.size(s, -1)
+    dtype = _complextype(s)
+    z1 = _zrefvector(zref, n, dtype)
+    z2 = _zrefvector(znew, n, dtype)
+    if np.any(np.real(z1) <= 0) or np.any(np.real(z2) <= 0):
+        raise RuntimeError('Reference impedance must have a positive real part')
+
+    r1 = 2 * np.real(z1)
+    p = (z2 - z1) / r1
+    q = (np.conj(z2) + z1) / r1
+    d = np.sqrt(np.real(z1) / np.real(z2))
+    eye = np.eye(n, dtype=dtype)
+
+    a = eye * (1 + p)[..., None, :] - p[..., :, None] * s
+    b = q[..., :, None] * s + eye * (1 - q)[..., None, :]
+    if n == 2:
+        # B A^-1 element-wise, batched 2x2 solves are dominated by their overhead
+        a00, a01, a10, a11, deta = _elements2x2(a)
+        b00, b01, b10, b11, detb = _elements2x2(b)
+        x = _matrix2x2(b00 * a11 - b01 * a10, b01 * a00 - b00 * a01,\
+                b10 * a11 - b11 * a10, b11 * a00 - b10 * a01) / deta[..., None, None]
     else:
-        raise RuntimeError('Unexpected dimension')
+        # B A^-1 = (A^T \ B^T)^T
+        x = np.swapaxes(np.linalg.solve(np.swapaxes(a, -1, -2), np.swapaxes(b, -1, -2)), -1, -2)
+    return x * (d[..., :, None] / d[..., None, :])
 
 
 # Z parameter --> Y parameter
 def ztoy(z):
-    if z.ndim == 3:
-        y = z.copy()
-        for i in range(np.size(z, 0)):
-            y[i] = ztoy(z[i])
-        return y
-
-    elif z.ndim == 2:
-        if np.size(z, 0) != np.size(z, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        y = np.linalg.inv(z)
-        return y
-
-    else:
-        raise RuntimeError('Unexpected dimension')
+    _checkmatrix(z)
+    return np.linalg.inv(z)
 
 
 # Z parameter --> H parameter
+#   H = [[Z11 - Z12 Z22^-1 Z21, Z12 Z22^-1], [-Z22^-1 Z21, Z22^-1]] for 2N-ports
 def ztoh(z):
-    if z.ndim == 3:
-        h = z.copy()
-        for i in range(np.size(z, 0)):
-            h[i] = ztoh(z[i])
-        return h
-
-    elif z.ndim == 2:
-        if np.size(z, 0) != np.size(z, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(z, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        h = z.copy()
-        detz = np.linalg.det(z)
-        h[0, 0] =     detz / z[1, 1]
-        h[0, 1] =  z[0, 1] / z[1, 1]
-        h[1, 0] = -z[1, 0] / z[1, 1]
-        h[1, 1] =       1. / z[1, 1]
-        return h
+    _checkmatrix(z, evenPort=True)
+    if np.size(z, -1) == 2:
+        z00, z01, z10, z11, detz = _elements2x2(z)
+        return _matrix2x2(detz / z11, z01 / z11, -z10 / z11, 1. / z11)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    z00, z01, z10, z11 = _blocks(z)
+    h11 = np.linalg.inv(z11)
+    h01 = z01 @ h11
+    return _fromblocks(z00 - h01 @ z10, h01, -h11 @ z10, h11)
 
 
 # Z parameter --> ABCD parameter
+#   A = Z11 Z21^-1, B = Z11 Z21^-1 Z22 - Z12, C = Z21^-1, D = Z21^-1 Z22 for 2N-ports
 def ztoa(z):
-    if z.ndim == 3:
-        a = z.copy()
-        for i in range(np.size(z, 0)):
-            a[i] = ztoa(z[i])
-        return a
-
-    elif z.ndim == 2:
-        if np.size(z, 0) != np.size(z, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(z, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        a = z.copy()
-        detz = np.linalg.det(z)
-        a[0, 0] = z[0, 0] / z[1, 0]
-        a[0, 1] =    detz / z[1, 0]
-        a[1, 0] =      1. / z[1, 0]
-        a[1, 1] = z[1, 1] / z[1, 0]
-        return a
+    _checkmatrix(z, evenPort=True)
+    if np.size(z, -1) == 2:
+        z00, z01, z10, z11, detz = _elements2x2(z)
+        return _matrix2x2(z00 / z10, detz / z10, 1. / z10, z11 / z10)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    z00, z01, z10, z11 = _blocks(z)
+    c = np.linalg.inv(z10)
+    a = z00 @ c
+    return _fromblocks(a, a @ z11 - z01, c, c @ z11)
 
 
 # Y parameter --> Z parameter
 def ytoz(y):
-    if y.ndim == 3:
-        z = y.copy()
-        for i in range(np.size(y, 0)):
-            z[i] = ytoz(y[i])
-        return z
-
-    elif y.ndim == 2:
-        if np.size(y, 0) != np.size(y, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(y, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        z = y.copy()
-        dety = np.linalg.det(y)
-        z[0, 0] =  y[1, 1] / dety
-        z[0, 1] = -y[0, 1] / dety
-        z[1, 0] = -y[1, 0] / dety
-        z[1, 1] =  y[0, 0] / dety
-        return z
+    _checkmatrix(y)
+    if np.size(y, -1) != 2:
+        return np.linalg.inv(y)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    y00, y01, y10, y11, dety = _elements2x2(y)
+    return _matrix2x2(y11 / dety, -y01 / dety, -y10 / dety, y00 / dety)
 
 
 # H parameter --> Z parameter
+#   Z = [[H11 - H12 H22^-1 H21, H12 H22^-1], [-H22^-1 H21, H22^-1]] for 2N-ports
 def htoz(h):
-    if h.ndim == 3:
-        z = h.copy()
-        for i in range(np.size(h, 0)):
-            z[i] = htoz(h[i])
-        return z
-
-    elif h.ndim == 2:
-        if np.size(h, 0) != np.size(h, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(h, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        z = h.copy()
-        deth = np.linalg.det(h)
-        z[0, 0] =     deth / h[1, 1]
-        z[0, 1] =  h[0, 1] / h[1, 1]
-        z[1, 0] = -h[1, 0] / h[1, 1]
-        z[1, 1] =       1. / h[1, 1]
-        return z
+    _checkmatrix(h, evenPort=True)
+    if np.size(h, -1) == 2:
+        h00, h01, h10, h11, deth = _elements2x2(h)
+        return _matrix2x2(deth / h11, h01 / h11, -h10 / h11, 1. / h11)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    h00, h01, h10, h11 = _blocks(h)
+    z11 = np.linalg.inv(h11)
+    z01 = h01 @ z11
+    return _fromblocks(h00 - z01 @ h10, z01, -z11 @ h10, z11)
 
 
 # ABCD parameter --> Z parameter
+#   Z11 = A C^-1, Z12 = A C^-1 D - B, Z21 = C^-1, Z22 = C^-1 D for 2N-ports
 def atoz(a):
-    if a.ndim == 3:
-        z = a.copy()
-        for i in range(np.size(a, 0)):
-            z[i] = atoz(a[i])
-        return z
-
-    elif a.ndim == 2:
-        if np.size(a, 0) != np.size(a, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(a, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        z = a.copy()
-        deta = np.linalg.det(a)
-        z[0, 0] = a[0, 0] / a[1, 0]
-        z[0, 1] =    deta / a[1, 0]
-        z[1, 0] =      1. / a[1, 0]
-        z[1, 1] = a[1, 1] / a[1, 0]
-        return z
+    _checkmatrix(a, evenPort=True)
+    if np.size(a, -1) == 2:
+        a00, a01, a10, a11, deta = _elements2x2(a)
+        return _matrix2x2(a00 / a10, deta / a10, 1. / a10, a11 / a10)
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+    a00, a01, a10, a11 = _blocks(a)
+    z10 = np.linalg.inv(a10)
+    z00 = a00 @ z10
+    return _fromblocks(z00, z00 @ a11 - a01, z10, z10 @ a11)
 
 
-# Maximum available gain (MAG, GMAX)
-def maxgain(s):
-    if s.ndim == 3:
-        maxgain_vector = np.zeros(np.size(s, 0))
-        for i in range(np.size(s, 0)):
-            maxgain_vector[i] = maxgain(s[i])
-        return maxgain_vector
-
-    elif s.ndim == 2:
-        if np.size(s, 0) != np.size(s, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(s, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        k = stabilityfactor(s)
-        s12 = np.abs(s[0, 1])
-        s21 = np.abs(s[1, 0])
-        if k > 1.:
-            # Maximum available gain
-            return (k - np.sqrt(k**2 - 1)) * (s21 / s12)
-        else:
-            # Maximum stable gain
-            return (s21 / s12)
+# Touchstone parameter types --> S parameter, referred to zref
+TO_S = {
+        'S': lambda x, zref: x,
+        'Z': lambda x, zref: ztos(x, zref),
+        'Y': lambda x, zref: ztos(ytoz(x), zref),
+        'H': lambda x, zref: ztos(htoz(x), zref),
+        'G': lambda x, zref: ztos(htoz(np.linalg.inv(x)), zref) } # G = H^-1
 
-    else:
-        raise RuntimeError('Unexpected dimension')
+
+"""Converts Touchstone parameters to S parameters
+Args:
+    x    (ndarray): parameters (F, N, N) in Ohm/Siemens (not normalized)
+    TYPE (str)    : 'S', 'Y', 'Z', 'G' or 'H'
+    zref (complex): reference impedance of the S parameters, scalar or per port
+Returns:
+    (ndarray): S parameters
+"""
+def xtos(x, TYPE:str, zref = 50.):
+    if TYPE not in TO_S:
+        raise RuntimeError('Unknown parameter type: ' + TYPE)
+    return TO_S[TYPE](x, zref)
+
+
+# Touchstone 1.x Z, Y, H and G data normalized to R --> Ohm/Siemens
+def _denormalize(x, TYPE:str, R:float):
+    if TYPE == 'Z':
+        return x * R
+    elif TYPE == 'Y':
+        return x / R
+    elif TYPE in ['H', 'G']:
+        # Blocks [[impedance, ratio], [ratio, admittance]] for H, the other way round for G
+        k = np.size(x, -1) // 2
+        scale = np.ones(np.shape(x)[-2:], dtype=_realtype(x))
+        scale[:k, :k] = R if TYPE == 'H' else 1. / R
+        scale[k:, k:] = 1. / R if TYPE == 'H' else R
+        return x * scale
+    return x
+
+
+"""Differential port pairs of a 2P-port
+Args:
+    n         (int) : number of single-ended ports (even)
+    adjacent  (bool): True pairs (1, 2), (3, 4), ... (default),
+                      False pairs (1, P+1), (2, P+2), ...
+Returns:
+    (list): (positive, negative) zero-based port index pairs
+"""
+def differentialpairs(n:int, adjacent:bool = True) -> list:
+    if n % 2 != 0:
+        raise RuntimeError('Mixed-mode parameters need an even number of ports')
+
+    p = n // 2
+    return [(2 * k, 2 * k + 1) for k in range(p)] if adjacent else [(k, k + p) for k in range(p)]
+
+
+# Mixed-mode transformation matrix M (2P, 2P): rows 0..P-1 differential, P..2P-1 common mode
+#   d = (a+ - a-) / sqrt(2), c = (a+ + a-) / sqrt(2)
+def _mixedmodematrix(n:int, pairs:list, dtype = float) -> np.ndarray:
+    pairs = np.asarray(pairs)
+    if pairs.shape != (n // 2, 2) or n % 2 != 0 or sorted(pairs.ravel().tolist()) != list(range(n)):
+        raise RuntimeError('Differential pairs must use every port exactly once')
+
+    p = n // 2
+    m = np.zeros((n, n), dtype=dtype)
+    k = np.arange(p)
+    m[k, pairs[:, 0]] = 1.
+    m[k, pairs[:, 1]] = -1.
+    m[p + k, pairs[:, 0]] = 1.
+    m[p + k, pairs[:, 1]] = 1.
+    return m / 2.**0.5
+
+
+"""Single-ended --> mixed-mode S parameters
+Smm = M S M^T over the whole sweep (M is orthogonal). The single-ended
+ports share one real reference impedance, so the differential and common
+mode references are 2 Z0 and Z0 / 2.
+Args:
+    s     (ndarray): single-ended S parameters (2P, 2P) or (..., 2P, 2P)
+    pairs (list)   : (positive, negative) port pairs, defaults to differentialpairs(2P)
+Returns:
+    (ndarray): mixed-mode S parameters [[Sdd, Sdc], [Scd, Scc]], each block (..., P, P)
+"""
+def stomm(s, pairs:list = None):
+    _checkmatrix(s, evenPort=True)
+    n = np.size(s, -1)
+    m = _mixedmodematrix(n, differentialpairs(n) if pairs is None else pairs, _realtype(s))
+    return m @ s @ m.T
+
+
+# Mixed-mode --> single-ended S parameters (S = M^T Smm M)
+def mmtos(smm, pairs:list = None):
+    _checkmatrix(smm, evenPort=True)
+    n = np.size(smm, -1)
+    m = _mixedmodematrix(n, differentialpairs(n) if pairs is None else pairs, _realtype(smm))
+    return m.T @ smm @ m
+
+
+"""Port pairs of an N-port for the 2-port metrics
+Element [n, m] is the pair (m, n), i.e. port m as input and port n as
+output, so it lines up with S[n, m]. The diagonal pairs are degenerate.
+Args:
+    n (int): number of ports
+Returns:
+    (ndarray): port index pairs (N, N, 2)
+"""
+def portpairs(n:int) -> np.ndarray:
+    rows, cols = np.indices((n, n))
+    return np.stack((cols, rows), -1)
+
+
+# 2-port sub-network of the ports (input, output), the other ports terminated by the reference impedance.
+# ports is an index pair (2,) or any array of pairs (..., 2), which adds its leading axes to the result.
+def _subnetwork(s, ports) -> np.ndarray:
+    ports = np.asarray(ports)
+    if np.size(ports, -1) != 2 or np.any(ports < 0) or np.any(ports >= np.size(s, -1)):
+        raise RuntimeError('Port pairs must be (input, output) port indices')
+    return s[..., ports[..., :, None], ports[..., None, :]]
+
+
+# 2-port terms shared by the stability and gain metrics
+def _twoportterms(s, ports = None) -> dict:
+    _checkmatrix(s)
+    if ports is not None:
+        s = _subnetwork(s, ports)
+    _checkmatrix(s, twoPort=True)
+    s11, s12, s21, s22, delta = _elements2x2(s)
+    terms = {'S11': s11, 'S22': s22, 'DELTA': delta}
+    terms['|S11|^2'] = np.abs(s11)**2
+    terms['|S22|^2'] = np.abs(s22)**2
+    terms['|S12|'] = np.abs(s12)
+    terms['|S21|'] = np.abs(s21)
+    terms['|S12 S21|'] = terms['|S12|'] * terms['|S21|']
+    return terms
+
+
+# Stability factor (K factor) from shared terms
+def _stabilityfactor(terms:dict):
+    return (1. - terms['|S11|^2'] - terms['|S22|^2'] + np.abs(terms['DELTA'])**2)\
+            / (2. * terms['|S12 S21|'])
+
+
+# Maximum available gain from shared terms (maximum stable gain where K <= 1)
+#   K - sqrt(K^2 - 1) is evaluated as 1 / (K + sqrt(K^2 - 1)), which does not cancel at large K
+def _maxgain(terms:dict, k):
+    msg = terms['|S21|'] / terms['|S12|']
+    return np.where(k > 1., msg / (k + np.sqrt(np.maximum(k**2 - 1., 0.))), msg)
+
+
+"""Stability and gain metrics of 2-port networks
+All metrics share |Sij|, det(S) and |S21|/|S12|, which are computed once.
+Multi-port networks are analyzed per port pair, with the other ports
+terminated by the reference impedance.
+Args:
+    s     (ndarray): S parameter matrix (N, N) or stack of matrices (..., N, N)
+    ports (ndarray): (input, output) port pair (2,), array of pairs (..., 2)
+                     such as portpairs(N), or None for 2-ports
+Returns:
+    (dict): 'K'        stability factor
+            'DELTA'    determinant of S (complex)
+            'MU'       Edwards-Sinsky load stability factor
+            'MU_PRIME' Edwards-Sinsky source stability factor
+            'MAG'      maximum available gain (maximum stable gain where K <= 1)
+            'U'        unilateral figure of merit
+"""
+def stabilitymetrics(s, ports = None) -> dict:
+    terms = _twoportterms(s, ports)
+    delta = terms['DELTA']
+    k = _stabilityfactor(terms)
+    metrics = {'K': k, 'DELTA': delta}
+    metrics['MU'] = (1. - terms['|S11|^2'])\
+            / (np.abs(terms['S22'] - delta * np.conj(terms['S11'])) + terms['|S12 S21|'])
+    metrics['MU_PRIME'] = (1. - terms['|S22|^2'])\
+            / (np.abs(terms['S11'] - delta * np.conj(terms['S22'])) + terms['|S12 S21|'])
+    metrics['MAG'] = _maxgain(terms, k)
+    metrics['U'] = np.sqrt(terms['|S11|^2'] * terms['|S22|^2']) * terms['|S12 S21|']\
+            / ((1. - terms['|S11|^2']) * (1. - terms['|S22|^2']))
+    return metrics
+
+
+# Maximum available gain (MAG, GMAX)
+def maxgain(s, ports = None):
+    terms = _twoportterms(s, ports)
+    return _maxgain(terms, _stabilityfactor(terms))
 
 
 # Stability factor (K factor)
-def stabilityfactor(s):
-    if s.ndim == 3:
-        k = np.zeros(np.size(s, 0))
-        for i in range(np.size(s, 0)):
-            k[i] = stabilityfactor(s[i])
-        return k
-
-    elif s.ndim == 2:
-        if np.size(s, 0) != np.size(s, 1):
-            raise RuntimeError('Not a square matrix!!!')
-
-        if np.size(s, 0) != 2:
-            raise RuntimeError('Must be a 2x2 matrix!!!')
-
-        det = np.abs(np.linalg.det(s))
-        s11 = np.abs(s[0, 0])
-        s12 = np.abs(s[0, 1])
-        s21 = np.abs(s[1, 0])
-        s22 = np.abs(s[1, 1])
-        k = (1. - s11**2 - s22**2 + det**2) / (2. * s21 * s12)
-        return k
+def stabilityfactor(s, ports = None):
+    return _stabilityfactor(_twoportterms(s, ports))
+
+
+# Determinant of the 2-port S matrix
+def stabilitydelta(s, ports = None):
+    return _twoportterms(s, ports)['DELTA']
+
+
+# Edwards-Sinsky stability factor mu (load side)
+def mufactor(s, ports = None):
+    return stabilitymetrics(s, ports)['MU']
 
-    else:
-        raise RuntimeError('Unexpected dimension')
 
+# Edwards-Sinsky stability factor mu' (source side)
+def muprimefactor(s, ports = None):
+    return stabilitymetrics(s, ports)['MU_PRIME']
 
-# Group delay
-def groupdelay(s, frequency):
+
+# Unilateral figure of merit
+def unilateralfom(s, ports = None):
+    return stabilitymetrics(s, ports)['U']
+
+
+# Per-frequency vector (F,) --> (F, 1, ...) against a source grid of ndim dimensions
+def _alongfrequency(x, ndim:int):
+    x = np.asarray(x)
+    return x.reshape(np.shape(x) + (1,) * max(ndim - np.ndim(x), 0))
+
+
+"""Noise figure of a 2-port driven by source reflections gammaS
+F = Fmin + 4 Rn/Z0 |Gs - Gopt|^2 / ((1 - |Gs|^2) |1 + Gopt|^2)
+The noise parameters are per frequency (F,). gammaS is (F,) or a grid
+(F, K, ...) of source reflections per frequency; (1, K) evaluates the
+same K sources at every frequency.
+Args:
+    gammaS   (ndarray): source reflection coefficients
+    nfmin    (ndarray): minimum noise figure (dB)
+    gammaOpt (ndarray): optimum source reflection coefficient
+    rn       (ndarray): equivalent noise resistance (Ohm)
+    z0       (float)  : reference impedance of the reflection coefficients
+Returns:
+    (ndarray): noise figure (dB), broadcast shape of gammaS and the noise parameters,
+               NaN outside the unit circle
+"""
+def noisefigure(gammaS, nfmin, gammaOpt, rn, z0 = 50.):
+    ndim = np.ndim(gammaS)
+    fmin = 10.**(_alongfrequency(nfmin, ndim) / 10.)
+    gammaOpt = _alongfrequency(gammaOpt, ndim)
+    rn = _alongfrequency(rn, ndim)
+    f = fmin + 4. * rn / z0 * np.abs(gammaS - gammaOpt)**2\
+            / ((1. - np.abs(gammaS)**2) * np.abs(1. + gammaOpt)**2)
+
+    # Sources outside the unit circle (|Gs| >= 1) have no noise figure
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 10. * np.log10(np.where(np.abs(gammaS) < 1., f, np.nan))
+
+
+"""Constant noise figure circles in the source reflection plane
+Args:
+    nf       (ndarray): noise figure levels (dB), scalar or (K,)
+    nfmin    (ndarray): minimum noise figure (dB) (F,)
+    gammaOpt (ndarray): optimum source reflection coefficient (F,)
+    rn       (ndarray): equivalent noise resistance (Ohm) (F,)
+    z0       (float)  : reference impedance of the reflection coefficients
+Returns:
+    center (ndarray): circle centers (F, K) (complex)
+    radius (ndarray): circle radii (F, K), NaN below NFmin
+"""
+def noisecircles(nf, nfmin, gammaOpt, rn, z0 = 50.):
+    nf = np.reshape(nf, (1, -1))
+    fmin = 10.**(_alongfrequency(nfmin, 2) / 10.)
+    gammaOpt = _alongfrequency(gammaOpt, 2)
+    n = (10.**(nf / 10.) - fmin) / (4. * _alongfrequency(rn, 2) / z0) * np.abs(1. + gammaOpt)**2
+    with np.errstate(invalid='ignore'):
+        radius = np.sqrt(n**2 + n * (1. - np.abs(gammaOpt)**2)) / (1. + n)
+    return (gammaOpt / (1. + n), radius)
+
+
+"""Available gain of a 2-port driven by source reflections gammaS
+GA = |S21|^2 (1 - |Gs|^2) / (|1 - S11 Gs|^2 - |S22 - D Gs|^2)
+Args:
+    s      (ndarray): S parameters (F, N, N)
+    gammaS (ndarray): source reflection coefficients (F,), (F, K, ...) or (1, K)
+    ports  (ndarray): (input, output) port pair, or None for 2-ports
+Returns:
+    (ndarray): available gain (linear)
+"""
+def availablegain(s, gammaS, ports = None):
+    terms = _twoportterms(s, ports)
+    ndim = np.ndim(gammaS)
+    s11, s22, delta = [_alongfrequency(terms[name], ndim) for name in ['S11', 'S22', 'DELTA']]
+    return _alongfrequency(terms['|S21|'], ndim)**2 * (1. - np.abs(gammaS)**2)\
+            / (np.abs(1. - s11 * gammaS)**2 - np.abs(s22 - delta * gammaS)**2)
+
+
+"""Constant available gain circles in the source reflection plane
+Args:
+    s     (ndarray): S parameters (F, N, N)
+    ga    (ndarray): available gain levels (linear), scalar or (K,)
+    ports (ndarray): (input, output) port pair, or None for 2-ports
+Returns:
+    center (ndarray): circle centers (F, K) (complex)
+    radius (ndarray): circle radii (F, K), NaN where the gain is not reachable
+"""
+def availablegaincircles(s, ga, ports = None):
+    terms = _twoportterms(s, ports)
+    g = np.reshape(ga, (1, -1)) / _alongfrequency(terms['|S21|'], 2)**2
+    s11, s22, delta = [_alongfrequency(terms[name], 2) for name in ['S11', 'S22', 'DELTA']]
+    k = _alongfrequency(_stabilityfactor(terms), 2)
+    product = _alongfrequency(terms['|S12 S21|'], 2)
+    d = 1. + g * (np.abs(s11)**2 - np.abs(delta)**2)
+    with np.errstate(invalid='ignore'):
+        radius = np.sqrt(1. - 2. * k * product * g + (product * g)**2) / np.abs(d)
+    return (g * np.conj(s11 - delta * np.conj(s22)) / d, radius)
+
+
+"""Group delay
+tau = -dphi / domega with the phase unwrapped along frequency. The slope at
+each point is taken between the points `aperture` steps below and above it
+(one-sided at the band edges), which works on non-uniform frequency grids
+and smooths the result as the aperture widens.
+Args:
+    s         (ndarray): parameter vector (F,), (F, N, N) or any (F, ...) array
+    frequency (ndarray): frequency vector (F,)
+    aperture  (int)    : half-width of the difference in points, defaults to 1
+Returns:
+    (ndarray): group delay in seconds, same shape as s
+"""
+def groupdelay(s, frequency, aperture:int = 1):
+    frequency = np.asarray(frequency)
     if np.size(s, 0) != len(frequency):
         raise RuntimeError('S and frequency must be the same vector length')
 
-    if s.ndim == 3:
-        if np.size(s, 0) == 1:
-            raise RuntimeError('Group delay calculation requires two or more data points')
-        else:
-            tg = s.copy()
-            dphi = np.mod(np.angle(s[1]) - np.angle(s[0]), 2 * np.pi)
-            domega = 2 * np.pi * (frequency[1] - frequency[0])
-            tg[0] = dphi / domega
-
-            for i in range(1, np.size(s, 0)):
-                dphi = np.mod(np.angle(s[i]) - np.angle(s[i - 1]), 2 * np.pi)
-                domega = 2 * np.pi * (frequency[i] - frequency[i - 1])
-                tg[i] = dphi / domega
-            return tg
+    if np.size(s, 0) < 2:
+        raise RuntimeError('Group delay calculation requires two or more data points')
+
+    if aperture < 1:
+        raise RuntimeError('Group delay aperture must be one or more points')
+
+    # The unwrapped phase grows with frequency, so it is accumulated in double precision
+    phi = np.unwrap(np.angle(s).astype(float, copy=False), axis=0)
+    index = np.arange(len(frequency))
+    lo = np.maximum(index - aperture, 0)
+    hi = np.minimum(index + aperture, len(frequency) - 1)
+    domega = 2 * np.pi * (frequency[hi] - frequency[lo])
+    tau = -(phi[hi] - phi[lo]) / domega.reshape((-1,) + (1,) * (np.ndim(s) - 1))
+    return tau.astype(_realtype(s), copy=False)
+
+
+# Interpolation weights of recently used (frequency, newFrequency, method) combinations
+_resampleWeights = OrderedDict()
+_resampleWeightsLock = threading.Lock() # The viewer resamples on worker threads
+RESAMPLE_CACHE_SIZE = 32
+
+
+# Interpolation stencil of every new point --> (index (F', K), weights (F', K))
+#   linear: the two neighbouring points
+#   cubic : 4-point Lagrange polynomial, works on non-uniform grids
+def _interpolationweights(frequency:np.ndarray, newFrequency:np.ndarray, method:str) -> tuple:
+    F = len(frequency)
+    k = 4 if method == 'cubic' else 2
+    interval = np.clip(np.searchsorted(frequency, newFrequency, side='right') - 1, 0, F - 2)
+    first = np.clip(interval - (k // 2 - 1), 0, F - k)
+    index = first[:, None] + np.arange(k)
+
+    # w_j = prod_{m != j} (f - f_m) / (f_j - f_m)
+    nodes = frequency[index]
+    weights = np.ones((len(newFrequency), k))
+    for j in range(k):
+        for m in range(k):
+            if m != j:
+                weights[:, j] *= (newFrequency - nodes[:, m]) / (nodes[:, j] - nodes[:, m])
+    return (index, weights)
+
+
+# Cached interpolation weights
+def _resampleweights(frequency:np.ndarray, newFrequency:np.ndarray, method:str) -> tuple:
+    key = (method, len(frequency), len(newFrequency), hash(frequency.tobytes()), hash(newFrequency.tobytes()))
+    with _resampleWeightsLock:
+        entry = _resampleWeights.get(key)
+        if entry and np.array_equal(entry[0], frequency) and np.array_equal(entry[1], newFrequency):
+            _resampleWeights.move_to_end(key)
+            return entry[2]
+
+    # Computed outside of the lock; two threads may compute the same weights, the last one is kept
+    weights = _interpolationweights(frequency, newFrequency, method)
+    with _resampleWeightsLock:
+        _resampleWeights[key] = (frequency.copy(), newFrequency.copy(), weights)
+        if len(_resampleWeights) > RESAMPLE_CACHE_SIZE:
+            _resampleWeights.popitem(last=False)
+    return weights
+
+
+# Weighted sum of the stencil points along the frequency axis
+def _applyweights(x, index, weights):
+    shape = (-1,) + (1,) * (np.ndim(x) - 1)
+    weights = weights.astype(_realtype(x), copy=False)
+    y = x[index[:, 0]] * weights[:, 0].reshape(shape)
+    for j in range(1, np.size(index, 1)):
+        y += x[index[:, j]] * weights[:, j].reshape(shape)
+    return y
+
+
+"""Resamples a parameter vector onto another frequency grid
+Every matrix element is interpolated at once along the frequency axis; the
+stencil indices and weights depend only on the two grids and are cached,
+so resampling many networks measured on the same grid computes them once.
+The new grid must lie within the original one (no extrapolation).
+Args:
+    x            (ndarray): parameter vector (F, ...), e.g. (F, N, N)
+    frequency    (ndarray): ascending frequency vector (F,)
+    newFrequency (ndarray): frequency vector to resample onto (F',)
+    method       (str)    : 'linear' (default) or 'cubic' (4-point Lagrange,
+                            needs at least 4 frequency points)
+    polar        (bool)   : interpolate magnitude and unwrapped phase instead of
+                            real and imaginary parts, which keeps the magnitude of
+                            fast rotating (delayed) responses
+Returns:
+    (ndarray): resampled parameter vector (F', ...)
+"""
+def resample(x, frequency, newFrequency, method:str = 'linear', polar:bool = False):
+    frequency = np.asarray(frequency, dtype=float)
+    newFrequency = np.asarray(newFrequency, dtype=float)
+    if np.size(x, 0) != len(frequency):
+        raise RuntimeError('Parameter and frequency must be the same vector length')
+
+    if method not in ['linear', 'cubic']:
+        raise RuntimeError('Unknown interpolation method: ' + method)
+
+    if np.array_equal(frequency, newFrequency):
+        return x
+
+    if len(frequency) < 2 or np.min(newFrequency) < frequency[0] or np.max(newFrequency) > frequency[-1]:
+        raise RuntimeError('New frequency grid exceeds the frequency range')
+
+    if method == 'cubic' and len(frequency) < 4:
+        raise RuntimeError('Cubic interpolation needs at least 4 frequency points')
+
+    index, weights = _resampleweights(frequency, newFrequency, method)
+    if polar and np.iscomplexobj(x):
+        magnitude = _applyweights(np.abs(x), index, weights)
+        phase = _applyweights(np.unwrap(np.angle(x).astype(float, copy=False), axis=0), index, weights)
+        return (magnitude * np.exp(1j * phase)).astype(x.dtype, copy=False)
+    return _applyweights(x, index, weights)
+
+
+# Frequency grid shared by networks: the grid of the first network within the common range
+def _commongrid(frequencies:list) -> np.ndarray:
+    first = np.asarray(frequencies[0])
+    if all(np.array_equal(first, frequency) for frequency in frequencies[1:]):
+        return first
+
+    fmin = max(np.min(frequency) for frequency in frequencies)
+    fmax = min(np.max(frequency) for frequency in frequencies)
+    grid = first[(first >= fmin) & (first <= fmax)]
+    if len(grid) == 0:
+        raise RuntimeError('Networks have no frequency range in common')
+    return grid
+
+
+"""Cascades networks
+The networks are connected in the order given, the right half of the ports
+of each network to the left half of the next one. All frequency points are
+multiplied as one stack of T matrices. Networks measured on different grids
+are resampled onto the grid of the first network within their common range.
+Args:
+    networks (tuple): (s, frequency) pairs as returned by loadsnp, s being (F, 2N, 2N)
+Returns:
+    s         (ndarray): S parameter vector of the cascade
+    frequency (ndarray): frequency vector
+"""
+def cascade(*networks) -> tuple:
+    if not networks:
+        raise RuntimeError('No network to cascade')
+
+    frequency = _commongrid([f for s, f in networks])
+    t = stot(resample(networks[0][0], networks[0][1], frequency))
+    for s, f in networks[1:]:
+        t = t @ stot(resample(s, f, frequency))
+    return (ttos(t), frequency)
+
+
+"""De-embeds fixtures from a measured network
+Inverse cascade: T_dut = T_left^-1 T_measured T_right^-1. The right fixture
+is oriented like a cascaded network, i.e. its left ports face the DUT.
+Fixtures are resampled onto the grid of the measured network and must
+cover its range.
+Args:
+    network (tuple): measured (s, frequency) pair
+    left    (tuple): (s, frequency) of the left fixture, or None
+    right   (tuple): (s, frequency) of the right fixture, or None
+Returns:
+    s         (ndarray): S parameter vector of the DUT
+    frequency (ndarray): frequency vector
+"""
+def deembed(network:tuple, left:tuple = None, right:tuple = None) -> tuple:
+    s, frequency = network
+    t = stot(s)
+    if left is not None:
+        t = np.linalg.solve(stot(resample(left[0], left[1], frequency)), t)
+    if right is not None:
+        # X T_right^-1 = (T_right^T \ X^T)^T
+        tr = stot(resample(right[0], right[1], frequency))
+        t = np.swapaxes(np.linalg.solve(np.swapaxes(tr, -1, -2), np.swapaxes(t, -1, -2)), -1, -2)
+    return (ttos(t), frequency)
+
+
+
+# Time domain windows: name --> symmetric window of a given length
+TIME_WINDOWS = {
+        'RECT': np.ones,
+        'HANN': lambda n: np.hanning(n + 2)[1:-1], # Without the zero end points
+        'HAMMING': np.hamming,
+        'BLACKMAN': lambda n: np.blackman(n + 2)[1:-1],
+        'KAISER': lambda n: np.kaiser(n, 6.) }
+
+
+"""Time domain window over a frequency band
+Low-pass windows are the upper half of a symmetric window of 2 numPoints - 1
+points, so that they peak at DC and only fall off towards the band edge.
+Args:
+    numPoints (int) : number of frequency points
+    window    (str) : 'RECT', 'HANN', 'HAMMING', 'BLACKMAN' or 'KAISER' (beta = 6)
+    lowpass   (bool): half window for data starting at DC
+Returns:
+    (ndarray): window (numPoints,)
+"""
+def timewindow(numPoints:int, window:str = 'KAISER', lowpass:bool = False) -> np.ndarray:
+    if window not in TIME_WINDOWS:
+        raise RuntimeError('Unknown time domain window: ' + window)
+
+    if lowpass:
+        return TIME_WINDOWS[window](2 * numPoints - 1)[numPoints - 1:]
+    return TIME_WINDOWS[window](numPoints)
+
+
+"""Extrapolates a parameter vector to DC on a harmonic grid
+Low-pass transforms need the frequencies 0, df, 2 df, ... Unless it is given,
+the DC value is estimated from the first two points: the magnitude is
+extrapolated linearly, clamped at 0, and the extrapolated phase is snapped
+to 0 or 180 deg, the response of a real network being real at DC. The data,
+with the DC point in front, is interpolated (magnitude and phase) onto a
+harmonic grid of about the mean spacing of the data, ending at the last
+frequency.
+Args:
+    x         (ndarray): parameter vector (F, ...), e.g. (F, N, N)
+    frequency (ndarray): ascending frequency vector (F,), F >= 2
+    dc        (ndarray): DC value, scalar or (...), None to extrapolate
+Returns:
+    x         (ndarray): parameter vector on the harmonic grid (K + 1, ...)
+    frequency (ndarray): harmonic grid 0, df, ..., K df
+"""
+def extrapolatedc(x, frequency, dc = None) -> tuple:
+    frequency = np.asarray(frequency, dtype=float)
+    if np.size(x, 0) != len(frequency):
+        raise RuntimeError('Parameter and frequency must be the same vector length')
+    if len(frequency) < 2:
+        raise RuntimeError('At least 2 frequency points are needed')
+
+    spacing = (frequency[-1] - frequency[0]) / (len(frequency) - 1)
+    K = max(int(round(frequency[-1] / spacing)), 1)
+    harmonic = np.arange(K + 1) * (frequency[-1] / K)
+
+    if frequency[0] > 0.:
+        if dc is None:
+            ratio = frequency[0] / (frequency[1] - frequency[0])
+            magnitude = np.abs(x[0]) - (np.abs(x[1]) - np.abs(x[0])) * ratio
+            magnitude = np.maximum(magnitude, 0.) # A negative magnitude would flip the sign below
+            phase = np.unwrap(np.angle(x[:2]).astype(float, copy=False), axis=0)
+            phase = phase[0] - (phase[1] - phase[0]) * ratio
+            dc = np.where(np.cos(phase) < 0., -magnitude, magnitude)
+        dc = np.broadcast_to(dc, np.shape(x)[1:]).astype(x.dtype)
+        x = np.concatenate((dc[np.newaxis], x))
+        frequency = np.concatenate(([0.], frequency))
+
+    # Data measured on a harmonic grid (first frequency = spacing) is used as is
+    if len(frequency) == len(harmonic) and np.allclose(frequency, harmonic, rtol=0., atol=1e-6 * harmonic[1]):
+        return (x, harmonic)
+    return (resample(x, frequency, harmonic, polar=True), harmonic)
+
+
+"""Time domain (impulse and step) response
+Every matrix element is transformed by one FFT along the frequency axis.
+Low-pass mode extrapolates the data to DC (see extrapolatedc), applies a
+half window and transforms the Hermitian spectrum: the impulse and step
+responses are real and the step settles to the DC value (TDR/TDT).
+Band-pass mode transforms the measured band only, resampled onto a uniform
+grid if needed, with a full window: the impulse response is the complex
+envelope and there is no step response.
+The impulse response is scaled so that a flat response of 1 peaks at about 1
+with the RECT window. Time runs over [-T/2, T/2) with T = 1 / df; responses
+delayed by more than T/2 alias to negative time.
+Args:
+    x         (ndarray): parameter vector (F, ...), e.g. (F, N, N)
+    frequency (ndarray): ascending frequency vector (F,)
+    mode      (str)    : 'LOWPASS' (default) or 'BANDPASS'
+    window    (str)    : window name, see TIME_WINDOWS
+    dc        (ndarray): DC value in low-pass mode, None to extrapolate
+    nfft      (int)    : FFT length, defaults to the next power of two of the
+                         number of (two-sided) points; longer zero pads the
+                         spectrum, which interpolates the responses in time
+Returns:
+    (dict): 'TIME' (T,) in s, 'IMPULSE' (T, ...) and in low-pass mode 'STEP' (T, ...)
+"""
+def timeresponse(x, frequency, mode:str = 'LOWPASS', window:str = 'KAISER', dc = None, nfft:int = None) -> dict:
+    if mode not in ['LOWPASS', 'BANDPASS']:
+        raise RuntimeError('Unknown time domain mode: ' + mode)
+
+    shape = (-1,) + (1,) * (np.ndim(x) - 1)
+    if mode == 'LOWPASS':
+        x, frequency = extrapolatedc(x, frequency, dc)
+        numPoints = 2 * (len(frequency) - 1)
     else:
-        raise RuntimeError('Unexpected dimension')
-
-
+        frequency = np.asarray(frequency, dtype=float)
+        if len(frequency) < 2:
+            raise RuntimeError('At least 2 frequency points are needed')
+        uniform = np.linspace(frequency[0], frequency[-1], len(frequency))
+        if not np.allclose(frequency, uniform, rtol=0., atol=1e-6 * (uniform[1] - uniform[0])):
+            x = resample(x, frequency, uniform, polar=True)
+        frequency = uniform
+        numPoints = len(frequency)
+
+    nfft = nfft or 1 << int(np.ceil(np.log2(numPoints)))
+    if nfft < numPoints:
+        raise RuntimeError('FFT length must be at least {}'.format(numPoints))
+
+    w = timewindow(len(frequency), window, mode == 'LOWPASS').astype(_realtype(x)).reshape(shape)
+    if mode == 'LOWPASS':
+        h = np.fft.fftshift(np.fft.irfft(x * w, n=nfft, axis=0), axes=0)
+    else:
+        h = np.fft.fftshift(np.fft.ifft(x * w, n=nfft, axis=0), axes=0)
 
+    response = {'TIME': np.fft.fftshift(np.fft.fftfreq(nfft, frequency[1] - frequency[0]))}
+    if mode == 'LOWPASS':
+        response['STEP'] = np.cumsum(h, axis=0)
+    response['IMPULSE'] = h * (nfft / numPoints)
+    return response
 
 
 if __name__ == '__main__':
@@ -6,6 +6,9 @@ import os
 
 import pyqtgraph as pg
 
+from NetworkParameterModule import Pairings, TimeModes
+import NyanRFModule as nyanRF
+
 class GraphOptionDialog(QtWidgets.QDialog):
 
     optionsChanged = Signal()
@@ -15,6 +18,13 @@ class GraphOptionDialog(QtWidgets.QDialog):
         self.__whiteBackRadioButton = QtWidgets.QRadioButton('White')
         self.__blackBackRadioButton = QtWidgets.QRadioButton('Black')
         self.__antialiasCheckBox = QtWidgets.QCheckBox('Antialias:')
+        self.__gridDensityComboBox = QtWidgets.QComboBox()
+        self.__downsamplingCheckBox = QtWidgets.QCheckBox('Min/max downsampling:')
+        self.__singlePrecisionCheckBox = QtWidgets.QCheckBox('Single precision storage:')
+        self.__pairingComboBox = QtWidgets.QComboBox()
+        self.__noiseFrequencyLineEdit = QtWidgets.QLineEdit()
+        self.__timeModeComboBox = QtWidgets.QComboBox()
+        self.__timeWindowComboBox = QtWidgets.QComboBox()
 
         # Radio group
         self.__buttonGroup = QtWidgets.QButtonGroup()
@@ -28,6 +38,23 @@ class GraphOptionDialog(QtWidgets.QDialog):
         self.__whiteBackRadioButton.setChecked(True)
         self.__blackBackRadioButton.setChecked(False)
         self.__antialiasCheckBox.setChecked(True)
+        self.__gridDensityComboBox.addItems(['Coarse', 'Normal', 'Fine'])
+        self.__gridDensityComboBox.setCurrentText('Normal')
+        self.__downsamplingCheckBox.setChecked(True)
+        self.__singlePrecisionCheckBox.setChecked(False)
+        self.__singlePrecisionCheckBox.setToolTip('Keeps parameters as complex64 (half the memory,'\
+                ' about 7 significant digits)')
+        self.__pairingComboBox.addItems([pairing.value for pairing in Pairings])
+        self.__pairingComboBox.setCurrentText(Pairings.ADJACENT)
+        self.__pairingComboBox.setToolTip('Adjacent: (1,2), (3,4), ...  Split: (1,N+1), (2,N+2), ...')
+        self.__noiseFrequencyLineEdit.setValidator(QtGui.QDoubleValidator(0., 1e6, 6))
+        self.__noiseFrequencyLineEdit.setPlaceholderText('Center of the noise data')
+        self.__timeModeComboBox.addItems([mode.value for mode in TimeModes])
+        self.__timeModeComboBox.setCurrentText(TimeModes.LOWPASS)
+        self.__timeModeComboBox.setToolTip('Low-pass: extrapolated to DC, impulse and step (TDR/TDT).'\
+                '  Band-pass: measured band only, impulse envelope')
+        self.__timeWindowComboBox.addItems([window.title() for window in nyanRF.TIME_WINDOWS])
+        self.__timeWindowComboBox.setCurrentText('Kaiser')
 
         OK = QtWidgets.QDialogButtonBox.Ok
         CANCEL = QtWidgets.QDialogButtonBox.Cancel
@@ -43,10 +70,47 @@ class GraphOptionDialog(QtWidgets.QDialog):
         vboxlayout.addWidget(QtWidgets.QLabel('Background:'))
         vboxlayout.addLayout(hboxlayout)
         vboxlayout.addWidget(self.__antialiasCheckBox)
+        vboxlayout.addWidget(QtWidgets.QLabel('Smith/Polar grid density:'))
+        vboxlayout.addWidget(self.__gridDensityComboBox)
+        vboxlayout.addWidget(self.__downsamplingCheckBox)
+        vboxlayout.addWidget(self.__singlePrecisionCheckBox)
+        vboxlayout.addWidget(QtWidgets.QLabel('Mixed-mode pairs:'))
+        vboxlayout.addWidget(self.__pairingComboBox)
+        vboxlayout.addWidget(QtWidgets.QLabel('Noise circles at (GHz):'))
+        vboxlayout.addWidget(self.__noiseFrequencyLineEdit)
+        vboxlayout.addWidget(QtWidgets.QLabel('Time domain mode and window:'))
+        timelayout = QtWidgets.QHBoxLayout()
+        timelayout.addWidget(self.__timeModeComboBox)
+        timelayout.addWidget(self.__timeWindowComboBox)
+        vboxlayout.addLayout(timelayout)
         vboxlayout.addWidget(buttonBox)
 
         self.setLayout(vboxlayout)
 
+    def gridDensity(self) -> str:
+        return self.__gridDensityComboBox.currentText()
+
+    def downsampling(self) -> bool:
+        return self.__downsamplingCheckBox.isChecked()
+
+    def singlePrecision(self) -> bool:
+        return self.__singlePrecisionCheckBox.isChecked()
+
+    def pairing(self) -> Pairings:
+        return Pairings(self.__pairingComboBox.currentText())
+
+    def noiseCircleFrequency(self) -> float:
+        # Hz, None if blank
+        text = self.__noiseFrequencyLineEdit.text()
+        return float(text) * 1e9 if text else None
+
+    def timeMode(self) -> TimeModes:
+        return TimeModes(self.__timeModeComboBox.currentText())
+
+    def timeWindow(self) -> str:
+        # Window name of nyanRF.TIME_WINDOWS
+        return self.__timeWindowComboBox.currentText().upper()
+
     @override
     def accept(self):
         rb = self.__buttonGroup.checkedButton()
@@ -0,0 +1,79 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+from PySide6.QtCore import Signal, Slot, Qt
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+
+from NetworkParameterModule import loadParameters
+
+
+class NetworkLoader(QtCore.QObject):
+
+    # Signals
+    loaded = Signal(str, object, object, object) # path, freq, data, reference impedance
+    failed = Signal(str, str)                    # path, error message
+    progressChanged = Signal(int)                # number of finished files
+    finished = Signal()
+
+    # Batches smaller than this are loaded on threads (process start-up is not free)
+    PROCESS_THRESHOLD = 8
+    POLL_INTERVAL = 50 # ms
+
+    def __init__(self, parent = None):
+        super().__init__(parent)
+        self.__executor = None
+        self.__futures = []
+        self.__finishedCount = 0
+        self.__timer = QtCore.QTimer(self)
+        self.__timer.timeout.connect(self.poll)
+
+    def isRunning(self) -> bool:
+        return self.__executor is not None
+
+    def start(self, paths:list, dtype = complex):
+        if self.isRunning():
+            raise RuntimeError('NetworkLoader: already running')
+
+        workers = min(os.cpu_count() or 1, max(len(paths), 1))
+        if len(paths) >= self.PROCESS_THRESHOLD and workers > 1:
+            # Spawned workers never inherit the Qt state of this process
+            context = multiprocessing.get_context('spawn')
+            self.__executor = ProcessPoolExecutor(workers, mp_context=context)
+        else:
+            self.__executor = ThreadPoolExecutor(workers)
+
+        self.__futures = [(path, self.__executor.submit(loadParameters, path, dtype)) for path in paths]
+        self.__finishedCount = 0
+        self.__timer.start(self.POLL_INTERVAL)
+
+    @Slot()
+    def cancel(self):
+        if not self.isRunning():
+            return
+
+        self.__futures.clear()
+        self.stop(wait=False)
+
+    @Slot()
+    def poll(self):
+        # Deliver results in the order the files were requested
+        while self.__futures and self.__futures[0][1].done():
+            path, future = self.__futures.pop(0)
+            try:
+                freq, data, zref = future.result()
+            except Exception as e:
+                self.failed.emit(path, str(e))
+            else:
+                self.loaded.emit(path, freq, data, zref)
+
+            self.__finishedCount += 1
+            self.progressChanged.emit(self.__finishedCount)
+
+        if not self.__futures:
+            self.stop(wait=True)
+
+    def stop(self, wait:bool):
+        self.__timer.stop()
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
+        self.__executor = None
+        self.finished.emit()
@@ -4,10 +4,13 @@ from typing import override
 from enum import StrEnum
 import sys
 import os
+import functools
+import threading
 import numpy as np
 
 sys.path.append(os.pardir)
 import NyanRFModule as nyanRF
+from NetworkModule import readnetwork
 
 
 class ParamTypes(StrEnum):
@@ -16,9 +19,75 @@ class ParamTypes(StrEnum):
     Y_PARAMETER = 'Y Parameter'
     H_PARAMETER = 'H Parameter'
     ABCD_PARAMETER = 'ABCD Parameter'
+    SDD_PARAMETER = 'Sdd Parameter'
+    SDC_PARAMETER = 'Sdc Parameter'
+    SCD_PARAMETER = 'Scd Parameter'
+    SCC_PARAMETER = 'Scc Parameter'
     GROUP_DELAY = 'Group Delay'
     STABILITY_FACTOR = 'Stability Factor'
     MAX_GAIN = 'Maximum Gain'
+    NOISE_FIGURE = 'Noise Figure'
+    MIN_NOISE_FIGURE = 'Min Noise Figure'
+    OPT_REFLECTION = 'Optimum Source Reflection'
+    NOISE_RESISTANCE = 'Noise Resistance'
+    ASSOCIATED_GAIN = 'Associated Gain'
+
+
+# Parameters read from the file; everything else is derived from them
+SOURCE_PARAMETERS = [ParamTypes.S_PARAMETER, ParamTypes.MIN_NOISE_FIGURE, ParamTypes.OPT_REFLECTION,\
+        ParamTypes.NOISE_RESISTANCE]
+
+# Noise circles: levels above NFmin (dB) and points per circle
+NOISE_CIRCLE_STEPS = [0.25, 0.5, 1., 2., 3.]
+CIRCLE_POINTS = 181
+
+
+# Mixed-mode parameters --> (row block, column block) of [[Sdd, Sdc], [Scd, Scc]]
+MIXED_MODE_BLOCKS = {
+        ParamTypes.SDD_PARAMETER: (0, 0),
+        ParamTypes.SDC_PARAMETER: (0, 1),
+        ParamTypes.SCD_PARAMETER: (1, 0),
+        ParamTypes.SCC_PARAMETER: (1, 1) }
+
+
+# Pairing of the single-ended ports into differential pairs
+class Pairings(StrEnum):
+    ADJACENT = 'Adjacent' # (1, 2), (3, 4), ...
+    SPLIT = 'Split'       # (1, P+1), (2, P+2), ...
+
+
+class Quantities(StrEnum):
+    DB = 'dB'
+    DEGREE = 'deg'
+    REAL = 'Re'
+    IMAGINARY = 'Im'
+    TIME = 's'
+    IMPULSE = 'Impulse'
+    STEP = 'Step'
+
+
+# Time domain transform of the parameters
+class TimeModes(StrEnum):
+    LOWPASS = 'Low-pass'   # Extrapolated to DC: real impulse and step responses (TDR/TDT)
+    BANDPASS = 'Band-pass' # Measured band only: impulse response envelope
+
+
+# Cache key of the time response of all elements, see NetworkParameter.timeResponse()
+TIME_RESPONSE = 'Time Response'
+
+# Cache key of the noise circles, see NetworkParameter.noiseCircles()
+NOISE_CIRCLES = 'Noise Circles'
+
+
+# Plot series are computed on worker threads (see SeriesWorker) while the GUI thread changes the
+# options. Methods reading or filling the caches hold the network lock, so a derivation never
+# runs across an option change and a result is never memoized under options it was not made with.
+def synchronized(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class NetworkParameter(QtCore.QObject):
@@ -27,44 +96,326 @@ class NetworkParameter(QtCore.QObject):
         super().__init__(parent)
         self.__freq = np.array([])
         self.__data = {}
+        self.__quantities = {}
         self.__text = ''
+        self.__path = ''
+        self.__dtype = np.dtype(complex)
+        self.__pairing = Pairings.ADJACENT
+        self.__zref = 50.
+        self.__noiseFrequency = None
+        self.__timeMode = TimeModes.LOWPASS
+        self.__timeWindow = 'KAISER'
+        self.__lock = threading.RLock() # Reentrant: derive() uses parameter()
+
+    def lock(self) -> threading.RLock:
+        return self.__lock
 
     def freq(self):
         return self.__freq
 
+    def portCount(self, param:ParamTypes) -> int:
+        # Known from the S parameters, without deriving param
+        S = self.__data.get(ParamTypes.S_PARAMETER)
+        if S is None:
+            return 0
+        return np.size(S, 1) // 2 if param in MIXED_MODE_BLOCKS else np.size(S, 1)
+
+    def pairing(self) -> Pairings:
+        return self.__pairing
+
+    @synchronized
+    def setPairing(self, pairing:Pairings):
+        pairing = Pairings(pairing)
+        if pairing == self.__pairing:
+            return
+
+        # Mixed-mode parameters are derived again with the new pairs
+        self.__data = {param: A for param, A in self.__data.items() if param not in MIXED_MODE_BLOCKS}
+        self.__quantities = {key: A for key, A in self.__quantities.items() if key[0] not in MIXED_MODE_BLOCKS}
+        self.__pairing = pairing
+
+    def dtype(self) -> np.dtype:
+        return self.__dtype
+
+    @synchronized
+    def setDtype(self, dtype):
+        # Storage precision of the parameters (complex or np.complex64).
+        # Derived parameters follow the precision of S, so they are computed again.
+        dtype = np.dtype(dtype)
+        if dtype == self.__dtype:
+            return
+
+        if dtype.itemsize > self.__dtype.itemsize and self.__path:
+            # Widening cannot restore the digits dropped by the narrow storage, S is read again
+            zref = self.__zref
+            freq, data, self.__zref = loadParameters(self.__path, dtype)
+            self.__data = dict(data)
+            if not np.array_equal(zref, self.__zref):
+                self.setReferenceImpedance(zref)
+            self.__quantities = {}
+            self.__dtype = dtype
+            return
+
+        self.__data = {param: A for param, A in self.__data.items() if param in SOURCE_PARAMETERS}
+        S = self.__data.get(ParamTypes.S_PARAMETER)
+        if S is not None:
+            self.__data[ParamTypes.S_PARAMETER] = S.astype(dtype)
+        self.__quantities = {}
+        self.__dtype = dtype
+
+    def referenceImpedance(self):
+        return self.__zref
+
+    @synchronized
+    def setReferenceImpedance(self, zref):
+        # Port reference impedance of S: scalar, per port (N,) or per frequency (F, N).
+        # S and the optimum source reflection (port 1) are renormalized in place and
+        # everything derived from them is computed again.
+        self.__data = {param: A for param, A in self.__data.items() if param in SOURCE_PARAMETERS}
+        S = self.__data.get(ParamTypes.S_PARAMETER)
+        if S is not None:
+            self.__data[ParamTypes.S_PARAMETER] = nyanRF.renormalize(S, self.__zref, zref)
+        gammaOpt = self.__data.get(ParamTypes.OPT_REFLECTION)
+        if gammaOpt is not None:
+            portOne = lambda z: z if np.ndim(z) == 0 else np.asarray(z)[..., :1]
+            gammaOpt = nyanRF.renormalize(gammaOpt[:, None, None], portOne(self.__zref), portOne(zref))
+            self.__data[ParamTypes.OPT_REFLECTION] = gammaOpt[:, 0, 0]
+        self.__quantities = {}
+        self.__zref = zref
+
+    def sourceResistance(self):
+        # Real part of the port 1 reference, the source the noise parameters refer to
+        zref = self.__zref
+        return np.real(zref) if np.ndim(zref) == 0 else np.real(np.asarray(zref)[..., 0])
+
+    def noiseCircleFrequency(self) -> float:
+        return self.__noiseFrequency
+
+    @synchronized
+    def setNoiseCircleFrequency(self, frequency:float):
+        # Frequency of the noise circles, None for the middle of the noise data
+        if frequency == self.__noiseFrequency:
+            return
+
+        self.__data.pop(NOISE_CIRCLES, None)
+        self.__noiseFrequency = frequency
+
+    def timeMode(self) -> TimeModes:
+        return self.__timeMode
+
+    def timeWindow(self) -> str:
+        return self.__timeWindow
+
+    @synchronized
+    def setTimeOptions(self, mode:TimeModes, window:str):
+        # Time domain mode and window (see nyanRF.TIME_WINDOWS), the responses are transformed again
+        mode = TimeModes(mode)
+        if mode == self.__timeMode and window == self.__timeWindow:
+            return
+
+        self.__quantities = {key: A for key, A in self.__quantities.items() if key[-1] != TIME_RESPONSE}
+        self.__timeMode = mode
+        self.__timeWindow = window
+
     def text(self) -> str:
         return self.__text
 
-    def vector(self, param:ParamTypes, n:int, m:int) -> np.ndarray:
+    @synchronized
+    def parameter(self, param:ParamTypes) -> np.ndarray:
+        # Derived parameters are computed on first use and memoized
         if param not in self.__data:
+            data = self.derive(param)
+            if data is None:
+                return None
+            self.__data[param] = data
+
+        return self.__data[param]
+
+    @synchronized
+    def derive(self, param:ParamTypes) -> np.ndarray:
+        S = self.__data.get(ParamTypes.S_PARAMETER)
+        if S is None:
+            return None
+
+        if param == ParamTypes.Z_PARAMETER:
+            return nyanRF.stoz(S, self.__zref)
+        elif param == ParamTypes.Y_PARAMETER:
+            return nyanRF.ztoy(self.parameter(ParamTypes.Z_PARAMETER))
+        elif param == ParamTypes.GROUP_DELAY:
+            return nyanRF.groupdelay(S, self.__freq)
+
+        # Noise parameters of 2-ports
+        if param in [ParamTypes.NOISE_FIGURE, ParamTypes.ASSOCIATED_GAIN, NOISE_CIRCLES]:
+            return self.deriveNoise(param, S)
+
+        # 2N-Port network parameters (ports 1..N on the input side)
+        numPorts = np.size(S, 1)
+        if param in MIXED_MODE_BLOCKS:
+            if numPorts % 2 != 0:
+                return None
+
+            # One transform gives all four blocks
+            p = numPorts // 2
+            pairs = nyanRF.differentialpairs(numPorts, self.__pairing == Pairings.ADJACENT)
+            Smm = nyanRF.stomm(S, pairs)
+            for mixedMode, (row, col) in MIXED_MODE_BLOCKS.items():
+                self.__data[mixedMode] = Smm[:, row * p:(row + 1) * p, col * p:(col + 1) * p]
+            return self.__data[param]
+
+        if param in [ParamTypes.H_PARAMETER, ParamTypes.ABCD_PARAMETER] and numPorts % 2 != 0:
+            return None
+        elif param == ParamTypes.H_PARAMETER:
+            return nyanRF.ztoh(self.parameter(ParamTypes.Z_PARAMETER))
+        elif param == ParamTypes.ABCD_PARAMETER:
+            return nyanRF.ztoa(self.parameter(ParamTypes.Z_PARAMETER))
+
+        # 2-Port metrics. Multi-ports give one value per port pair, element [n, m]
+        # having port m as input and port n as output like S[n, m].
+        if param in [ParamTypes.STABILITY_FACTOR, ParamTypes.MAX_GAIN]:
+            function = nyanRF.stabilityfactor if param == ParamTypes.STABILITY_FACTOR else nyanRF.maxgain
+            if numPorts == 2:
+                return function(S)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                A = function(S, nyanRF.portpairs(numPorts))
+            A[:, np.arange(numPorts), np.arange(numPorts)] = np.nan # Not a port pair
+            return A
+
+        return None
+
+    def deriveNoise(self, param:ParamTypes, S:np.ndarray) -> np.ndarray:
+        noise = [self.__data.get(name) for name in SOURCE_PARAMETERS[1:]]
+        if any(A is None for A in noise) or np.size(S, 1) != 2:
+            return None
+
+        nfmin, gammaOpt, rn = noise
+        z0 = self.sourceResistance()
+        if param == ParamTypes.NOISE_FIGURE:
+            # Driven by the reference impedance (Gs = 0)
+            return nyanRF.noisefigure(np.zeros(len(self.__freq)), nfmin, gammaOpt, rn, z0)
+        elif param == ParamTypes.ASSOCIATED_GAIN:
+            # Available gain at the minimum noise match
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return nyanRF.availablegain(S, gammaOpt)
+
+        # Noise circles at one frequency, separated by NaN so that they draw as one curve
+        valid = np.flatnonzero(np.isfinite(nfmin))
+        if len(valid) == 0:
+            return None
+        if self.__noiseFrequency is None:
+            index = valid[len(valid) // 2]
+        else:
+            index = valid[np.argmin(np.abs(self.__freq[valid] - self.__noiseFrequency))]
+
+        z0 = z0 if np.ndim(z0) == 0 else z0[index]
+        center, radius = nyanRF.noisecircles(nfmin[index] + np.array(NOISE_CIRCLE_STEPS),\
+                nfmin[index:index + 1], gammaOpt[index:index + 1], rn[index:index + 1], z0)
+        theta = np.linspace(0., 2. * np.pi, CIRCLE_POINTS)
+        circles = center[0, :, None] + radius[0, :, None] * np.exp(1j * theta)
+        return np.concatenate((circles, np.full((len(circles), 1), np.nan)), axis=1).ravel()
+
+    @synchronized
+    def noiseCircles(self) -> np.ndarray:
+        # Source reflections on the noise circles, drawn over S on the Smith charts. None without noise data.
+        return self.parameter(NOISE_CIRCLES)
+
+    @synchronized
+    def vector(self, param:ParamTypes, n:int, m:int) -> np.ndarray:
+        A = self.parameter(param)
+        if A is None:
             return None
 
-        A = self.__data[param]
         if A.ndim == 1:
             return A
         elif A.ndim == 3:
             if n < np.size(A, 1) and m < np.size(A, 2):
-                return np.array([a[n][m] for a in A])
+                return A[:, n, m] # Strided view, no copy
 
         return None
 
-    def load(self, path:str):
-        S, freq = nyanRF.loadsnp(path)
+    @synchronized
+    def timeResponse(self, param:ParamTypes) -> dict:
+        # Impulse and step responses of all elements in one transform, cached with the display quantities
+        key = (param, TIME_RESPONSE)
+        if key not in self.__quantities:
+            A = self.parameter(param)
+            if A is None or A.ndim != 3 or not np.iscomplexobj(A):
+                return None
+            self.__quantities[key] = nyanRF.timeresponse(A, self.__freq, self.__timeMode.name, self.__timeWindow)
+
+        return self.__quantities[key]
+
+    @synchronized
+    def timeQuantity(self, param:ParamTypes, n:int, m:int, quantity:Quantities) -> np.ndarray:
+        response = self.timeResponse(param)
+        if response is None:
+            return None
+
+        if quantity == Quantities.TIME:
+            return response['TIME']
+        A = response.get('STEP' if quantity == Quantities.STEP else 'IMPULSE') # No step in band-pass mode
+        if A is None or n >= np.size(A, 1) or m >= np.size(A, 2):
+            return None
+
+        vector = A[:, n, m]
+        return np.abs(vector) if np.iscomplexobj(vector) else vector
+
+    @synchronized
+    def quantity(self, param:ParamTypes, n:int, m:int, quantity:Quantities) -> np.ndarray:
+        if quantity in [Quantities.TIME, Quantities.IMPULSE, Quantities.STEP]:
+            return self.timeQuantity(param, n, m, quantity)
+
+        # Display quantities are cached until the network is reloaded
+        A = self.parameter(param)
+        if A is None:
+            return None
+
+        key = (param, 0, 0, quantity) if A.ndim == 1 else (param, n, m, quantity)
+        if key not in self.__quantities:
+            vector = self.vector(param, n, m)
+            if vector is None:
+                return None
+
+            if quantity == Quantities.DB:
+                self.__quantities[key] = 20. * np.log10(np.abs(vector))
+            elif quantity == Quantities.DEGREE:
+                self.__quantities[key] = np.angle(vector) / np.pi * 180.
+            elif quantity == Quantities.REAL:
+                self.__quantities[key] = np.real(vector)
+            else:
+                self.__quantities[key] = np.imag(vector)
+
+        return self.__quantities[key]
+
+    @synchronized
+    def setParameters(self, path:str, freq:np.ndarray, data:dict, zref = 50.):
         self.__freq = freq
+        self.__data = dict(data)
+        self.__quantities = {}
+        self.__zref = zref
         self.__text = os.path.basename(path)
-        if np.size(S) == 0:
-            raise RuntimeError('No data was loaded')
-
-        self.__data[ParamTypes.S_PARAMETER] = S
-        self.__data[ParamTypes.Z_PARAMETER] = nyanRF.stoz(S)
-        self.__data[ParamTypes.Y_PARAMETER] = nyanRF.ztoy(nyanRF.stoz(S))
-        self.__data[ParamTypes.GROUP_DELAY] = nyanRF.groupdelay(S, freq)
-
-        numPorts = np.size(S[0], 0)
-        if numPorts == 2:
-            # 2-Port network parameters
-            self.__data[ParamTypes.H_PARAMETER] = nyanRF.ztoh(nyanRF.stoz(S))
-            self.__data[ParamTypes.ABCD_PARAMETER] = nyanRF.ztoa(nyanRF.stoz(S))
-            self.__data[ParamTypes.STABILITY_FACTOR] = nyanRF.stabilityfactor(S)
-            self.__data[ParamTypes.MAX_GAIN] = nyanRF.maxgain(S)
+        self.__path = path
+        S = self.__data.get(ParamTypes.S_PARAMETER)
+        self.__dtype = np.dtype(complex) if S is None else S.dtype
+
+    def load(self, path:str, dtype = complex):
+        freq, data, zref = loadParameters(path, dtype)
+        self.setParameters(path, freq, data, zref)
+
+
+# Loads SnP file, Y/Z/H/G files are converted to S. Noise parameters are interpolated
+# onto the network frequencies (NaN outside the noise data). Derived parameters are computed
+# lazily by NetworkParameter. Module-level so that it can run in worker processes (see NetworkLoader).
+def loadParameters(path:str, dtype = complex) -> tuple:
+    network = readnetwork(path, useCache=True, dtype=dtype)
+    S = network.sparameters()
+    if np.size(S) == 0:
+        raise RuntimeError('No data was loaded')
 
+    data = {ParamTypes.S_PARAMETER: S}
+    noise = network.noiseAt(network.frequency())
+    if noise is not None:
+        data[ParamTypes.MIN_NOISE_FIGURE] = noise['NFMIN']
+        data[ParamTypes.OPT_REFLECTION] = noise['GAMMA_OPT']
+        data[ParamTypes.NOISE_RESISTANCE] = noise['RN']
+    return (network.frequency(), data, network.commonReference())
@@ -2,12 +2,13 @@ from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtCore import Signal, Slot, Qt
 from typing import override
 from enum import StrEnum
-import sys
 import os
+import functools
 import numpy as np
 import pyqtgraph as pg
 
-from NetworkParameterModule import NetworkParameter, ParamTypes
+from NetworkParameterModule import NetworkParameter, ParamTypes, Quantities
+from SeriesWorkerModule import SeriesWorker
 
 # PyQtGraph Global Options
 #pg.setConfigOptions(antialias=True)
@@ -23,10 +24,129 @@ class Diagrams(StrEnum):
     SMITH = 'Smith'
     ADMITTANCE_SMITH = 'Admit. Smith'
     POLAR = 'Polar'
+    STEP = 'Step (TDR/TDT)'
+    IMPULSE = 'Impulse'
+
+
+# Diagrams drawing the noise circles over the S parameters
+SMITH_DIAGRAMS = [Diagrams.SMITH, Diagrams.ADMITTANCE_SMITH]
+
+
+# Suffixes of a numPorts-port, grouped by the highest port number:
+# 11, 12, 21, 22, 13, 23, 31, 32, 33, 14, ... ('i,j' from 10 ports on)
+def suffixes(numPorts:int) -> list:
+    pairs = []
+    for k in range(1, numPorts + 1):
+        pairs += [(i, k) for i in range(1, k)] + [(k, j) for j in range(1, k)] + [(k, k)]
+    return [('{}{}' if numPorts < 10 else '{},{}').format(i, j) for i, j in pairs]
+
+
+class GridDensities(StrEnum):
+    COARSE = 'Coarse'
+    NORMAL = 'Normal'
+    FINE = 'Fine'
+
+
+# Smith chart grid values per level of detail: (resistances, reactances)
+SMITH_GRID_LEVELS = [
+        ([0., 1.], [1.]),
+        ([0., .2, .5, 1., 2., 5., 10.], [.2, .5, 1., 2., 5.]),
+        ([0., .1, .2, .3, .4, .5, .6, .8, 1., 1.5, 2., 3., 4., 5., 10., 20.],\
+                [.1, .2, .3, .4, .5, .6, .8, 1., 1.5, 2., 3., 4., 5., 10., 20.]),
+        (list(np.round(np.arange(0., 1., .05), 2)) + [1., 1.2, 1.4, 1.6, 1.8, 2., 3., 4., 5., 10., 20., 50.],\
+                list(np.round(np.arange(.05, 1., .05), 2)) + [1., 1.2, 1.4, 1.6, 1.8, 2., 3., 4., 5., 10., 20., 50.]) ]
+
+# Polar grid values per level of detail: (angle step in degrees, radii)
+POLAR_GRID_LEVELS = [
+        (90, [.5, 1.]),
+        (30, [.25, .5, .75, 1.]),
+        (15, list(np.round(np.arange(.1, 1.05, .1), 1))),
+        (5, list(np.round(np.arange(.05, 1.025, .05), 2))) ]
+
+
+"""Grid geometry of Smith, admittance Smith and polar charts
+All curves of one chart are joined into a single path separated by NaNs, so
+the whole grid is drawn by one PlotDataItem with connect='finite'. Results
+are cached and shared by every plot.
+Args:
+    diagram (Diagrams): SMITH, ADMITTANCE_SMITH or POLAR
+    level   (int)     : level of detail, index into the *_GRID_LEVELS tables
+    points  (int)     : points per circle or arc
+Returns:
+    x (ndarray): x coordinates
+    y (ndarray): y coordinates
+"""
+@functools.lru_cache(maxsize=None)
+def gridGeometry(diagram:Diagrams, level:int, points:int = 256) -> tuple:
+    curves = []
+    if diagram in [Diagrams.SMITH, Diagrams.ADMITTANCE_SMITH]:
+        resistances, reactances = SMITH_GRID_LEVELS[level]
+
+        # Constant resistance curves
+        t = np.linspace(0, 2 * np.pi, points)
+        for ReZ in resistances:
+            center = ReZ / (ReZ + 1)
+            radius = 1 / (ReZ + 1)
+            curves.append((center + radius * np.cos(t), radius * np.sin(t)))
+
+        # Constant reactance curves
+        for ImZ in reactances:
+            Zc = 1j * ImZ
+            radius = 1 / ImZ
+            angle = np.mod(np.angle((1 / Zc - 1) / (Zc + 1)), 2 * np.pi)
+            t = np.linspace(angle, 3 * np.pi / 2, points)
+            curves.append((1 + radius * np.cos(t),  radius + radius * np.sin(t)))
+            curves.append((1 + radius * np.cos(t), -radius - radius * np.sin(t)))
+
+        # Admittance chart is the impedance chart mirrored about the imaginary axis
+        if diagram == Diagrams.ADMITTANCE_SMITH:
+            curves = [(-x, y) for x, y in curves]
+
+    elif diagram == Diagrams.POLAR:
+        step, radii = POLAR_GRID_LEVELS[level]
+
+        # Theta-curves
+        for i in range(int(360 / step)):
+            theta = step * i / 180. * np.pi
+            curves.append((np.array([0, np.cos(theta)]), np.array([0, np.sin(theta)])))
+
+        # R-curves
+        t = np.linspace(0, 2 * np.pi, points)
+        for r in radii:
+            curves.append((r * np.cos(t), r * np.sin(t)))
+
+    if not curves:
+        return (np.zeros(0), np.zeros(0))
+
+    x = np.concatenate([np.append(x, np.nan) for x, y in curves])
+    y = np.concatenate([np.append(y, np.nan) for x, y in curves])
+    x.flags.writeable = False
+    y.flags.writeable = False
+    return (x, y)
 
 
 class NetworkParameterPlot(QtWidgets.QWidget):
 
+    # Signals
+    plotFailed = Signal(str, str) # network text, error message
+
+    # Suffixes listed for fewer ports, so that the usual selections are always available
+    MIN_SUFFIX_PORTS = 4
+
+    # Diagram --> (x, y) quantities of each panel (None: frequency)
+    PANELS = {
+            Diagrams.MAG: [(None, Quantities.DB)],
+            Diagrams.PHASE: [(None, Quantities.DEGREE)],
+            Diagrams.MAG_PHASE: [(None, Quantities.DB), (None, Quantities.DEGREE)],
+            Diagrams.REAL: [(None, Quantities.REAL)],
+            Diagrams.IMAGINARY: [(None, Quantities.IMAGINARY)],
+            Diagrams.REAL_IMAGINARY: [(None, Quantities.REAL), (None, Quantities.IMAGINARY)],
+            Diagrams.SMITH: [(Quantities.REAL, Quantities.IMAGINARY)],
+            Diagrams.ADMITTANCE_SMITH: [(Quantities.REAL, Quantities.IMAGINARY)],
+            Diagrams.POLAR: [(Quantities.REAL, Quantities.IMAGINARY)],
+            Diagrams.STEP: [(Quantities.TIME, Quantities.STEP)],
+            Diagrams.IMPULSE: [(Quantities.TIME, Quantities.IMPULSE)] }
+
     def __init__(self, networks:list, parent = None):
         super().__init__(parent)
         self.__parameterComboBox = QtWidgets.QComboBox()
@@ -38,11 +158,24 @@ class NetworkParameterPlot(QtWidgets.QWidget):
         self.__hlPlots = []
         self.__graph = pg.GraphicsLayoutWidget()
 
+        # Retained plot state
+        self.__layoutKey = None
+        self.__panels = []
+        self.__curves = {} # network --> (series key, [(gray item, highlight item) per panel])
+        self.__circles = {} # network --> noise circle item (Smith charts)
+        self.__gridItem = None
+        self.__gridLevel = None
+        self.__gridDensity = GridDensities.NORMAL
+        self.__downsampling = True
+        self.__requestedKey = None
+        self.__worker = SeriesWorker(self)
+
         self.setupUi()
         self.connectSignals()
 
     def setColor(self, color):
         self.__color = QtGui.QColor(color)
+        self.__layoutKey = None
 
     def setSuffix(self, suffix:str):
         self.__suffixComboBox.setCurrentText(suffix)
@@ -52,7 +185,24 @@ class NetworkParameterPlot(QtWidgets.QWidget):
 
     def parameterIndex(self):
         s = self.suffix()
-        return (int(s[0]) - 1, int(s[1]) - 1)
+        n, m = s.split(',') if ',' in s else s
+        return (int(n) - 1, int(m) - 1)
+
+    def updateSuffixes(self, paramType:ParamTypes):
+        # At least the suffixes of a 4-port, more if a loaded network has more ports
+        numPorts = max([network.portCount(paramType) for network in self.__networks] + [self.MIN_SUFFIX_PORTS])
+        items = suffixes(numPorts)
+        cb = self.__suffixComboBox
+        if items == [cb.itemText(index) for index in range(cb.count())]:
+            return
+
+        text = cb.currentText().replace(',', '')
+        cb.blockSignals(True)
+        cb.clear()
+        cb.addItems(items)
+        matches = [item for item in items if item.replace(',', '') == text]
+        cb.setCurrentText(matches[0] if matches else items[0])
+        cb.blockSignals(False)
 
     def setupUi(self):
         # Minimum size
@@ -63,8 +213,7 @@ class NetworkParameterPlot(QtWidgets.QWidget):
 
         # Populate comboboxes
         self.__parameterComboBox.addItems([item.value for item in ParamTypes])
-        self.__suffixComboBox.addItems(['11', '12', '21', '22',\
-                '13', '23', '31', '32', '33', '14', '24', '34', '41', '42', '43', '44'])
+        self.__suffixComboBox.addItems(suffixes(self.MIN_SUFFIX_PORTS))
         self.__diagramComboBox.addItems([item.value for item in Diagrams])
 
         # Layouts
@@ -88,6 +237,8 @@ class NetworkParameterPlot(QtWidgets.QWidget):
         self.__parameterComboBox.currentIndexChanged.connect(self.plot)
         self.__suffixComboBox.currentIndexChanged.connect(self.plot)
         self.__diagramComboBox.currentIndexChanged.connect(self.plot)
+        self.__worker.ready.connect(self.setSeries)
+        self.__worker.failed.connect(self.setSeriesError)
 
     @Slot()
     def setCurrentText(self, text:str):
@@ -103,412 +254,212 @@ class NetworkParameterPlot(QtWidgets.QWidget):
                     if item.name() == self.__currentText\
                     else None)
 
+        # Noise circles of the highlighted network only
+        for item in self.__circles.values():
+            item.setVisible(item.name() == self.__currentText)
+
     @Slot()
     def plot(self):
         paramType = ParamTypes(self.__parameterComboBox.currentText())
         diagram = Diagrams(self.__diagramComboBox.currentText())
+        self.updateSuffixes(paramType)
         n, m = self.parameterIndex()
-        
+
+        # The panels and the grid are only rebuilt when the diagram or the global options change.
+        # Otherwise the existing curve items are updated in place.
+        layoutKey = (diagram, pg.getConfigOption('background'), pg.getConfigOption('foreground'),\
+                pg.getConfigOption('antialias'))
+        if layoutKey != self.__layoutKey:
+            self.setupPanels(diagram)
+            self.__layoutKey = layoutKey
+
+        self.setLabels(diagram, paramType)
+        self.updateCurves(diagram, paramType, n, m)
+        self.hlPlot()
+
+    def setupPanels(self, diagram:Diagrams):
         # Clear
         self.__graph.clear()
         self.__hlPlots.clear()
+        self.__curves.clear()
+        self.__circles.clear()
+        self.__panels = []
+        self.__gridItem = None
 
         # Set background color
         self.__graph.setBackground(pg.getConfigOption('background'))
 
-        #------------------------------------------------------------------------------------------
-        # MAG PLOT
-        #------------------------------------------------------------------------------------------
-        if diagram == Diagrams.MAG:
-            p = self.__graph.addPlot()
-            p.setLabels(bottom='Frequency (Hz)', left=paramType.value+' (dB)')
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = 20. * np.log10(np.abs(vector))
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = 20. * np.log10(np.abs(vector))
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # PHASE PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.PHASE:
-            p = self.__graph.addPlot()
-            p.setLabels(bottom='Frequency (Hz)', left=paramType.value+' (deg)')
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.angle(vector) / np.pi * 180.
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.angle(vector) / np.pi * 180.
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # MAG & PHASE PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.MAG_PHASE:
-            pMag = self.__graph.addPlot(row=0, col=0)
-            pMag.setLabels(bottom='Frequency (Hz)', left='Mag (dB)')
-            pMag.getAxis('left').setGrid(20)
-            pMag.getAxis('bottom').setGrid(20)
-
-            pPhi = self.__graph.addPlot(row=1, col=0)
-            pPhi.setLabels(bottom='Frequency (Hz)', left='Phase (deg)')
-            pPhi.getAxis('left').setGrid(20)
-            pPhi.getAxis('bottom').setGrid(20)
-
-            pMag.getAxis('left').setWidth(50)
-            pPhi.getAxis('left').setWidth(50)
-            pPhi.setXLink(pMag)
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y1 = 20. * np.log10(np.abs(vector))
-                y2 = np.angle(vector) / np.pi * 180.
-
-                pMag.plot(x, y1, pen=pen)
-                pPhi.plot(x, y2, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y1 = 20. * np.log10(np.abs(vector))
-                y2 = np.angle(vector) / np.pi * 180.
-
-                pItem1 = pMag.plot(x, y1, pen=pen, name=network.text())
-                pItem2 = pPhi.plot(x, y2, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem1)
-                self.__hlPlots.append(pItem2)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # REAL PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.REAL:
-            p = self.__graph.addPlot()
-            p.setLabels(bottom='Frequency (Hz)', left='Re, '+paramType.value)
+        for row in range(len(self.PANELS[diagram])):
+            p = self.__graph.addPlot(row=row, col=0)
             p.getAxis('left').setGrid(20)
             p.getAxis('bottom').setGrid(20)
+            self.__panels.append(p)
 
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.real(vector)
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.real(vector)
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # IMAGINARY PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.IMAGINARY:
-            p = self.__graph.addPlot()
-            p.setLabels(bottom='Frequency (Hz)', left='Im, '+paramType.value)
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.imag(vector)
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y = np.imag(vector)
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # REAL & IMAGINARY PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.REAL_IMAGINARY:
-            pRe = self.__graph.addPlot(row=0, col=0)
-            pRe.setLabels(bottom='Frequency (Hz)', left='Re')
-            pRe.getAxis('left').setGrid(20)
-            pRe.getAxis('bottom').setGrid(20)
-
-            pIm = self.__graph.addPlot(row=1, col=0)
-            pIm.setLabels(bottom='Frequency (Hz)', left='Im')
-            pIm.getAxis('left').setGrid(20)
-            pIm.getAxis('bottom').setGrid(20)
-
-            pRe.getAxis('left').setWidth(50)
-            pIm.getAxis('left').setWidth(50)
-            pIm.setXLink(pRe)
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y1 = np.real(vector)
-                y2 = np.imag(vector)
-
-                pRe.plot(x, y1, pen=pen)
-                pIm.plot(x, y2, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = network.freq()
-                y1 = np.real(vector)
-                y2 = np.imag(vector)
-
-                pItem1 = pRe.plot(x, y1, pen=pen, name=network.text())
-                pItem2 = pIm.plot(x, y2, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem1)
-                self.__hlPlots.append(pItem2)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # SMITH PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.SMITH:
-            p = self.__graph.addPlot()
+        if len(self.__panels) > 1:
+            for p in self.__panels:
+                p.getAxis('left').setWidth(50)
+            for p in self.__panels[1:]:
+                p.setXLink(self.__panels[0])
 
+        if diagram in [Diagrams.SMITH, Diagrams.ADMITTANCE_SMITH, Diagrams.POLAR]:
             # Lock aspect ratio
+            p = self.__panels[0]
             p.setAspectLocked(True)
-            pen = pg.mkPen(color='#808080', width=1, style=Qt.SolidLine)
-            
-            # Constant resistance curves
-            for ReZ in [0., .2, .5, 1., 2., 5., 10.]:
-                t = np.linspace(0, 2 * np.pi, 256)
-                center = ReZ / (ReZ + 1)
-                radius = 1 / (ReZ + 1)
-                p.plot(center + radius * np.cos(t), radius * np.sin(t), pen=pen)
-
-            # Constant reactance curves
-            for ImZ in [.2, .5, 1., 2., 5.]:
-                Zc = 1j * ImZ
-                radius = 1 / ImZ
-                angle = np.mod(np.angle((1 / Zc - 1) / (Zc + 1)), 2 * np.pi)
-                t = np.linspace(angle, 3 * np.pi / 2, 256)
-                p.plot(1 + radius * np.cos(t),  radius + radius * np.sin(t), pen=pen)
-                p.plot(1 + radius * np.cos(t), -radius - radius * np.sin(t), pen=pen)
-
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-            p.setLabels(bottom='Real', left='Imaginary')
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = np.real(vector)
-                y = np.imag(vector)
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = np.real(vector)
-                y = np.imag(vector)
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # ADMITTANCE SMITH PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.ADMITTANCE_SMITH:
-            p = self.__graph.addPlot()
-
-            # Lock aspect ratio
-            p.setAspectLocked(True)
-            pen = pg.mkPen(color='#808080', width=1, style=Qt.SolidLine)
-            
-            # Constant conductance curves
-            for ReY in [0., .2, .5, 1., 2., 5., 10.]:
-                t = np.linspace(0, 2 * np.pi, 256)
-                center = -ReY / (ReY + 1)
-                radius = 1 / (ReY + 1)
-                p.plot(center + radius * np.cos(t), radius * np.sin(t), pen=pen)
-
-            # Constant susceptance curves
-            for ImY in [.2, .5, 1., 2., 5.]:
-                Yc = 1j * ImY
-                radius = 1 / ImY
-                angle = np.mod(np.angle((1 / Yc - 1) / (Yc + 1)), 2 * np.pi)
-                t = np.linspace(angle, 3 * np.pi / 2, 256)
-                p.plot(-1 - radius * np.cos(t),  radius + radius * np.sin(t), pen=pen)
-                p.plot(-1 - radius * np.cos(t), -radius - radius * np.sin(t), pen=pen)
-
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-            p.setLabels(bottom='Real', left='Imaginary')
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = np.real(vector)
-                y = np.imag(vector)
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = np.real(vector)
-                y = np.imag(vector)
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
-
-            self.hlPlot()
-
-        #------------------------------------------------------------------------------------------
-        # POLAR PLOT
-        #------------------------------------------------------------------------------------------
-        elif diagram == Diagrams.POLAR:
-            p = self.__graph.addPlot()
-
-            # Lock aspect ratio
-            p.setAspectLocked(True)
-            pen = pg.mkPen(color='#808080', width=1, style=Qt.SolidLine)
-
-            # Theta-curves
-            step = 30
-            for i in range(int(360 / step)):
-                theta = step * i / 180. * np.pi
-                p.plot([0, np.cos(theta)], [0, np.sin(theta)], pen=pen)
-
-            # R-curves
-            for r in [0.25, 0.5, 0.75, 1.]:
-                t = np.linspace(0, 2 * np.pi, 361)
-                p.plot(r * np.cos(t), r * np.sin(t), pen=pen)
-
-            p.getAxis('left').setGrid(20)
-            p.getAxis('bottom').setGrid(20)
-            p.setLabels(bottom='Real', left='Imaginary')
-
-            # Gray plots
-            pen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
-
-                x = np.real(vector)
-                y = np.imag(vector)
-                p.plot(x, y, pen=pen)
-
-            # Highlight plots
-            pen = None
-            for network in self.__networks:
-                vector = network.vector(paramType, n, m)
-                if vector is None:
-                    continue
+            self.drawGrid(p, diagram)
+
+    def setLabels(self, diagram:Diagrams, paramType:ParamTypes):
+        labels = {
+                Diagrams.MAG: [paramType.value+' (dB)'],
+                Diagrams.PHASE: [paramType.value+' (deg)'],
+                Diagrams.MAG_PHASE: ['Mag (dB)', 'Phase (deg)'],
+                Diagrams.REAL: ['Re, '+paramType.value],
+                Diagrams.IMAGINARY: ['Im, '+paramType.value],
+                Diagrams.REAL_IMAGINARY: ['Re', 'Im'] }
+        timeLabels = {
+                Diagrams.STEP: ['Step, '+paramType.value],
+                Diagrams.IMPULSE: ['Impulse, '+paramType.value] }
+
+        for index, p in enumerate(self.__panels):
+            if diagram in labels:
+                p.setLabels(bottom='Frequency (Hz)', left=labels[diagram][index])
+            elif diagram in timeLabels:
+                p.setLabels(bottom='Time (s)', left=timeLabels[diagram][index])
+            else:
+                p.setLabels(bottom='Real', left='Imaginary')
+
+    def setGridDensity(self, density:GridDensities):
+        self.__gridDensity = GridDensities(density)
+        self.__gridLevel = None
+        self.updateGrid()
+
+    def setDownsampling(self, downsampling:bool):
+        self.__downsampling = downsampling
+        for key, items in self.__curves.values():
+            for pair in items:
+                self.applyDownsampling(pair)
+
+    def applyDownsampling(self, items:tuple):
+        # Min/max decimation against the visible x range keeps resonances and notches
+        # intact. It assumes ascending x, so Smith and polar curves are left alone.
+        diagram = Diagrams(self.__diagramComboBox.currentText())
+        enabled = self.__downsampling and self.PANELS[diagram][0][0] in [None, Quantities.TIME]
+        for item in items:
+            item.setDownsampling(auto=enabled, method='peak')
+            item.setClipToView(enabled)
+
+    def drawGrid(self, p, diagram:Diagrams):
+        pen = pg.mkPen(color='#808080', width=1, style=Qt.SolidLine)
+        self.__gridItem = pg.PlotDataItem(connect='finite', pen=pen)
+        self.__gridItem.setZValue(0)
+        self.__gridLevel = None
+        p.addItem(self.__gridItem)
+        p.vb.sigRangeChanged.connect(self.updateGrid)
+        self.updateGrid()
 
-                x = np.real(vector)
-                y = np.imag(vector)
-                pItem = p.plot(x, y, pen=pen, name=network.text())
-                self.__hlPlots.append(pItem)
+    @Slot()
+    def updateGrid(self):
+        if self.__gridItem is None:
+            return
 
-            self.hlPlot()
+        # Level of detail: one level finer each time the view shrinks by about 3x
+        diagram = Diagrams(self.__diagramComboBox.currentText())
+        levels = SMITH_GRID_LEVELS if diagram != Diagrams.POLAR else POLAR_GRID_LEVELS
+        (xMin, xMax), (yMin, yMax) = self.__panels[0].vb.viewRange()
+        span = max(min(xMax - xMin, yMax - yMin), 1e-9)
+        zoom = int(max(np.floor(np.log(2.5 / span) / np.log(3.)), 0))
+        offset = list(GridDensities).index(self.__gridDensity)
+        level = min(offset + zoom, len(levels) - 1)
+
+        if level != self.__gridLevel:
+            self.__gridLevel = level
+            self.__gridItem.setData(*gridGeometry(diagram, level))
+
+    def series(self, network:NetworkParameter, diagram:Diagrams, paramType:ParamTypes, n:int, m:int):
+        # Runs on a worker thread. The network lock keeps all panels on the same options.
+        # Returns the (x, y) series of every panel and the noise circles (Smith charts), or None.
+        with network.lock():
+            if network.vector(paramType, n, m) is None:
+                return None
+
+            series = []
+            for xQuantity, yQuantity in self.PANELS[diagram]:
+                x = network.freq() if xQuantity is None\
+                        else network.quantity(paramType, n, m, xQuantity)
+                y = network.quantity(paramType, n, m, yQuantity)
+                if x is None or y is None or len(x) != len(y):
+                    return None # No step in band-pass mode
+                series.append((x, y))
+
+            circles = None
+            if diagram in SMITH_DIAGRAMS and paramType == ParamTypes.S_PARAMETER:
+                circles = network.noiseCircles()
+            return (series, circles)
+
+    def updateCurves(self, diagram:Diagrams, paramType:ParamTypes, n:int, m:int):
+        # Remove curves of networks which are gone
+        for network in [network for network in self.__curves if network not in self.__networks]:
+            key, items = self.__curves.pop(network)
+            for p, (grayItem, hlItem) in zip(self.__panels, items):
+                p.removeItem(grayItem)
+                p.removeItem(hlItem)
+            if network in self.__circles:
+                self.__panels[0].removeItem(self.__circles.pop(network))
+
+        # Add new curves, request series for the ones showing different data.
+        # Requests of the previous plot() call which are still running are dropped.
+        self.__worker.cancel()
+        grayPen = pg.mkPen(color=self.__color.lighter(), width=1, style=Qt.DashLine)
+        circlePen = pg.mkPen(color=self.__color, width=1, style=Qt.DotLine)
+        key = (paramType, n, m)
+        self.__requestedKey = key
+        for network in self.__networks:
+            if network not in self.__curves:
+                items = []
+                for p in self.__panels:
+                    grayItem = p.plot([], [], pen=grayPen)
+                    hlItem = p.plot([], [], pen=None, name=network.text())
+                    grayItem.setZValue(1) # Above the grid
+                    hlItem.setZValue(2)   # Above the gray curves
+                    self.applyDownsampling((grayItem, hlItem))
+                    items.append((grayItem, hlItem))
+                self.__curves[network] = (None, items)
+
+                if diagram in SMITH_DIAGRAMS:
+                    item = self.__panels[0].plot([], [], pen=circlePen, connect='finite', name=network.text())
+                    item.setZValue(2)
+                    self.__circles[network] = item
+
+            oldKey, items = self.__curves[network]
+            if oldKey != key:
+                self.__worker.submit(network, self.series, network, diagram, paramType, n, m)
+
+        self.__hlPlots = [hlItem for key, items in self.__curves.values() for grayItem, hlItem in items]
+
+    def invalidateCurves(self):
+        # The next plot() requests the series of every network again.
+        # Results of requests still running are discarded.
+        self.__worker.cancel()
+        self.__curves = {network: (None, items) for network, (key, items) in self.__curves.items()}
+
+    @Slot(int, object, object)
+    def setSeries(self, generation:int, network:NetworkParameter, result:tuple):
+        # Results of cancelled requests or of removed networks are ignored
+        if not self.__worker.isCurrent(generation) or network not in self.__curves:
+            return
 
+        series, circles = result if result else (None, None)
+        key, items = self.__curves[network]
+        for index, (grayItem, hlItem) in enumerate(items):
+            x, y = series[index] if series else ([], [])
+            grayItem.setData(x, y)
+            hlItem.setData(x, y)
+        if network in self.__circles:
+            x, y = (np.real(circles), np.imag(circles)) if circles is not None else ([], [])
+            self.__circles[network].setData(x, y)
+        self.__curves[network] = (self.__requestedKey, items)
+
+    @Slot(int, object, str)
+    def setSeriesError(self, generation:int, network:NetworkParameter, message:str):
+        if self.__worker.isCurrent(generation):
+            self.plotFailed.emit(network.text(), message)
+        self.setSeries(generation, network, None)
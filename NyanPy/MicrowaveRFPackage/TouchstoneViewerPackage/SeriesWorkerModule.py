@@ -0,0 +1,62 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+from PySide6.QtCore import Signal, Slot, Qt
+
+
+class SeriesJob(QtCore.QRunnable):
+
+    def __init__(self, worker, generation:int, tag, function, args:tuple):
+        super().__init__()
+        self.__worker = worker
+        self.__generation = generation
+        self.__tag = tag
+        self.__function = function
+        self.__args = args
+
+    def run(self):
+        # Jobs made stale while waiting in the queue are dropped without computing
+        if not self.__worker.isCurrent(self.__generation):
+            return
+
+        try:
+            result = self.__function(*self.__args)
+        except Exception as e:
+            if self.__worker.isCurrent(self.__generation):
+                self.__worker.failed.emit(self.__generation, self.__tag, str(e))
+            return
+
+        # Results are delivered to the GUI thread by a queued signal
+        if self.__worker.isCurrent(self.__generation):
+            self.__worker.ready.emit(self.__generation, self.__tag, result)
+
+
+# Computes plot series on a thread pool so that the GUI thread never waits for the numerics.
+# Every cancel() starts a new generation; jobs of older generations are skipped if they have
+# not started yet, and their results are discarded if they have.
+class SeriesWorker(QtCore.QObject):
+
+    # Signals
+    ready = Signal(int, object, object) # generation, tag, result
+    failed = Signal(int, object, str)   # generation, tag, error message
+
+    def __init__(self, parent = None, pool:QtCore.QThreadPool = None):
+        super().__init__(parent)
+        self.__pool = pool or QtCore.QThreadPool.globalInstance()
+        self.__generation = 0
+
+    def generation(self) -> int:
+        return self.__generation
+
+    def isCurrent(self, generation:int) -> bool:
+        return generation == self.__generation
+
+    @Slot()
+    def cancel(self):
+        self.__generation += 1
+
+    def submit(self, tag, function, *args) -> int:
+        job = SeriesJob(self, self.__generation, tag, function, args)
+        self.__pool.start(job)
+        return self.__generation
+
+    def waitForDone(self, msecs:int = -1) -> bool:
+        return self.__pool.waitForDone(msecs)
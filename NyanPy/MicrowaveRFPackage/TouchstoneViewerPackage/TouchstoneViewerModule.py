@@ -7,6 +7,7 @@ import numpy as np
 
 from NetworkParameterModule import NetworkParameter
 from NetworkParameterPlotModule import NetworkParameterPlot
+from NetworkLoaderModule import NetworkLoader
 from GraphOptionDialogModule import GraphOptionDialog
 
 class TouchstoneViewer(QtWidgets.QMainWindow):
@@ -16,6 +17,7 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
 
     MAX_ROW_COUNT = 3
     MAX_COLUMN_COUNT = 3
+    PLOT_ERROR_DELAY = 200 # ms
 
     def __init__(self, parent = None):
         super().__init__(parent)
@@ -32,6 +34,10 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
         self.__columnMenu = QtWidgets.QMenu('Column', self)
         self.__graphOptionDialog = GraphOptionDialog(self)
         self.__networks = []
+        self.__loader = NetworkLoader(self)
+        self.__progress = None
+        self.__loadErrors = ''
+        self.__plotErrors = ''
 
         self.setupUi()
         self.updateUi()
@@ -51,45 +57,71 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
     @Slot()
     def add(self):
         paths, selectedFilter = QtWidgets.QFileDialog.getOpenFileNames(self,\
-                'Open Files', '', 'Touchstone Files (*.s*p)')
-        
+                'Open Files', '', 'Touchstone Files (*.s*p *.ts)')
+        if not paths or self.__loader.isRunning():
+            return
+
         # Progress dialog
-        progress = QtWidgets.QProgressDialog(self)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.setLabelText('Loading files...')
-        progress.setMaximum(len(paths))
-        progress.setCancelButton(None)
-        progress.setWindowTitle('Progress')
-        progress.show()
-        error = ''
-
-        for i, path in enumerate(paths):
-            progress.setValue(i)
-            QtWidgets.QApplication.processEvents()
-            network = NetworkParameter()
-            try:
-                network.load(path)
-            except Exception as e:
-                error += 'Loading: '+path+'\nError: '+str(e)+'\n\n'
-            else:
-                cb = self.__filesComboBox
-                texts = [cb.itemText(index) for index in range(cb.count())]
-                if network.text() in texts:
-                    index = texts.index(network.text())
-                    self.__networks[index] = network
-                else:
-                    self.__networks.append(network)
-                    cb.addItem(network.text())
+        self.__progress = QtWidgets.QProgressDialog(self)
+        self.__progress.setWindowModality(Qt.WindowModal)
+        self.__progress.setLabelText('Loading files...')
+        self.__progress.setMaximum(len(paths))
+        self.__progress.setWindowTitle('Progress')
+        self.__progress.setAutoReset(False)
+        self.__progress.canceled.connect(self.__loader.cancel)
+        self.__progress.show()
+        self.__loadErrors = ''
+
+        # Files are parsed on a worker pool and delivered through the loader signals
+        self.__loader.start(paths, self.storageType())
+
+    @Slot()
+    def addNetwork(self, path:str, freq, data:dict, zref):
+        network = NetworkParameter()
+        network.setParameters(path, freq, data, zref)
+        network.setPairing(self.__graphOptionDialog.pairing())
+        network.setNoiseCircleFrequency(self.__graphOptionDialog.noiseCircleFrequency())
+        network.setTimeOptions(self.__graphOptionDialog.timeMode(), self.__graphOptionDialog.timeWindow())
+
+        cb = self.__filesComboBox
+        texts = [cb.itemText(index) for index in range(cb.count())]
+        if network.text() in texts:
+            index = texts.index(network.text())
+            self.__networks[index] = network
+        else:
+            self.__networks.append(network)
+            cb.addItem(network.text())
+
+    @Slot()
+    def addLoadError(self, path:str, message:str):
+        self.__loadErrors += 'Loading: '+path+'\nError: '+message+'\n\n'
+
+    @Slot()
+    def addPlotError(self, text:str, message:str):
+        # Series of one plot request fail one by one, their errors are shown together
+        if not self.__plotErrors:
+            QtCore.QTimer.singleShot(self.PLOT_ERROR_DELAY, self.showPlotErrors)
+        self.__plotErrors += 'Plotting: '+text+'\nError: '+message+'\n\n'
 
+    @Slot()
+    def showPlotErrors(self):
+        errors, self.__plotErrors = self.__plotErrors, ''
+        msgbox = QtWidgets.QMessageBox(self)
+        msgbox.setText(errors)
+        msgbox.exec()
+
+    @Slot()
+    def loadFinished(self):
         # Close progress
-        progress.close()
+        self.__progress.close()
+        self.__progress = None
 
         # Error messages
-        if error:
+        if self.__loadErrors:
             msgbox = QtWidgets.QMessageBox(self)
-            msgbox.setText(error)
+            msgbox.setText(self.__loadErrors)
             msgbox.exec()
-        
+
         # Update plots
         self.plotRequested.emit()
 
@@ -101,6 +133,52 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
         # Update plots
         self.plotRequested.emit()
 
+    def storageType(self):
+        return np.complex64 if self.__graphOptionDialog.singlePrecision() else complex
+
+    @Slot()
+    def applyGraphOptions(self):
+        # Networks already loaded are converted to the selected storage precision, port pairing,
+        # noise circle frequency and time domain options
+        dtype = np.dtype(self.storageType())
+        pairing = self.__graphOptionDialog.pairing()
+        noiseFrequency = self.__graphOptionDialog.noiseCircleFrequency()
+        timeOptions = (self.__graphOptionDialog.timeMode(), self.__graphOptionDialog.timeWindow())
+        converted = any(network.dtype() != dtype or network.pairing() != pairing\
+                or network.noiseCircleFrequency() != noiseFrequency\
+                or (network.timeMode(), network.timeWindow()) != timeOptions for network in self.__networks)
+
+        # Series requested with the old options are dropped before the networks change. A series
+        # being computed holds the network lock, the setters below wait for it.
+        plots = [self.__mainLayout.itemAtPosition(row, column).widget()\
+                for row in range(self.MAX_ROW_COUNT) for column in range(self.MAX_COLUMN_COUNT)]
+        if converted:
+            for plot in plots:
+                plot.invalidateCurves()
+
+        errors = ''
+        for network in self.__networks:
+            try:
+                network.setDtype(dtype) # Widening reads the file again
+            except Exception as e:
+                errors += 'Loading: '+network.text()+'\nError: '+str(e)+'\n\n'
+            network.setPairing(pairing)
+            network.setNoiseCircleFrequency(noiseFrequency)
+            network.setTimeOptions(*timeOptions)
+
+        for plot in plots:
+            plot.setGridDensity(self.__graphOptionDialog.gridDensity())
+            plot.setDownsampling(self.__graphOptionDialog.downsampling())
+
+        # Error messages
+        if errors:
+            msgbox = QtWidgets.QMessageBox(self)
+            msgbox.setText(errors)
+            msgbox.exec()
+
+        # Update plots
+        self.plotRequested.emit()
+
     def updateUi(self):
         for row in range(self.MAX_ROW_COUNT):
             for column in range(self.MAX_COLUMN_COUNT):
@@ -140,6 +218,7 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
                 # Signal connections
                 self.__filesComboBox.currentTextChanged.connect(plot.setCurrentText)
                 self.plotRequested.connect(plot.plot)
+                plot.plotFailed.connect(self.addPlotError)
 
         # Layouts
         hboxlayout = QtWidgets.QHBoxLayout()
@@ -183,7 +262,11 @@ class TouchstoneViewer(QtWidgets.QMainWindow):
     def connectSignals(self):
         self.__addButton.clicked.connect(self.add)
         self.__clearButton.clicked.connect(self.clear)
-        self.__graphOptionDialog.optionsChanged.connect(lambda: self.plotRequested.emit())
+        self.__loader.loaded.connect(self.addNetwork)
+        self.__loader.failed.connect(self.addLoadError)
+        self.__loader.progressChanged.connect(lambda value: self.__progress.setValue(value))
+        self.__loader.finished.connect(self.loadFinished)
+        self.__graphOptionDialog.optionsChanged.connect(self.applyGraphOptions)
 
 
 if __name__ == '__main__':
@@ -9,6 +9,10 @@ class RangeOptions(StrEnum):
     AUTO = 'auto'
     MANUAL = 'manual'
 
+class DownsamplingOptions(StrEnum):
+    OFF = 'off'
+    PEAK = 'min/max'
+
 class GraphProperties(QtCore.QObject):
 
     def __init__(self, parent = None):
@@ -32,6 +36,7 @@ class GraphProperties(QtCore.QObject):
         self.__legendColumnCount = 1
         self.__gridVisibility = Visibility.SHOW
         self.__gridOpacity = 20
+        self.__downsampling = DownsamplingOptions.PEAK
         self.__contentsMargins = (0, 0, 0, 0) # left,top,right,bottom 
         self.__width = 500
         self.__height = 300
@@ -69,6 +74,9 @@ class GraphProperties(QtCore.QObject):
     def gridOpacity(self) -> int:
         return self.__gridOpacity
 
+    def downsampling(self) -> DownsamplingOptions:
+        return self.__downsampling
+
     def contentsMargins(self) -> tuple:
         return self.__contentsMargins
 
@@ -119,6 +127,9 @@ class GraphProperties(QtCore.QObject):
     def setGridOpacity(self, gridOpacity:int):
         self.__gridOpacity = gridOpacity
 
+    def setDownsampling(self, downsampling:DownsamplingOptions):
+        self.__downsampling = downsampling
+
     def setContentsMargins(self, left:int, top:int, right:int, bottom:int):
         self.__contentsMargins = (left, top, right, bottom)
 
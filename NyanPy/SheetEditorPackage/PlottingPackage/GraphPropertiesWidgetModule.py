@@ -5,7 +5,7 @@ import sys
 import os
 
 from DataListItemModule import Axes, Visibility
-from GraphPropertiesModule import RangeOptions, GraphProperties
+from GraphPropertiesModule import RangeOptions, DownsamplingOptions, GraphProperties
 
 class GraphPropertiesWidget(QtWidgets.QWidget):
 
@@ -36,6 +36,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         self.__spinBox_LegendColumnCount = QtWidgets.QSpinBox()
         self.__comboBox_GridVisibility = QtWidgets.QComboBox()
         self.__spinBox_GridOpacity = QtWidgets.QSpinBox()
+        self.__comboBox_Downsampling = QtWidgets.QComboBox()
         self.__spinBox_MarginLeft = QtWidgets.QSpinBox()
         self.__spinBox_MarginTop = QtWidgets.QSpinBox()
         self.__spinBox_MarginRight = QtWidgets.QSpinBox()
@@ -67,6 +68,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         self.__graphProperties.setLegendColumnCount(self.__spinBox_LegendColumnCount.value())
         self.__graphProperties.setGridVisibility(Visibility(self.__comboBox_GridVisibility.currentText()))
         self.__graphProperties.setGridOpacity(self.__spinBox_GridOpacity.value())
+        self.__graphProperties.setDownsampling(DownsamplingOptions(self.__comboBox_Downsampling.currentText()))
         self.__graphProperties.setContentsMargins(\
                 self.__spinBox_MarginLeft.value(), self.__spinBox_MarginTop.value(),\
                 self.__spinBox_MarginRight.value(), self.__spinBox_MarginBottom.value())
@@ -89,6 +91,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         self.__comboBox_RightYRange.addItems([item.value for item in RangeOptions])
         self.__comboBox_LegendVisibility.addItems([item.value for item in Visibility])
         self.__comboBox_GridVisibility.addItems([item.value for item in Visibility])
+        self.__comboBox_Downsampling.addItems([item.value for item in DownsamplingOptions])
 
         # SpinBox ranges
         self.__spinBox_LegendPosX.setRange(0, 1000)
@@ -136,6 +139,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         self.__spinBox_LegendColumnCount.setValue(self.__graphProperties.legendColumnCount())
         self.__comboBox_GridVisibility.setCurrentText(self.__graphProperties.gridVisibility().value)
         self.__spinBox_GridOpacity.setValue(self.__graphProperties.gridOpacity())
+        self.__comboBox_Downsampling.setCurrentText(self.__graphProperties.downsampling().value)
 
         left, top, right, bottom = self.__graphProperties.contentsMargins()
         self.__spinBox_MarginLeft.setValue(left)
@@ -170,6 +174,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         row = self.addWidget(gridlayout, row, col, 'Column count:', self.__spinBox_LegendColumnCount)
         row = self.addWidget(gridlayout, row, col, 'Grid visibility:', self.__comboBox_GridVisibility)
         row = self.addWidget(gridlayout, row, col, 'Grid opacity:', self.__spinBox_GridOpacity)
+        row = self.addWidget(gridlayout, row, col, 'Downsampling:', self.__comboBox_Downsampling)
         row = self.addWidget(gridlayout, row, col, 'Margin left:', self.__spinBox_MarginLeft)
         row = self.addWidget(gridlayout, row, col, 'Margin top:', self.__spinBox_MarginTop)
         row = self.addWidget(gridlayout, row, col, 'Margin right:', self.__spinBox_MarginRight)
@@ -203,6 +208,7 @@ class GraphPropertiesWidget(QtWidgets.QWidget):
         self.__spinBox_LegendColumnCount.valueChanged.connect(self.updateGraphProperties)
         self.__comboBox_GridVisibility.currentIndexChanged.connect(self.updateGraphProperties)
         self.__spinBox_GridOpacity.valueChanged.connect(self.updateGraphProperties)
+        self.__comboBox_Downsampling.currentIndexChanged.connect(self.updateGraphProperties)
         self.__spinBox_MarginLeft.valueChanged.connect(self.updateGraphProperties)
         self.__spinBox_MarginTop.valueChanged.connect(self.updateGraphProperties)
         self.__spinBox_MarginRight.valueChanged.connect(self.updateGraphProperties)
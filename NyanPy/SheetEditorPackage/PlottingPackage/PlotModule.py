@@ -3,6 +3,7 @@ from PySide6.QtCore import Signal, Slot, Qt
 from typing import override
 import sys
 import os
+import numpy as np
 
 from DataListItemModule import *
 from GraphPropertiesModule import *
@@ -134,6 +135,11 @@ class Plot(pg.GraphicsLayoutWidget):
             plotDataItem = pg.PlotDataItem(x, y, name=name, pen=pen, symbol=symbol,\
                     symbolSize=symbolSize, symbolPen=symbolPen, symbolBrush=symbolBrush)
 
+            # View-dependent min/max decimation (needs monotonic x)
+            if properties.downsampling() == DownsamplingOptions.PEAK and self.isMonotonic(x):
+                plotDataItem.setDownsampling(auto=True, method='peak')
+                plotDataItem.setClipToView(True)
+
             plotItem = self.p1 if item.yaxis() == Axes.LEFT_Y else self.p2
             plotItem.addItem(plotDataItem)
             if properties.legendVisibility() == Visibility.SHOW and name:
@@ -145,6 +151,14 @@ class Plot(pg.GraphicsLayoutWidget):
         # Reset Global options
         pg.setConfigOptions(antialias=antialias, foreground=foreground)
 
+    @staticmethod
+    def isMonotonic(x) -> bool:
+        try:
+            x = np.asarray(x, dtype=float)
+        except Exception:
+            return False
+        return len(x) > 1 and bool(np.all(np.diff(x) >= 0))
+
     @Slot()
     def updateViews(self):
         if not self.p1 or not self.p2:
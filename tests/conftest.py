@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules import each other by module name, as when they run from their own directory
+PACKAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'NyanPy', 'MicrowaveRFPackage')
+sys.path[:0] = [PACKAGE, os.path.join(PACKAGE, 'TouchstoneViewerPackage')]
@@ -0,0 +1,38 @@
+import pytest
+
+from NyanRFBatchModule import expandpaths, runfiles, processfile
+from NyanRFDiagnosticsModule import diagnosefile
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    paths = []
+    for i in range(4):
+        s, frequency = randomnetwork(101, 2, seed=i)
+        paths.append(str(tmp_path / ('sub' if i % 2 else '') / 'network{}.s2p'.format(i)))
+        dumpsnp(s, frequency, paths[-1])
+    bad = tmp_path / 'bad.s2p'
+    bad.write_text('# GHZ S RI R 50\n1 x\n')
+    return (sorted(paths + [str(bad)]), tmp_path)
+
+
+def test_expandpaths(files):
+    paths, directory = files
+    assert expandpaths([str(directory / '**' / '*.s2p')]) == paths
+    assert expandpaths([paths[0], paths[0], str(directory / 'missing.s2p')]) == [paths[0]]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+@pytest.mark.parametrize('func, options', [\
+        (processfile, {'output': None, 'metrics': ['K'], 'at': [], 'ports': (0, 1), 'aperture': 1, 'cache': False,\
+        'left': None, 'right': None, 'renormalize': None}),\
+        (diagnosefile, {'passivity': 1e-6, 'reciprocity': 1e-3, 'causality': 1e-2, 'cache': False})])
+def test_runfiles(files, capsys, jobs, func, options):
+    paths, directory = files
+    handled = []
+    errors = runfiles(func, paths, options, jobs, lambda result: handled.append(result[0]))
+    assert errors == 1
+    assert handled == [path for path in paths if not path.endswith('bad.s2p')]
+    assert '1 of 5 files failed' in capsys.readouterr().err
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBatchModule import _fixture
+from NyanRFBenchmarkModule import randomnetwork, cascade_loop
+
+
+@pytest.fixture
+def networks():
+    return [randomnetwork(2001, 2, seed=i) for i in range(4)]
+
+
+def test_matches_reference(networks):
+    s1, f1 = cascade_loop(*networks)
+    s2, f2 = nyanRF.cascade(*networks)
+    # T matrices of weakly transmitting networks are large, so rounding differs a little
+    np.testing.assert_allclose(s2, s1, rtol=1e-6, atol=1e-9)
+    np.testing.assert_array_equal(f2, f1)
+
+
+def test_deembed(networks):
+    # The DUT is recovered, also with fixtures on a denser grid
+    left, right, dut = networks[:3]
+    measured = nyanRF.cascade(left, dut, right)
+    fine = np.linspace(dut[1][0], dut[1][-1], 2 * len(dut[1]) - 1)
+    leftFine = (nyanRF.resample(left[0], left[1], fine), fine)
+    rightFine = (nyanRF.resample(right[0], right[1], fine), fine)
+    s, frequency = nyanRF.deembed(measured, leftFine, rightFine)
+    np.testing.assert_allclose(s, dut[0], rtol=1e-6, atol=1e-9)
+
+
+def test_batch_fixture(networks):
+    s, frequency = networks[0]
+    with pytest.raises(RuntimeError, match='Fixture has 2 ports'):
+        _fixture((s, frequency, 50.), 4, 50.)
+
+    # A 25 Ohm fixture is referred to the 50 Ohm reference of the DUT
+    fixture = _fixture((nyanRF.renormalize(s, 50., 25.), frequency, 25.), 2, 50.)
+    np.testing.assert_allclose(fixture[0], s, atol=1e-12)
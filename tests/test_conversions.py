@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, stot_loop, ttos_loop, stoz_loop, ztos_loop, ztoy_loop,\
+        ztoh_loop, htoz_loop, ztoa_loop, atoz_loop, ytoz_loop
+
+
+# Per-port complex references
+def reference(n:int):
+    return 50. + 5. * np.arange(n) - 2j * np.arange(n)
+
+
+@pytest.mark.parametrize('n', [1, 2, 4, 8])
+@pytest.mark.parametrize('name, loop, vectorized', [('stoz', stoz_loop, nyanRF.stoz), ('ztos', ztos_loop, nyanRF.ztos)])
+def test_impedance_conversions(n, name, loop, vectorized):
+    s, frequency = randomnetwork(501, n)
+    x = s if name == 'stoz' else nyanRF.stoz(s, reference(n))
+    np.testing.assert_allclose(vectorized(x, reference(n)), loop(x, reference(n)), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('n', [1, 2, 4, 8])
+def test_ztoy(n):
+    z = nyanRF.stoz(randomnetwork(501, n)[0])
+    np.testing.assert_allclose(nyanRF.ztoy(z), ztoy_loop(z), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('name, loop, vectorized, source', [\
+        ('stot', stot_loop, nyanRF.stot, lambda s, z: s),\
+        ('ttos', ttos_loop, nyanRF.ttos, lambda s, z: nyanRF.stot(s)),\
+        ('ztoh', ztoh_loop, nyanRF.ztoh, lambda s, z: z),\
+        ('htoz', htoz_loop, nyanRF.htoz, lambda s, z: nyanRF.ztoh(z)),\
+        ('ztoa', ztoa_loop, nyanRF.ztoa, lambda s, z: z),\
+        ('atoz', atoz_loop, nyanRF.atoz, lambda s, z: nyanRF.ztoa(z)),\
+        ('ytoz', ytoz_loop, nyanRF.ytoz, lambda s, z: nyanRF.ztoy(z))])
+def test_twoport_conversions(name, loop, vectorized, source):
+    s, frequency = randomnetwork(501, 2)
+    x = source(s, nyanRF.stoz(s, reference(2)))
+    np.testing.assert_allclose(vectorized(x), loop(x), rtol=1e-9, atol=1e-12)
+
+
+def test_single_matrix():
+    # A single (N, N) matrix converts like a stack of one
+    s, frequency = randomnetwork(1, 3)
+    np.testing.assert_array_equal(nyanRF.stoz(s[0]), nyanRF.stoz(s)[0])
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+import NyanRFDiagnosticsModule as diagnostics
+from NyanRFBenchmarkModule import randomnetwork, diagnostics_loop
+
+
+@pytest.mark.parametrize('n', [2, 4, 16])
+def test_matches_reference(n):
+    s, frequency = randomnetwork(201, n)
+    sigma, error = diagnostics_loop(s)
+    np.testing.assert_allclose(diagnostics.passivity(s), sigma, rtol=1e-9)
+    np.testing.assert_allclose(diagnostics.reciprocity(s), error, rtol=1e-9)
+
+
+def test_causality():
+    # A delay line is causal, the same line advanced in time is not
+    frequency = np.linspace(0., 10e9, 1001)
+    s = np.zeros((len(frequency), 2, 2), dtype=complex)
+    s[:, 1, 0] = s[:, 0, 1] = np.exp(-2j * np.pi * frequency * 1e-9)
+    assert np.max(diagnostics.causality(s, frequency)) < 1e-3
+    assert np.max(diagnostics.causality(np.conj(s), frequency)) > 0.9
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+
+
+@pytest.mark.parametrize('aperture', [1, 3])
+def test_delay_line(aperture):
+    # Pure delay on a non-uniform grid, rotating many turns: the result is the delay itself
+    frequency = np.sort(np.random.default_rng(0).uniform(1e6, 20e9, 5001))
+    delay = 1.5e-9
+    s = np.exp(-2j * np.pi * frequency * delay)
+    np.testing.assert_allclose(nyanRF.groupdelay(s, frequency, aperture), delay, rtol=1e-6)
+
+
+def test_linear_delay():
+    # Quadratic phase: the central differences give the delay at every inner point exactly
+    frequency = np.linspace(1e9, 2e9, 1001)
+    tau = 1e-9 + 1e-19 * (frequency - 1e9)
+    phase = -2. * np.pi * (1e-9 * frequency + 0.5e-19 * (frequency - 1e9)**2)
+    s = np.exp(1j * phase)[:, None, None] * np.ones((1, 2, 2))
+    np.testing.assert_allclose(nyanRF.groupdelay(s, frequency)[1:-1, 1, 0], tau[1:-1], rtol=1e-6)
+
+
+def test_single_precision():
+    frequency = np.linspace(1e9, 2e9, 101)
+    s = np.exp(-2j * np.pi * frequency * 1e-9).astype(np.complex64)
+    assert nyanRF.groupdelay(s, frequency).dtype == np.float32
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp, loadsnp_loop
+
+
+# Both parsers convert the same tokens with the same float conversion: the results are bitwise equal
+@pytest.mark.parametrize('FORMAT', ['RI', 'MA', 'DB'])
+@pytest.mark.parametrize('n', [1, 2, 3, 4, 12])
+def test_matches_reference(tmp_path, n, FORMAT):
+    s, frequency = randomnetwork(1001, n)
+    path = str(tmp_path / 'network.s{}p'.format(n))
+    dumpsnp(s, frequency, path, FORMAT)
+
+    s1, f1 = loadsnp_loop(path)
+    s2, f2 = nyanRF.loadsnp(path, False)
+    np.testing.assert_array_equal(s2, s1)
+    np.testing.assert_array_equal(f2, f1)
+
+
+def test_invalid_number(tmp_path):
+    path = tmp_path / 'invalid.s1p'
+    path.write_text('# GHZ S RI R 50\n1.0 0.5 0.1\n2.0 0.5x 0.1\n')
+    with pytest.raises(RuntimeError, match='invalid number'):
+        nyanRF.loadsnp(str(path), False)
+    with pytest.raises(RuntimeError, match='invalid number'):
+        nyanRF.streamsnp(str(path))
+
+
+def test_tokenize_blocks(monkeypatch):
+    # Blocks end at line breaks, numbers are never cut in two
+    monkeypatch.setattr(nyanRF, 'TOKEN_BLOCK_BYTES', 7)
+    text = '1.5 -2.25e3\n3 4\n\n nan 6.125\n7'
+    np.testing.assert_array_equal(nyanRF._tokenize(text), np.array(text.split(), dtype=float))
+    assert len(nyanRF._tokenize(' \n ')) == 0
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, mixedmode_loop
+
+
+@pytest.mark.parametrize('n', [4, 8])
+@pytest.mark.parametrize('adjacent', [True, False])
+def test_matches_reference(n, adjacent):
+    s, frequency = randomnetwork(101, n)
+    pairs = nyanRF.differentialpairs(n, adjacent)
+    smm = nyanRF.stomm(s, pairs)
+    np.testing.assert_allclose(smm, mixedmode_loop(s, pairs), rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(nyanRF.mmtos(smm, pairs), s, rtol=1e-12, atol=1e-15)
+
+
+def test_differential_pairs():
+    assert nyanRF.differentialpairs(4) == [(0, 1), (2, 3)]
+    assert nyanRF.differentialpairs(4, False) == [(0, 2), (1, 3)]
+    with pytest.raises(RuntimeError):
+        nyanRF.differentialpairs(3)
+
+
+def test_invalid_pairs():
+    s, frequency = randomnetwork(11, 4)
+    with pytest.raises(RuntimeError, match='every port exactly once'):
+        nyanRF.stomm(s, [(0, 1), (1, 3)])
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, maxgain_loop
+
+
+@pytest.mark.parametrize('n', [4, 8, 16])
+@pytest.mark.parametrize('name', ['stot/ttos', 'ztoh/htoz', 'ztoa/atoz'])
+def test_round_trip(n, name):
+    s, frequency = randomnetwork(1001, n)
+    forward, inverse, x = {'stot/ttos': (nyanRF.stot, nyanRF.ttos, s),\
+            'ztoh/htoz': (nyanRF.ztoh, nyanRF.htoz, nyanRF.stoz(s)),\
+            'ztoa/atoz': (nyanRF.ztoa, nyanRF.atoz, nyanRF.stoz(s))}[name]
+    # Relative to the largest element: random blocks are not always well conditioned
+    assert np.max(np.abs(inverse(forward(x)) - x)) <= 1e-9 * np.max(np.abs(x))
+
+
+@pytest.mark.parametrize('n', [4, 8])
+def test_maxgain_port_pairs(n):
+    # Every port pair at once against the 2x2 reference on each sub-network
+    s, frequency = randomnetwork(201, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mag = nyanRF.maxgain(s, nyanRF.portpairs(n))
+    for a, b in [(1, n - 1), (0, 2)]:
+        sub = s[:, [a, b]][:, :, [a, b]]
+        np.testing.assert_allclose(mag[:, b, a], maxgain_loop(sub), rtol=1e-9, atol=1e-12)
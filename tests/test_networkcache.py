@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NetworkCacheModule import NetworkCache
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp
+
+
+@pytest.fixture
+def cache(tmp_path):
+    previous = nyanRF.networkcache()
+    cache = NetworkCache(str(tmp_path / 'cache'))
+    nyanRF.setnetworkcache(cache)
+    yield cache
+    nyanRF.setnetworkcache(previous)
+
+
+@pytest.fixture
+def path(tmp_path):
+    s, frequency = randomnetwork(101, 4)
+    path = str(tmp_path / 'network.s4p')
+    dumpsnp(s, frequency, path)
+    return path
+
+
+def test_off_by_default(cache, path):
+    nyanRF.loadsnp(path)
+    assert cache.entries() == []
+
+
+def test_round_trip(cache, path):
+    s1, f1 = nyanRF.loadsnp(path, True)
+    assert len(cache.entries()) == 1
+    s2, f2 = nyanRF.loadsnp(path, True, np.complex64)
+    np.testing.assert_array_equal(s2, s1.astype(np.complex64))
+    np.testing.assert_array_equal(f2, f1)
+
+
+def test_unwritable_directory(tmp_path, path):
+    # A file in place of the cache directory: reading works, nothing is cached
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('')
+    previous = nyanRF.networkcache()
+    nyanRF.setnetworkcache(NetworkCache(str(blocker / 'cache')))
+    try:
+        s, frequency = nyanRF.loadsnp(path, True)
+    finally:
+        nyanRF.setnetworkcache(previous)
+    assert np.size(s, 1) == 4
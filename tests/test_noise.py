@@ -0,0 +1,94 @@
+import sys
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp, noise_loop
+
+
+@pytest.fixture
+def noisy(tmp_path):
+    # Touchstone 1.x 2-port followed by its noise parameters
+    s, frequency = randomnetwork(101, 2)
+    path = str(tmp_path / 'noisy.s2p')
+    dumpsnp(s, frequency, path)
+    noise = np.column_stack((frequency[::10] / 1e9, np.linspace(0.5, 2., 11), np.full(11, 0.3),\
+            np.full(11, 45.), np.full(11, 0.4)))
+    with open(path, 'a') as f:
+        np.savetxt(f, noise, fmt='%.9e')
+    return path
+
+
+@pytest.fixture
+def amplifier():
+    numPoints = 101
+    s, frequency = randomnetwork(numPoints, 2)
+    nfmin = np.linspace(0.5, 2., numPoints)
+    gammaOpt = 0.4 * np.exp(1j * np.linspace(0., np.pi, numPoints))
+    rn = np.linspace(5., 20., numPoints)
+    return (s, nfmin, gammaOpt, rn)
+
+
+def test_matches_reference(amplifier):
+    # Source grid inside the unit circle, the same at every frequency
+    s, nfmin, gammaOpt, rn = amplifier
+    x = np.linspace(-0.9, 0.9, 21)
+    grid = (x[:, None] + 1j * x[None, :]).ravel()
+    grid = grid[np.abs(grid) < 0.95]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nf = nyanRF.noisefigure(grid[None, :], nfmin, gammaOpt, rn)
+        ga = nyanRF.availablegain(s, grid[None, :])
+        nfLoop, gaLoop = noise_loop(s, np.broadcast_to(grid, (len(s), len(grid))), nfmin, gammaOpt, rn)
+    np.testing.assert_allclose(nf, nfLoop)
+    np.testing.assert_allclose(ga, gaLoop, equal_nan=True)
+
+
+def test_outside_unit_circle(amplifier):
+    s, nfmin, gammaOpt, rn = amplifier
+    assert np.all(np.isnan(nyanRF.noisefigure(1.1, nfmin, gammaOpt, rn)))
+
+
+def test_noise_circles(amplifier):
+    # Points on the circles are at their levels
+    s, nfmin, gammaOpt, rn = amplifier
+    levels = np.max(nfmin) + np.array([0.25, 0.5, 1., 3.])
+    center, radius = nyanRF.noisecircles(levels, nfmin, gammaOpt, rn)
+    points = center[:, :, None] + radius[:, :, None] * np.exp(1j * np.linspace(0., 2. * np.pi, 16))
+    circle = nyanRF.noisefigure(points.reshape(len(s), -1), nfmin, gammaOpt, rn)
+    np.testing.assert_allclose(circle.reshape(points.shape), np.broadcast_to(levels[None, :, None], points.shape))
+
+    # No circle below NFmin
+    center, radius = nyanRF.noisecircles(0., nfmin, gammaOpt, rn)
+    assert np.all(np.isnan(radius))
+
+
+def test_available_gain_circles(amplifier):
+    # Stable points only: gain circles of a potentially unstable 2-port can be empty
+    s, nfmin, gammaOpt, rn = amplifier
+    stable = nyanRF.stabilityfactor(s) > 1.
+    assert np.any(stable)
+    levels = np.min(nyanRF.maxgain(s[stable])) * np.array([0.5, 0.9])
+    center, radius = nyanRF.availablegaincircles(s[stable], levels)
+    gain = nyanRF.availablegain(s[stable], center + radius)
+    np.testing.assert_allclose(gain, np.broadcast_to(levels[None, :], gain.shape))
+
+
+# The viewer needs PySide6 and Python 3.12 (typing.override)
+@pytest.mark.skipif(sys.version_info < (3, 12), reason='requires Python 3.12')
+def test_noise_circles_overlay(noisy):
+    pytest.importorskip('PySide6')
+    from NetworkParameterModule import NetworkParameter, ParamTypes, NOISE_CIRCLE_STEPS
+
+    # Circles are an overlay of the S parameters, not a parameter of their own
+    assert 'Noise Circles' not in [item.value for item in ParamTypes]
+
+    network = NetworkParameter()
+    network.load(noisy)
+    network.setNoiseCircleFrequency(1e10)
+    circles = network.noiseCircles()
+    index = np.argmin(np.abs(network.freq() - 1e10))
+    points = circles[np.isfinite(circles)].reshape(len(NOISE_CIRCLE_STEPS), -1)
+    nfmin, gammaOpt, rn = [network.parameter(param)[index] for param in\
+            [ParamTypes.MIN_NOISE_FIGURE, ParamTypes.OPT_REFLECTION, ParamTypes.NOISE_RESISTANCE]]
+    nf = nyanRF.noisefigure(points, nfmin, gammaOpt, rn, network.sourceResistance())
+    np.testing.assert_allclose(nf, np.broadcast_to(nfmin + np.array(NOISE_CIRCLE_STEPS)[:, None], nf.shape))
@@ -0,0 +1,67 @@
+import sys
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp, displayerror
+
+# Bounds of the display error of complex64 storage: (dB, degrees)
+BOUNDS = {'S': (1e-4, 1e-4), 'Z': (1e-2, 1e-2), 'Y': (1e-2, 1e-2)}
+DERIVE = {'S': lambda s: s, 'Z': lambda s: nyanRF.stoz(s), 'Y': lambda s: nyanRF.ztoy(nyanRF.stoz(s))}
+
+
+@pytest.fixture(scope='module')
+def path(tmp_path_factory):
+    s, frequency = randomnetwork(2001, 8)
+    path = str(tmp_path_factory.mktemp('precision') / 'network.s8p')
+    dumpsnp(s, frequency, path)
+    return path
+
+
+@pytest.fixture(scope='module')
+def networks(path):
+    return (nyanRF.loadsnp(path, False), nyanRF.loadsnp(path, False, np.complex64))
+
+
+@pytest.mark.parametrize('name', ['S', 'Z', 'Y'])
+def test_display_error(networks, name):
+    (s1, f1), (s2, f2) = networks
+    x1, x2 = DERIVE[name](s1), DERIVE[name](s2)
+    assert x2.dtype == np.complex64
+
+    dB, deg = displayerror(x1, x2)
+    assert dB <= BOUNDS[name][0]
+    assert deg <= BOUNDS[name][1]
+
+
+def test_groupdelay(networks):
+    (s1, f1), (s2, f2) = networks
+    tau1, tau2 = nyanRF.groupdelay(s1, f1), nyanRF.groupdelay(s2, f2)
+    assert np.max(np.abs(tau1 - tau2)) <= 1e-5 * np.max(np.abs(tau1))
+
+
+@pytest.mark.parametrize('name', ['K', 'MU', 'MAG'])
+def test_twoport_metrics(networks, name):
+    (s1, f1), (s2, f2) = networks
+    m1 = nyanRF.stabilitymetrics(s1[:, :2, :2])
+    m2 = nyanRF.stabilitymetrics(s2[:, :2, :2])
+    np.testing.assert_allclose(m2[name], m1[name], rtol=1e-4)
+
+
+# The viewer needs PySide6 and Python 3.12 (typing.override)
+@pytest.mark.skipif(sys.version_info < (3, 12), reason='requires Python 3.12')
+def test_widening_restores_full_precision(path):
+    pytest.importorskip('PySide6')
+    from NetworkParameterModule import NetworkParameter, ParamTypes, Quantities
+
+    network = NetworkParameter()
+    network.load(path)
+    network.setReferenceImpedance(25.)
+    reference = network.quantity(ParamTypes.Z_PARAMETER, 0, 1, Quantities.DB).copy()
+
+    network.setDtype(np.complex64)
+    assert network.parameter(ParamTypes.S_PARAMETER).dtype == np.complex64
+    network.setDtype(complex)
+    assert network.parameter(ParamTypes.S_PARAMETER).dtype == np.complex128
+    assert network.referenceImpedance() == 25.
+    np.testing.assert_array_equal(network.quantity(ParamTypes.Z_PARAMETER, 0, 1, Quantities.DB), reference)
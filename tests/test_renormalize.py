@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, renormalize_loop
+
+
+@pytest.mark.parametrize('n', [2, 4])
+def test_matches_round_trip(n):
+    # Complex per-port and per-frequency references against the Z round trip
+    s, frequency = randomnetwork(201, n)
+    zref = 50. + 10j * np.arange(n)
+    znew = np.linspace(20., 80., len(s))[:, None] - 5j * np.arange(n)
+    np.testing.assert_allclose(nyanRF.renormalize(s, zref, znew), nyanRF.ztos(nyanRF.stoz(s, zref), znew), atol=1e-12)
+
+
+@pytest.mark.parametrize('n', [2, 4])
+def test_candidates(n):
+    s, frequency = randomnetwork(101, n)
+    candidates = np.linspace(10., 100., 8) + 1j * np.linspace(-20., 20., 8)
+    x = nyanRF.renormalize(s, 50., candidates[:, None, None])
+    np.testing.assert_allclose(x, renormalize_loop(s, 50., candidates), atol=1e-12)
+
+
+def test_same_reference():
+    s, frequency = randomnetwork(101, 2)
+    np.testing.assert_allclose(nyanRF.renormalize(s, 50., 50.), s, atol=1e-15)
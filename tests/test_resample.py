@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, resample_loop
+
+
+@pytest.mark.parametrize('n', [1, 4])
+def test_linear_matches_reference(n):
+    s, frequency = randomnetwork(1001, n)
+    newFrequency = np.linspace(frequency[0], frequency[-1], 507)
+    np.testing.assert_allclose(nyanRF.resample(s, frequency, newFrequency),\
+            resample_loop(s, frequency, newFrequency), rtol=1e-12, atol=1e-15)
+
+
+def test_cubic_is_exact_for_cubics():
+    # Non-uniform grid: the 4-point Lagrange stencil reproduces any cubic polynomial
+    frequency = np.sort(np.random.default_rng(0).uniform(0., 1., 20))
+    newFrequency = np.linspace(frequency[0], frequency[-1], 101)
+    cubic = lambda f: 2. - f + 3. * f**2 - 5j * f**3
+    np.testing.assert_allclose(nyanRF.resample(cubic(frequency), frequency, newFrequency, 'cubic'),\
+            cubic(newFrequency), atol=1e-12)
+
+
+def test_cubic_needs_four_points():
+    frequency = np.array([1., 2., 3.])
+    with pytest.raises(RuntimeError, match='at least 4'):
+        nyanRF.resample(np.ones(3), frequency, np.array([1.5, 2.5]), 'cubic')
+
+
+def test_delay_line():
+    # Cubic and polar interpolation follow the rotation of a delay line much closer than linear
+    frequency = np.linspace(1e9, 2e9, 101)
+    newFrequency = np.linspace(1e9, 2e9, 1001)
+    line = lambda f: np.exp(-2j * np.pi * f * 3e-9)
+    error = lambda method, polar: np.max(np.abs(nyanRF.resample(line(frequency), frequency, newFrequency,\
+            method, polar) - line(newFrequency)))
+    assert error('cubic', False) < 0.05 * error('linear', False)
+    assert error('linear', True) < 1e-9
+
+
+def test_cached_weights():
+    s, frequency = randomnetwork(201, 2)
+    newFrequency = np.sort(np.random.default_rng(1).uniform(frequency[0], frequency[-1], 150))
+    uncached = nyanRF._applyweights(s, *nyanRF._interpolationweights(frequency, newFrequency, 'cubic'))
+    for i in range(2):
+        np.testing.assert_array_equal(nyanRF.resample(s, frequency, newFrequency, 'cubic'), uncached)
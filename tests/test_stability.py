@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, stabilityfactor_loop, maxgain_loop
+
+
+@pytest.fixture
+def active():
+    s, frequency = randomnetwork(1001, 2)
+    s[:, 1, 0] *= 10.
+    return s
+
+
+@pytest.mark.parametrize('loop, vectorized', [(stabilityfactor_loop, nyanRF.stabilityfactor),\
+        (maxgain_loop, nyanRF.maxgain)])
+def test_matches_reference(active, loop, vectorized):
+    np.testing.assert_allclose(vectorized(active), loop(active), rtol=1e-9)
+
+
+def test_bias_sweep(active):
+    # A (B, F, 2, 2) stack gives the metrics of every bias point
+    bias = np.stack((active, 0.5 * active))
+    metrics = nyanRF.stabilitymetrics(bias)
+    for b in range(2):
+        single = nyanRF.stabilitymetrics(bias[b])
+        for name in ['K', 'MU', 'MAG']:
+            np.testing.assert_allclose(metrics[name][b], single[name], rtol=1e-12)
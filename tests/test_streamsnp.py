@@ -0,0 +1,45 @@
+import gzip
+import shutil
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp
+
+# Peak memory bound of streamsnp: the result plus this many text chunks
+STREAM_CHUNK_BOUND = 8
+CHUNK_BYTES = 1 << 20
+
+
+@pytest.fixture(scope='module')
+def large(tmp_path_factory):
+    # About 40 MB of text, many times the chunk budget
+    s, frequency = randomnetwork(20001, 8)
+    path = str(tmp_path_factory.mktemp('streamsnp') / 'large.s8p')
+    dumpsnp(s, frequency, path)
+    return path
+
+
+def test_matches_loadsnp(large):
+    s1, f1 = nyanRF.loadsnp(large, False)
+    for chunkBytes in [CHUNK_BYTES, 4096]:
+        s2, f2 = nyanRF.streamsnp(large, chunkBytes)
+        np.testing.assert_array_equal(s2, s1)
+        np.testing.assert_array_equal(f2, f1)
+
+
+def test_peak_memory(large):
+    (s1, f1), peak1 = nyanRF.peakmemory(nyanRF.loadsnp, large, False)
+    (s2, f2), peak2 = nyanRF.peakmemory(nyanRF.streamsnp, large, CHUNK_BYTES)
+    assert peak2 <= s2.nbytes + f2.nbytes + STREAM_CHUNK_BOUND * CHUNK_BYTES
+    assert peak2 < peak1
+
+
+def test_gzip(large, tmp_path):
+    path = str(tmp_path / 'large.s8p.gz')
+    with open(large, 'rb') as f, gzip.open(path, 'wb', compresslevel=1) as g:
+        shutil.copyfileobj(f, g)
+    s1, f1 = nyanRF.loadsnp(large, False)
+    s2, f2 = nyanRF.streamsnp(path, CHUNK_BYTES)
+    np.testing.assert_array_equal(s2, s1)
+    np.testing.assert_array_equal(f2, f1)
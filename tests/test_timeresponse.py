@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import timeresponse_loop
+
+
+@pytest.fixture(params=[2, 4])
+def lines(request):
+    # Ideal lines: delay tau_ij = (i + j + 1) * 0.1 ns, short circuits on the diagonal
+    n = request.param
+    frequency = np.linspace(10e6, 20e9, 2001)
+    tau = (np.arange(n)[:, None] + np.arange(n)[None, :] + 1) * 0.1e-9
+    s = np.exp(-2j * np.pi * frequency[:, None, None] * tau)
+    s[:, np.arange(n), np.arange(n)] = -1.
+    return (s, frequency, tau)
+
+
+@pytest.mark.parametrize('mode', ['BANDPASS', 'LOWPASS'])
+def test_matches_reference(lines, mode):
+    s, frequency, tau = lines
+    response = nyanRF.timeresponse(s, frequency, mode)
+    loop = timeresponse_loop(s, frequency, mode)
+    np.testing.assert_array_equal(response['TIME'], loop['TIME'])
+    for name in loop:
+        np.testing.assert_allclose(response[name], loop[name], err_msg=name)
+
+
+@pytest.mark.parametrize('mode', ['BANDPASS', 'LOWPASS'])
+def test_impulse_at_line_delay(lines, mode):
+    s, frequency, tau = lines
+    response = nyanRF.timeresponse(s, frequency, mode)
+    t = response['TIME']
+    peak = t[np.argmax(np.abs(response['IMPULSE']), axis=0)]
+    offDiagonal = ~np.eye(len(tau), dtype=bool)
+    assert np.max(np.abs(peak - tau)[offDiagonal]) <= 2. * (t[1] - t[0])
+
+
+def test_step_settles(lines):
+    # Steps settle to the DC values: 1 through the lines, -1 at the shorts
+    s, frequency, tau = lines
+    step = nyanRF.timeresponse(s, frequency)['STEP']
+    np.testing.assert_allclose(step[-1], np.where(np.eye(len(tau), dtype=bool), -1., 1.), atol=1e-6)
+
+
+def test_dc_magnitude_is_clamped():
+    # |S21| falls steeply towards DC: the linear extrapolation goes below 0, which must not flip the sign
+    frequency = np.linspace(1e9, 20e9, 191)
+    x = np.minimum(0.1 + 8e-9 * (frequency - 1e9), 1.).astype(complex)
+    h, harmonic = nyanRF.extrapolatedc(x, frequency)
+    assert harmonic[0] == 0.
+    assert h[0] == 0.
+
+    # The step settles to the DC value
+    step = nyanRF.timeresponse(x, frequency)['STEP']
+    assert step[-1] == pytest.approx(0., abs=1e-9)
+
+
+def test_dc_sign_follows_phase():
+    # An inverting line: magnitude 0.5, phase near 180 deg at the low end
+    frequency = np.linspace(1e8, 1e9, 10)
+    x = -0.5 * np.exp(-2j * np.pi * frequency * 1e-11)
+    h, harmonic = nyanRF.extrapolatedc(x, frequency)
+    assert h[0] == pytest.approx(-0.5)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NetworkModule import readnetwork
+from NyanRFBenchmarkModule import randomnetwork, dumpsnp, dumpts
+
+
+@pytest.fixture
+def reciprocal():
+    # Reciprocal network, so that the triangular formats hold all of it
+    s, frequency = randomnetwork(1001, 4)
+    return (s + np.swapaxes(s, 1, 2), frequency)
+
+
+@pytest.fixture
+def noisy(tmp_path):
+    # The same 2-port as Touchstone 1.x and 2.0 files, each followed by its noise parameters
+    s, frequency = randomnetwork(101, 2)
+    noise = np.column_stack((frequency[::10] / 1e9, np.linspace(0.5, 2., 11), np.full(11, 0.3),\
+            np.full(11, 45.), np.full(11, 0.4)))
+    path = str(tmp_path / 'noise.s2p')
+    dumpsnp(s, frequency, path)
+    with open(path, 'a') as f:
+        np.savetxt(f, noise, fmt='%.9e')
+
+    tsPath = str(tmp_path / 'noise.ts')
+    dumpts(s, frequency, tsPath)
+    with open(tsPath) as f:
+        text = f.read()
+    with open(tsPath, 'w') as f:
+        f.write(text.replace('[End]\n', '[Noise Data]\n'))
+        np.savetxt(f, noise, fmt='%.9e')
+        f.write('[End]\n')
+    return (s, frequency, noise, [path, tsPath])
+
+
+@pytest.mark.parametrize('matrixFormat', ['Full', 'Upper', 'Lower'])
+def test_matrix_format(reciprocal, tmp_path, matrixFormat):
+    s, frequency = reciprocal
+    path = str(tmp_path / 'network.ts')
+    dumpts(s, frequency, path, matrixFormat)
+    network = readnetwork(path)
+    assert network.version() == '2.0'
+    assert network.portCount() == 4
+    np.testing.assert_allclose(network.sparameters(), s, rtol=1e-8, atol=0)
+    np.testing.assert_allclose(network.frequency(), frequency, rtol=1e-9)
+
+
+def test_triangular_is_smaller(reciprocal, tmp_path):
+    s, frequency = reciprocal
+    sizes = []
+    for matrixFormat in ['Full', 'Upper']:
+        path = tmp_path / 'network_{}.ts'.format(matrixFormat)
+        dumpts(s, frequency, str(path), matrixFormat)
+        sizes.append(path.stat().st_size)
+    assert sizes[1] < 0.7 * sizes[0]
+
+
+def test_noise_block(noisy):
+    s, frequency, noise, paths = noisy
+    # Touchstone 1.x normalizes Rn to the reference impedance, 2.0 gives it in Ohm
+    for path, rn in zip(paths, [20., 0.4]):
+        network = readnetwork(path)
+        # The noise block is parsed on its own, the network data before it is untouched
+        assert len(network.frequency()) == 101
+        np.testing.assert_allclose(network.data(), s, rtol=1e-8)
+        np.testing.assert_allclose(network.noise()['NFMIN'], noise[:, 1])
+        np.testing.assert_allclose(network.noise()['RN'], rn)
+
+
+@pytest.mark.parametrize('matrixFormat', ['Full', 'Upper', 'Lower'])
+def test_streamsnp_matrix_format(reciprocal, tmp_path, matrixFormat):
+    s, frequency = reciprocal
+    path = str(tmp_path / 'network.ts')
+    dumpts(s, frequency, path, matrixFormat)
+    for x1, x2 in zip(nyanRF.streamsnp(path), nyanRF.loadsnp(path, False)):
+        np.testing.assert_array_equal(x1, x2)
+
+
+@pytest.mark.parametrize('chunkBytes', [1 << 22, 256, 1000])
+def test_streamsnp_noise_block(noisy, chunkBytes):
+    # Small chunks put the noise block split at chunk boundaries as well
+    s, frequency, noise, paths = noisy
+    for path in paths:
+        s2, f2 = nyanRF.streamsnp(path, chunkBytes)
+        np.testing.assert_allclose(s2, s, rtol=1e-8)
+        np.testing.assert_array_equal(f2, nyanRF.loadsnp(path, False)[1])
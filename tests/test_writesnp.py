@@ -0,0 +1,31 @@
+import gzip
+import numpy as np
+import pytest
+
+import NyanRFModule as nyanRF
+from NyanRFBenchmarkModule import randomnetwork, writesnp_loop
+
+
+@pytest.mark.parametrize('FORMAT', ['RI', 'MA', 'DB'])
+@pytest.mark.parametrize('n', [1, 2, 3, 4, 12])
+def test_matches_reference(tmp_path, n, FORMAT):
+    # Smaller row chunks than points, so that the chunked writing is covered
+    s, frequency = randomnetwork(301, n)
+    path1, path2 = str(tmp_path / 'loop.txt'), str(tmp_path / 'vectorized.txt')
+    writesnp_loop(s, frequency, path1, 'GHZ', 'S', FORMAT)
+    nyanRF.writesnp(s, frequency, path2, 'GHZ', 'S', FORMAT, chunkRows=64)
+    with open(path1) as f1, open(path2) as f2:
+        assert f2.read() == f1.read()
+
+
+def test_gzip(tmp_path):
+    s, frequency = randomnetwork(301, 4)
+    path = str(tmp_path / 'network.s4p')
+    nyanRF.writesnp(s, frequency, path)
+    nyanRF.writesnp(s, frequency, path + '.gz')
+    with open(path) as f1, gzip.open(path + '.gz', 'rt') as f2:
+        assert f2.read() == f1.read()
+
+    s2, f2 = nyanRF.loadsnp(path + '.gz')
+    np.testing.assert_allclose(s2, s, rtol=1e-6, atol=1e-7)
+    np.testing.assert_allclose(f2, frequency, rtol=1e-6)